@@ -3,8 +3,8 @@ import os
 import requests
 from dotenv import load_dotenv
 from supabase import ClientOptions, create_client, Client
-from shapely import MultiPolygon
-from shapely.geometry import Point, Polygon
+from reverse_geocoder import ReverseGeocoder
+from kg_snapshot import invalidate
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
@@ -21,8 +21,6 @@ opts = ClientOptions().replace(schema="public")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY, options=opts)
 print("Connected to Supabase.")
 
-area_polygons = []
-
 place_ids = {"NW":"place:51f0969c9714f259405947f8286dbb4af63ff00101f901a2773a0000000000c00206",
             "NE":"place:51648d49af5bfb5940590c1f11532209f63ff00101f901a1773a0000000000c00206",
             "SW":"place:51be2bc776e4ec59405936464662ddb3f43ff00101f901a4773a0000000000c00206", 
@@ -153,54 +151,32 @@ def main():
     
     #Step 2: Populate missing planning areas and all subzones and regions
     if not is_area_details_populated:
+        # Planning areas and subzones come from the local subzone polygons (cached WKB geometry
+        # store) in one bulk lookup; OneMap is only asked about points outside every polygon
+        geocoder = ReverseGeocoder()
+        print("Formed polygons for all areas")
+
         records = supabase.table("establishments").select("id, latitude, longitude").is_("planning_area","null").execute()
 
         if not records.data:
             print("No records found with null planning areas.")
         else:
-            for record in records.data:
+            areas = geocoder.lookup(
+                [r.get("latitude") for r in records.data], [r.get("longitude") for r in records.data]
+            )["planning_area"]
+            for record, planning_area in zip(records.data, areas):
                 prop_id = record["id"]
                 lat = record.get("latitude")
                 lon = record.get("longitude")
 
-                planning_area = get_planning_area(lat, lon)
+                if planning_area is None and lat is not None and lon is not None:
+                    planning_area = get_planning_area(lat, lon)
 
                 if planning_area:
                     print(f"Updating id {prop_id} with planning area: {planning_area}")
                     update_planning_area(prop_id, planning_area)
                 else:
                     print(f"No planning area found for id {prop_id} (lat: {lat}, lon: {lon})")
-        
-        planning_areas_resp = (
-        supabase.table("planning_areas")
-        .select("subzone, planning_area, region, geometry_type, coordinates")
-        .execute()
-        )
-        planning_areas = planning_areas_resp.data
-        print("Retrieved planning areas")
-
-        for area in planning_areas:
-            try:
-                coords_raw = json.loads(area["coordinates"])
-                if not coords_raw or not coords_raw[0]:
-                    continue
-                if (area["geometry_type"] == "Polygon"):
-                    polygon = Polygon([(lng, lat) for lng, lat, *_ in coords_raw[0]])
-                    area_polygons.append((polygon, area["subzone"]))
-                else: #Multi polygon
-                    polygons = []
-                    for part in coords_raw:
-                        if not part:
-                            continue
-                        # part[0] is usually the outer ring; ignore holes for now
-                        poly = Polygon([(lng, lat) for lng, lat, *_ in part[0]])
-                        polygons.append(poly)
-                    multi = MultiPolygon(polygons)
-                    area_polygons.append((multi, area["subzone"]))
-            except Exception as e:
-                print(f"Error parsing polygon for {area['subzone']}: {e}")
-
-        print("Formed polygons for all areas")
 
         establishments_resp = supabase.table("establishments").select("id, latitude, longitude, planning_area").is_("subzone","null").execute()
         establishments = establishments_resp.data
@@ -209,15 +185,10 @@ def main():
             print("No records found with null subzones.")
             return
 
-        for establishment in establishments:
-            point = Point(establishment["longitude"], establishment["latitude"])
-            matched_subzone = None
-
-            for shape, subzone in area_polygons:
-                if shape.contains(point):
-                    matched_subzone = subzone
-                    break
-            
+        subzones = geocoder.lookup(
+            [e["latitude"] for e in establishments], [e["longitude"] for e in establishments]
+        )["subzone"]
+        for establishment, matched_subzone in zip(establishments, subzones):
             id = establishment["id"]
             if matched_subzone:
                 updates.append({
@@ -240,4 +211,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Rows were written in place, possibly only some of them
+        invalidate("establishments")
@@ -0,0 +1,193 @@
+"""
+Streaming reader for the data.gov.sg KML-derived GeoJSON files.
+
+Those files keep every attribute in one `Description` property, an HTML table
+of <th>KEY</th> <td>VALUE</td> rows (SUBZONE_N, PLN_AREA_N, STATION_NA, …).
+The scripts used to json.load() the whole file and run BeautifulSoup over
+each Description. Here:
+
+  iter_features(path)       yields one feature at a time, decoded from a
+                            buffered read of the "features" array, so the
+                            whole document is never held in memory
+  description_fields(html)  reads the key/value cells with one compiled
+                            regex; markup it does not expect (tags inside a
+                            cell, rows it cannot pair up) falls back to lxml,
+                            or to BeautifulSoup if lxml is missing
+  geometry_bounds(geom)     (minx, miny, maxx, maxy) with NumPy over the rings
+
+    for feature in iter_features("data_files/subzone_boundaries.geojson"):
+        fields = description_fields(feature["properties"].get("Description"))
+
+    python geojson_stream.py --benchmark      # vs json.load + BeautifulSoup
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUBZONE_GEOJSON = os.path.join(HERE, "data_files", "subzone_boundaries.geojson")
+
+CHUNK_SIZE = 1 << 20
+
+# A plain-text header cell followed by a plain-text value cell
+_CELL_PAIR = re.compile(r"<th[^>]*>([^<]*)</th>\s*<td[^>]*>([^<]*)</td>", re.IGNORECASE)
+_TD = re.compile(r"<td[\s>]", re.IGNORECASE)
+_FEATURES = re.compile(r'"features"\s*:\s*\[')
+
+
+# ─── Features ─────────────────────────────────────────────────────────────────
+def iter_features(path: str, chunk_size: int = CHUNK_SIZE):
+    """Yield the features of a FeatureCollection one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, eof = "", False
+
+        def more():
+            nonlocal buf, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            return not eof
+
+        match = None
+        while match is None:
+            match = _FEATURES.search(buf)
+            if match is None and not more():
+                return
+        buf, pos = buf[match.end():], 0
+        while True:
+            # Skip separators between features
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or not more():
+                    break
+            if pos >= len(buf) or buf[pos] == "]":
+                return
+            try:
+                feature, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # The feature runs past the buffer: drop what is consumed and read on
+                buf, pos = buf[pos:], 0
+                if not more():
+                    raise
+                continue
+            yield feature
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+# ─── Description attributes ───────────────────────────────────────────────────
+def _fields_fallback(description: str) -> dict:
+    try:
+        import lxml.html
+        root = lxml.html.fromstring(description)
+        rows = [row.xpath("./th|./td") for row in root.iter("tr")]
+        pairs = [(r[0].text_content(), r[1].text_content()) for r in rows if len(r) == 2]
+    except ImportError:
+        from bs4 import BeautifulSoup
+        rows = [row.find_all(["th", "td"]) for row in BeautifulSoup(description, "html.parser").find_all("tr")]
+        pairs = [(r[0].get_text(), r[1].get_text()) for r in rows if len(r) == 2]
+    return {k.strip(): v.strip() for k, v in pairs}
+
+
+def description_fields(description: str) -> dict:
+    """{KEY: value} from a Description attribute table."""
+    if not description:
+        return {}
+    pairs = _CELL_PAIR.findall(description)
+    if len(pairs) != len(_TD.findall(description)):
+        return _fields_fallback(description)
+    return {html.unescape(k).strip(): html.unescape(v).strip() for k, v in pairs}
+
+
+def geometry_bounds(geometry: dict):
+    """(minx, miny, maxx, maxy) of a Point / Polygon / MultiPolygon geometry."""
+    coords = geometry["coordinates"]
+    gtype = geometry["type"]
+    if gtype == "Point":
+        return coords[0], coords[1], coords[0], coords[1]
+    rings = coords if gtype == "Polygon" else [ring for polygon in coords for ring in polygon]
+    xy = np.concatenate([np.asarray(ring, dtype=np.float64)[:, :2] for ring in rings if ring])
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+
+# ─── Benchmark ────────────────────────────────────────────────────────────────
+def _old_parse(path):
+    """The previous approach: json.load, BeautifulSoup per Description, Python min/max."""
+    from bs4 import BeautifulSoup
+    with open(path, "r") as f:
+        data = json.load(f)
+    out = []
+    for feature in data["features"]:
+        soup = BeautifulSoup(feature["properties"].get("Description", ""), "html.parser")
+        fields = {}
+        for row in soup.find_all("tr"):
+            cells = row.find_all(["th", "td"])
+            if len(cells) == 2:
+                fields[cells[0].get_text(strip=True)] = cells[1].get_text(strip=True)
+        coords = []
+        geometry = feature["geometry"]
+        rings = geometry["coordinates"] if geometry["type"] == "Polygon" else [
+            r for p in geometry["coordinates"] for r in p]
+        for ring in rings:
+            coords.extend(ring)
+        xs, ys = [c[0] for c in coords], [c[1] for c in coords]
+        out.append((fields, (min(xs), min(ys), max(xs), max(ys))))
+    return out
+
+
+def _new_parse(path):
+    return [
+        (description_fields(f["properties"].get("Description", "")), geometry_bounds(f["geometry"]))
+        for f in iter_features(path)
+    ]
+
+
+def benchmark(path: str = SUBZONE_GEOJSON, repeat: int = 3):
+    import tracemalloc
+
+    size_mb = os.path.getsize(path) / 1e6
+    results = {}
+    for name, fn in (("json.load + BeautifulSoup", _old_parse), ("streaming + regex", _new_parse)):
+        best = min(_timed(fn, path) for _ in range(repeat))
+        tracemalloc.start()
+        out = fn(path)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = out
+        print(f"   • {name}: {best*1000:.0f} ms, {len(out) / best:,.0f} features/s, "
+              f"{size_mb / best:.1f} MB/s, peak {peak / 1e6:.1f} MB")
+    old, new = results.values()
+    same = len(old) == len(new) and all(a[0] == b[0] and np.allclose(a[1], b[1]) for a, b in zip(old, new))
+    print(f"   • {len(new)} features, identical fields and bounds: {same}")
+
+
+def _timed(fn, path):
+    start = time.perf_counter()
+    fn(path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming GeoJSON attribute reader")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--path", default=SUBZONE_GEOJSON)
+    opts = parser.parse_args()
+    if opts.benchmark:
+        print(f"🔍 {opts.path} ({os.path.getsize(opts.path) / 1e6:.1f} MB)")
+        benchmark(opts.path)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Subzone geometry as WKB in one memory-mapped binary file.
+
+Consumers used to json.loads() the planning_areas `coordinates` column and
+rebuild Polygons on every run. load_store() does that once per version of the
+source: the source file (subzone_boundaries.geojson by default, or a
+planning_areas CSV) is hashed, and a store built from that content is written
+to GEOMETRY_CACHE as subzones-<hash>.geo and memory-mapped on later loads.
+
+    store = load_store()
+    store.names[i], store.planning_areas[i], store.regions[i]
+    store.bounds                 # (n, 4) minx, miny, maxx, maxy, float64, memory-mapped
+    store.geometries()           # prepared shapely geometries, decoded on first use
+    store.find("BEDOK NORTH")    # row index, or None
+    store.meta                   # header metadata, e.g. a simplification tier's stats (subzone_tiers.py)
+
+Names, attributes and bounds only need NumPy; shapely is imported the first
+time geometries are requested.
+
+File layout: 8-byte magic, uint64 header length, JSON header (names,
+attributes, section offsets), then 8-byte aligned sections: bounds (n × 4
+float64), WKB offsets (n + 1 uint64) and the concatenated little-endian WKB.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUBZONE_GEOJSON = os.path.join(HERE, "data_files", "subzone_boundaries.geojson")
+CACHE_DIR = os.getenv("GEOMETRY_CACHE", os.path.join(HERE, "data_files", ".geometry_cache"))
+
+MAGIC = b"SZGEO\x00\x01\x00"
+FORMAT_VERSION = 1
+
+
+# ─── WKB encoding (no shapely needed to build a store) ────────────────────────
+def _wkb_polygon(rings) -> bytes:
+    out = [struct.pack("<BII", 1, 3, len(rings))]
+    for ring in rings:
+        xy = np.asarray([c[:2] for c in ring], dtype="<f8")
+        out.append(struct.pack("<I", len(xy)))
+        out.append(xy.tobytes())
+    return b"".join(out)
+
+
+def to_wkb(geometry_type: str, coordinates) -> bytes:
+    """GeoJSON Polygon / MultiPolygon coordinates → 2D little-endian WKB."""
+    if geometry_type == "Polygon":
+        return _wkb_polygon(coordinates)
+    parts = [part for part in coordinates if part and part[0]]
+    return struct.pack("<BII", 1, 6, len(parts)) + b"".join(_wkb_polygon(p) for p in parts)
+
+
+def _bounds(coordinates):
+    xy = np.asarray([c[:2] for c in _flatten(coordinates)], dtype=np.float64)
+    return (*xy.min(axis=0), *xy.max(axis=0))
+
+
+def _flatten(coords):
+    # Positions are lists of numbers; anything deeper is a ring, polygon or part
+    if coords and isinstance(coords[0], (int, float)):
+        yield coords
+        return
+    for c in coords:
+        yield from _flatten(c)
+
+
+# ─── Build ────────────────────────────────────────────────────────────────────
+def build(rows, path: str, source_hash: str = None, meta: dict = None) -> str:
+    """Write a store from planning_areas-style rows (subzone, planning_area, region,
+    geometry_type, coordinates as a list or JSON text). Returns `path`.
+
+    `meta` is kept in the header as-is (JSON-serialisable), e.g. a simplification tier's stats."""
+    names, pln, regions, types, bounds, blobs = [], [], [], [], [], []
+    for row in rows:
+        coords = row["coordinates"]
+        coords = json.loads(coords) if isinstance(coords, str) else coords
+        if not coords or not coords[0] or row["geometry_type"] not in ("Polygon", "MultiPolygon"):
+            continue
+        names.append(row["subzone"])
+        pln.append(row.get("planning_area"))
+        regions.append(row.get("region"))
+        types.append(row["geometry_type"])
+        bounds.append(_bounds(coords))
+        blobs.append(to_wkb(row["geometry_type"], coords))
+
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+    sections = [
+        ("bounds", np.asarray(bounds, dtype="<f8").reshape(-1, 4).tobytes()),
+        ("offsets", offsets.tobytes()),
+        ("wkb", b"".join(blobs)),
+    ]
+    header = {
+        "version": FORMAT_VERSION, "source_hash": source_hash, "count": len(names),
+        "names": names, "planning_area": pln, "region": regions, "geometry_type": types,
+        "meta": meta or {},
+    }
+    # Section offsets depend on the header length, which depends on the offsets
+    header["sections"] = {name: [0, len(data)] for name, data in sections}
+    while True:
+        head = json.dumps(header).encode()
+        pos = _align(len(MAGIC) + 8 + len(head))
+        layout = {}
+        for name, data in sections:
+            layout[name] = [pos, len(data)]
+            pos = _align(pos + len(data))
+        if layout == header["sections"]:
+            break
+        header["sections"] = layout
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(head)) + head)
+        for name, data in sections:
+            f.write(b"\x00" * (layout[name][0] - f.tell()))
+            f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def _align(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+
+# ─── Read ─────────────────────────────────────────────────────────────────────
+class GeometryStore:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a geometry store")
+        (head_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._mm[start:start + head_len])
+        self.names = self.header["names"]
+        self.planning_areas = self.header["planning_area"]
+        self.regions = self.header["region"]
+        self.geometry_types = self.header["geometry_type"]
+        self.source_hash = self.header.get("source_hash")
+        self.meta = self.header.get("meta", {})
+        self.bounds = self._section("bounds", "<f8").reshape(-1, 4)
+        self._offsets = self._section("offsets", "<u8")
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._geoms = None
+
+    def _section(self, name, dtype):
+        offset, nbytes = self.header["sections"][name]
+        return np.frombuffer(self._mm, dtype=dtype, count=nbytes // np.dtype(dtype).itemsize, offset=offset)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, name: str):
+        """Row index of a subzone (case-insensitive), or None."""
+        return self._index.get(name) if name in self._index else self._index.get(str(name).strip().upper())
+
+    def wkb(self, i: int) -> bytes:
+        offset = self.header["sections"]["wkb"][0]
+        return self._mm[offset + int(self._offsets[i]):offset + int(self._offsets[i + 1])]
+
+    def geometries(self) -> np.ndarray:
+        """Prepared shapely geometries in row order (decoded once, then cached)."""
+        if self._geoms is None:
+            import shapely
+            geoms = shapely.from_wkb([self.wkb(i) for i in range(len(self))])
+            # Self-touching rings in the source data would make contains() unreliable
+            bad = ~shapely.is_valid(geoms)
+            geoms[bad] = shapely.make_valid(geoms[bad])
+            shapely.prepare(geoms)
+            self._geoms = geoms
+        return self._geoms
+
+    def geometry(self, name_or_index):
+        i = name_or_index if isinstance(name_or_index, (int, np.integer)) else self.find(name_or_index)
+        return None if i is None else self.geometries()[i]
+
+
+# ─── Content-hash cache ───────────────────────────────────────────────────────
+_stores = {}
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def _rows_from_source(path: str):
+    if path.endswith((".geojson", ".json")):
+        from area_extraction import parse_features
+        return parse_features(path)
+    import csv
+    csv.field_size_limit(1 << 30)  # coordinates cells run to hundreds of KB
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def load_store(source: str = SUBZONE_GEOJSON, cache_dir: str = CACHE_DIR, rows=None) -> GeometryStore:
+    """Store for `source` (GeoJSON or planning_areas CSV), built on first use of each content hash.
+
+    `rows` are the source's already-parsed rows, if the caller has them.
+    """
+    key = file_hash(source)
+    if key in _stores:
+        return _stores[key]
+    path = os.path.join(cache_dir, f"subzones-{key}.geo")
+    if not os.path.exists(path):
+        build(rows if rows is not None else _rows_from_source(source), path, source_hash=key)
+        print(f"✅ Built geometry store {path}")
+    _stores[key] = GeometryStore(path)
+    return _stores[key]
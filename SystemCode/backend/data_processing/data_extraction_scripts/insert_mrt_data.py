@@ -2,7 +2,7 @@ import json
 import os
 from dotenv import load_dotenv
 import requests
-from bs4 import BeautifulSoup
+from geojson_stream import description_fields, iter_features
 from supabase import ClientOptions, create_client, Client
 
 dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
@@ -14,30 +14,15 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 opts = ClientOptions().replace(schema="public")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY,options=opts)
 
-# Load GeoJSON file
-with open("LTAMRTStationExitGEOJSON.geojson", "r", encoding="utf-8") as file:
-    data = json.load(file)
-print(f"data loaded {len(data)} records")
+# Stream the GeoJSON features; station name and exit code come from the HTML table in "Description"
 amenities_data = []
-for feature in data["features"]:
+for feature in iter_features("LTAMRTStationExitGEOJSON.geojson"):
     properties = feature["properties"]
     geometry = feature["geometry"]
 
-    # Extract station name and exit code from the HTML table in "Description"
-    description_html = properties.get("Description", "")
-    soup = BeautifulSoup(description_html, "html.parser")
-
-    station_name = None
-    exit_code = None
-
-    for row in soup.find_all("tr"):
-        cols = row.find_all("th"), row.find_all("td")
-        if len(cols[0]) > 0 and len(cols[1]) > 0:
-            header, value = cols[0][0].text.strip(), cols[1][0].text.strip()
-            if header == "STATION_NA":
-                station_name = value
-            elif header == "EXIT_CODE":
-                exit_code = value
+    fields = description_fields(properties.get("Description", ""))
+    station_name = fields.get("STATION_NA")
+    exit_code = fields.get("EXIT_CODE")
 
     if not station_name or not exit_code:
         continue  # Skip if we couldn't extract necessary fields
@@ -55,9 +40,11 @@ for feature in data["features"]:
         "location": location,
         "address": None,
         "postal_code": None,
-        "additional_info": None,
+        # Separate fields: the exit code itself contains a space ("Exit A")
+        "additional_info": {"station": station_name, "exit": exit_code},
     }
     amenities_data.append(amenity_entry)
+print(f"data loaded {len(amenities_data)} records")
 
 # Save extracted data to a temporary JSON file for review
 tmp_file = "tmp_amenities.json"
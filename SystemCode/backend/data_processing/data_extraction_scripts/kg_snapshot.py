@@ -0,0 +1,28 @@
+"""
+Invalidate the knowledge-graph snapshot cache after writing Supabase tables.
+
+models/knowledge_graph/snapshot.py keeps local Arrow copies of the tables the
+offline pipelines read. Scripts here that update those tables in place call
+invalidate() afterwards, so the next pipeline run refetches them instead of
+waiting for the watermark or SNAPSHOT_MAX_AGE.
+
+    from kg_snapshot import invalidate
+    invalidate("establishments")
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+KNOWLEDGE_GRAPH_DIR = os.getenv(
+    "KNOWLEDGE_GRAPH_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(HERE)), "models", "knowledge_graph"),
+)
+
+
+def invalidate(*table_names: str):
+    if KNOWLEDGE_GRAPH_DIR not in sys.path:
+        sys.path.insert(0, KNOWLEDGE_GRAPH_DIR)
+    import snapshot
+    snapshot.invalidate(*table_names)
+    print(f"🔄 Invalidated snapshots of {', '.join(table_names)}")
@@ -0,0 +1,314 @@
+"""
+Nearest MRT station and walking distance for listings, establishments and subzones.
+
+industrial_properties.closest_mrt is a name scraped from 99.co, which cannot be
+compared or ranked. This module indexes the LTA MRT station exits (the same
+GeoJSON insert_mrt_data.py loads into `amenities`) in a KD-tree over local
+metric coordinates. It then computes, for every point in one vectorized
+query:
+
+  mrt_station            station of the nearest exit
+  mrt_exit               that exit's code
+  mrt_distance_m         straight-line distance to it
+  mrt_walk_min           estimated walk: distance × WALK_DETOUR at WALK_SPEED_M_MIN
+  mrt_exits_500m         exits within 500 m
+  mrt_exit_distances_m   distances to the K_NEAREST nearest exits, ascending
+
+    index = MrtIndex.from_geojson()
+    table = index.access(lats, lons)
+
+The walk estimate is a detour factor on the straight line, not a route over
+the footpath network; it ranks locations the same way for any fixed factor.
+
+    python mrt_access.py                     # compute, save CSVs, update Supabase
+    python mrt_access.py --dry-run           # CSVs only
+    python mrt_access.py --from-amenities    # exits from the amenities table
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geojson_stream import description_fields, iter_features
+from kg_snapshot import invalidate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MRT_EXITS_GEOJSON = os.getenv("MRT_EXITS_GEOJSON", os.path.join(HERE, "data_files", "LTAMRTStationExitGEOJSON.geojson"))
+OUTPUT_DIR = os.path.join(HERE, "data_files")
+
+K_NEAREST = int(os.getenv("MRT_K_NEAREST", "3"))
+UPDATE_CHUNK_SIZE = int(os.getenv("MRT_UPDATE_CHUNK_SIZE", "500"))
+
+# Postgres checks NOT NULL on the proposed row before ON CONFLICT resolves it,
+# so the upserts in update_rows carry these unchanged
+REQUIRED_COLUMNS = {
+    "industrial_properties": ["listing_id", "property_segment", "listing_type", "main_category",
+                              "sub_category", "price", "area_size"],
+    "establishments": ["venue_name", "latitude", "longitude"],
+    "planning_areas": ["subzone", "planning_area", "region",
+                       "min_latitude", "max_latitude", "min_longitude", "max_longitude"],
+}
+WALK_DETOUR = float(os.getenv("WALK_DETOUR", "1.3"))
+WALK_SPEED_M_MIN = float(os.getenv("WALK_SPEED_M_MIN", "80"))
+EXIT_RADIUS_M = 500.0
+
+# Equirectangular metres around Singapore's latitude; < 0.1% error across the island
+METRES_PER_DEGREE = 111_320
+LAT0 = 1.35
+KX = METRES_PER_DEGREE * np.cos(np.radians(LAT0))
+
+
+def to_metres(lats, lons) -> np.ndarray:
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return np.column_stack([lons * KX, lats * METRES_PER_DEGREE])
+
+
+# ─── MRT exits ────────────────────────────────────────────────────────────────
+def exits_from_geojson(path: str = MRT_EXITS_GEOJSON) -> list:
+    """[{station, exit, latitude, longitude}] from the LTA station-exit GeoJSON."""
+    exits = []
+    for feature in iter_features(path):
+        fields = description_fields(feature["properties"].get("Description", ""))
+        if not fields.get("STATION_NA") or not fields.get("EXIT_CODE"):
+            continue
+        lon, lat = feature["geometry"]["coordinates"][:2]
+        exits.append({"station": fields["STATION_NA"], "exit": fields["EXIT_CODE"], "latitude": lat, "longitude": lon})
+    return exits
+
+
+def _point(location):
+    """amenities.location as stored (EWKT text, or hex EWKB as PostgREST returns geography) → (lon, lat)."""
+    import shapely
+    if isinstance(location, str) and location.upper().startswith("SRID="):
+        location = location.split(";", 1)[1]
+    geom = shapely.from_wkt(location) if "(" in str(location) else shapely.from_wkb(location)
+    return geom.x, geom.y
+
+
+def _station_exit(row) -> tuple:
+    """(station, exit) of an MRT amenity row.
+
+    insert_mrt_data.py keeps both in additional_info; older rows only have the
+    name "<STATION_NA> <EXIT_CODE>", where the exit code itself is "Exit A".
+    """
+    info = row.get("additional_info")
+    if isinstance(info, str):
+        try:
+            info = json.loads(info)
+        except ValueError:
+            info = None
+    if isinstance(info, dict) and info.get("station"):
+        return info["station"], info.get("exit")
+    name = row.get("name") or ""
+    station, sep, code = name.rpartition(" Exit ")
+    if sep:
+        return station, f"Exit {code}"
+    station, _, code = name.rpartition(" ")
+    return station, code
+
+
+def exits_from_amenities(supabase) -> list:
+    rows = fetch_all(supabase, "amenities", "name, location, additional_info", amenity_type="MRT")
+    exits = []
+    for row in rows:
+        station, exit_code = _station_exit(row)
+        if not row.get("location") or not station:
+            continue
+        lon, lat = _point(row["location"])
+        exits.append({"station": station, "exit": exit_code, "latitude": lat, "longitude": lon})
+    return exits
+
+
+class MrtIndex:
+    def __init__(self, exits: list):
+        if not exits:
+            raise ValueError("No MRT exits to index")
+        self.stations = np.array([e["station"] for e in exits], dtype=object)
+        self.exits = np.array([e["exit"] for e in exits], dtype=object)
+        self.tree = cKDTree(to_metres([e["latitude"] for e in exits], [e["longitude"] for e in exits]))
+
+    @classmethod
+    def from_geojson(cls, path: str = MRT_EXITS_GEOJSON):
+        return cls(exits_from_geojson(path))
+
+    def access(self, lats, lons, k: int = K_NEAREST) -> dict:
+        """Accessibility columns for every point; NaN / None where a point has no coordinates."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        n = len(lats)
+        k = min(k, len(self.stations))
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        xy = to_metres(lats[valid], lons[valid])
+
+        dist = np.full((n, k), np.nan)
+        idx = np.full((n, k), -1, dtype=np.intp)
+        d, i = self.tree.query(xy, k=k)
+        dist[valid], idx[valid] = d.reshape(-1, k), i.reshape(-1, k)
+        within = np.zeros(n, dtype=np.int64)
+        within[valid] = self.tree.query_ball_point(xy, EXIT_RADIUS_M, return_length=True)
+
+        nearest = idx[:, 0]
+        station = np.full(n, None, dtype=object)
+        exit_code = np.full(n, None, dtype=object)
+        station[valid] = self.stations[nearest[valid]]
+        exit_code[valid] = self.exits[nearest[valid]]
+        return {
+            "mrt_station": station,
+            "mrt_exit": exit_code,
+            "mrt_distance_m": dist[:, 0],
+            "mrt_walk_min": dist[:, 0] * WALK_DETOUR / WALK_SPEED_M_MIN,
+            "mrt_exits_500m": within,
+            "mrt_exit_distances_m": dist,
+        }
+
+
+# ─── Targets ──────────────────────────────────────────────────────────────────
+def fetch_all(supabase, table: str, columns: str, page_size: int = 1000, **eq) -> list:
+    rows, start = [], 0
+    while True:
+        query = supabase.table(table).select(columns)
+        for col, value in eq.items():
+            query = query.eq(col, value)
+        page = query.range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def subzone_centroids():
+    """(subzone names, lats, lons) of the subzone centroids from the geometry store."""
+    import shapely
+    from geometry_store import load_store
+    store = load_store()
+    c = shapely.centroid(store.geometries())
+    return list(store.names), shapely.get_y(c), shapely.get_x(c)
+
+
+def to_rows(keys: dict, table: dict) -> list:
+    """Column arrays → update rows, rounded, with the k distances as a list."""
+    rows = []
+    for i in range(len(next(iter(keys.values())))):
+        if table["mrt_station"][i] is None:
+            continue
+        rows.append({
+            **{name: values[i] for name, values in keys.items()},
+            "mrt_station": table["mrt_station"][i],
+            "mrt_exit": table["mrt_exit"][i],
+            "mrt_distance_m": round(float(table["mrt_distance_m"][i]), 1),
+            "mrt_walk_min": round(float(table["mrt_walk_min"][i]), 1),
+            "mrt_exits_500m": int(table["mrt_exits_500m"][i]),
+            "mrt_exit_distances_m": [round(float(d), 1) for d in table["mrt_exit_distances_m"][i]],
+        })
+    return rows
+
+
+def save_csv(rows: list, path: str):
+    import csv
+    if not rows:
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        for row in rows:
+            w.writerow({**row, "mrt_exit_distances_m": json.dumps(row["mrt_exit_distances_m"])})
+
+
+def update_rows(supabase, table: str, key: str, rows: list, carry: dict = None,
+                chunk_size: int = UPDATE_CHUNK_SIZE):
+    """Chunked upserts on the primary key `key`; a chunk that fails is retried row by row.
+
+    `carry` maps a key value to the table's NOT NULL columns for that row:
+    Postgres checks them on the proposed row before ON CONFLICT turns it into
+    an update, so the upsert has to send them unchanged.
+    """
+    carry = carry or {}
+    written, failed = 0, 0
+    try:
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            try:
+                supabase.table(table) \
+                    .upsert([{**carry.get(row[key], {}), **row} for row in chunk], on_conflict=key) \
+                    .execute()
+                written += len(chunk)
+                continue
+            except Exception as e:  # APIError, HTTP and connection errors alike
+                print(f"⚠️ Upsert of {len(chunk)} {table} rows failed ({e}); updating them one by one")
+            for row in chunk:
+                values = {k: v for k, v in row.items() if k != key}
+                try:
+                    supabase.table(table).update(values).eq(key, row[key]).execute()
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {table} {key}={row[key]}: {e}")
+    finally:
+        # Rows were written in place, possibly only some of them
+        invalidate(table)
+    print(f"✅ Updated {written} {table} rows" + (f", {failed} failed" if failed else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest MRT exit and walking distance")
+    parser.add_argument("--dry-run", action="store_true", help="write the CSVs only")
+    parser.add_argument("--from-amenities", action="store_true", help="read exits from the amenities table")
+    parser.add_argument("--k", type=int, default=K_NEAREST)
+    opts = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from supabase import ClientOptions, create_client
+
+    load_dotenv(os.path.join(HERE, ".env"))
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"),
+                             options=ClientOptions().replace(schema="public"))
+
+    exits = exits_from_amenities(supabase) if opts.from_amenities else exits_from_geojson()
+    index = MrtIndex(exits)
+    print(f"🚇 Indexed {len(exits)} exits of {len(set(index.stations))} stations")
+
+    required = lambda t: ", ".join(c for c in REQUIRED_COLUMNS[t] if c not in ("latitude", "longitude"))
+    props = fetch_all(supabase, "industrial_properties",
+                      f"property_id, latitude, longitude, {required('industrial_properties')}")
+    ests = fetch_all(supabase, "establishments", f"id, latitude, longitude, {required('establishments')}")
+    names, sz_lats, sz_lons = subzone_centroids()
+    # planning_areas is keyed by id; subzone names are not unique there
+    areas = fetch_all(supabase, "planning_areas", f"id, {required('planning_areas')}")
+    sz_index = {str(name).strip().upper(): i for i, name in enumerate(names)}
+    areas = [a for a in areas if (a.get("subzone") or "").strip().upper() in sz_index]
+
+    # One query for every point; the results are split back per target afterwards
+    lats = np.concatenate([[p["latitude"] for p in props], [e["latitude"] for e in ests], sz_lats]).astype(float)
+    lons = np.concatenate([[p["longitude"] for p in props], [e["longitude"] for e in ests], sz_lons]).astype(float)
+    start = time.perf_counter()
+    table = index.access(lats, lons, opts.k)
+    print(f"✅ {len(lats):,} points in {(time.perf_counter() - start)*1000:.0f} ms "
+          f"({len(props)} properties, {len(ests)} establishments, {len(names)} subzones)")
+
+    bounds = np.cumsum([0, len(props), len(ests), len(names)])
+    part = lambda j: {k: v[bounds[j]:bounds[j + 1]] for k, v in table.items()}
+    sel = [sz_index[a["subzone"].strip().upper()] for a in areas]
+    by_area = {k: v[sel] for k, v in part(2).items()}
+    targets = [
+        ("industrial_properties", "property_id", props,
+         to_rows({"property_id": [p["property_id"] for p in props]}, part(0))),
+        ("establishments", "id", ests, to_rows({"id": [e["id"] for e in ests]}, part(1))),
+        ("planning_areas", "id", areas,
+         to_rows({"id": [a["id"] for a in areas], "subzone": [a["subzone"] for a in areas]}, by_area)),
+    ]
+    for table_name, key, source, rows in targets:
+        path = os.path.join(OUTPUT_DIR, f"mrt_access_{table_name}.csv")
+        save_csv(rows, path)
+        print(f"📁 Saved {path}")
+        if not opts.dry_run:
+            carry = {r[key]: {c: r.get(c) for c in REQUIRED_COLUMNS[table_name]} for r in source}
+            update_rows(supabase, table_name, key, rows, carry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Offline reverse geocoding of (lat, lon) to subzone, planning area and region.
+
+Uses the subzone polygons of subzone_boundaries.geojson (via the cached
+geometry store), which carry SUBZONE_N, PLN_AREA_N and REGION_N, instead of
+one OneMap getPlanningarea request per record. Lookups are vectorized:
+
+    geocoder = ReverseGeocoder()
+    result = geocoder.lookup(lats, lons)
+    result["planning_area"][i]       # None where no subzone contains the point
+
+Points just off the coastline (piers, reclaimed land newer than the 2019
+boundaries) fall outside every polygon; with snap_m > 0 they take the nearest
+subzone within that many metres.
+
+    python reverse_geocoder.py --report      # agreement with establishments.csv
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from geometry_store import load_store
+from spatial_join import SubzoneIndex
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ESTABLISHMENTS_CSV = os.path.join(os.path.dirname(os.path.dirname(HERE)), "supabase_setup", "data", "establishments.csv")
+
+# Metres per degree of latitude; longitude degrees shrink by cos(lat), ~1% at 1.35°N
+METRES_PER_DEGREE = 111_320
+SNAP_M = float(os.getenv("GEOCODER_SNAP_M", "100"))
+
+
+class ReverseGeocoder:
+    def __init__(self, store=None, snap_m: float = SNAP_M):
+        self.store = store if store is not None else load_store()
+        self.index = SubzoneIndex.from_store(self.store)
+        self.snap_m = snap_m
+        self._subzones = np.asarray(self.store.names, dtype=object)
+        self._planning_areas = np.asarray(self.store.planning_areas, dtype=object)
+        self._regions = np.asarray(self.store.regions, dtype=object)
+
+    def rows(self, lats, lons) -> np.ndarray:
+        """Store row of each point (-1 if unplaced), snapping to the nearest subzone within snap_m."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows = self.index.lookup(lons, lats)
+        missing = np.flatnonzero((rows < 0) & np.isfinite(lats) & np.isfinite(lons))
+        if self.snap_m > 0 and len(missing):
+            import shapely
+            pts = shapely.points(lons[missing], lats[missing])
+            pt_idx, geom_idx = self.index.tree.query_nearest(
+                pts, max_distance=self.snap_m / METRES_PER_DEGREE, all_matches=False
+            )
+            rows[missing[pt_idx]] = geom_idx
+        return rows
+
+    def lookup(self, lats, lons) -> dict:
+        """{"subzone", "planning_area", "region"}: object arrays aligned with the input."""
+        rows = self.rows(lats, lons)
+        found = rows >= 0
+        out = {}
+        for key, values in (("subzone", self._subzones), ("planning_area", self._planning_areas),
+                            ("region", self._regions)):
+            col = np.full(len(rows), None, dtype=object)
+            col[found] = values[rows[found]]
+            out[key] = col
+        return out
+
+    def planning_area(self, lat, lon):
+        """Single-point convenience, a drop-in for the OneMap getPlanningarea call."""
+        return self.lookup([lat], [lon])["planning_area"][0]
+
+
+# ─── Accuracy report ──────────────────────────────────────────────────────────
+def _norm(values):
+    return np.array([str(v).strip().upper() if isinstance(v, str) and v.strip() else None for v in values],
+                    dtype=object)
+
+
+def accuracy_report(path: str = ESTABLISHMENTS_CSV, snap_m: float = SNAP_M) -> dict:
+    """Agreement of the local geocoder with the subzone / planning area / region stored per establishment."""
+    import pandas as pd
+
+    df = pd.read_csv(path, usecols=["latitude", "longitude", "subzone", "planning_area", "region"])
+    geocoder = ReverseGeocoder(snap_m=snap_m)
+    start = time.perf_counter()
+    got = geocoder.lookup(df["latitude"], df["longitude"])
+    seconds = time.perf_counter() - start
+    print(f"🔍 Geocoded {len(df):,} establishments in {seconds*1000:.0f} ms "
+          f"({len(df) / seconds:,.0f} points/s), snap {snap_m:g} m")
+    placed = np.array([v is not None for v in got["subzone"]])
+    print(f"   • {int(placed.sum()):,} placed, {int((~placed).sum()):,} outside every subzone")
+
+    report = {"points": len(df), "placed": int(placed.sum()), "seconds": seconds}
+    for key in ("subzone", "planning_area", "region"):
+        stored = _norm(df[key])
+        ours = _norm(got[key])
+        known = np.array([v is not None for v in stored])
+        agree = known & (stored == ours)
+        report[key] = {"compared": int(known.sum()), "agree": int(agree.sum())}
+        pct = 100 * agree.sum() / max(1, known.sum())
+        print(f"   • {key}: {int(agree.sum()):,} / {int(known.sum()):,} agree ({pct:.1f}%)")
+        wrong = pd.Series([f"{s} → {o}" for s, o in zip(stored[known & ~agree], ours[known & ~agree])])
+        for pair, n in wrong.value_counts().head(5).items():
+            print(f"       {n:>4} × {pair}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline reverse geocoder")
+    parser.add_argument("--report", action="store_true", help="accuracy against establishments.csv")
+    parser.add_argument("--snap-m", type=float, default=SNAP_M)
+    parser.add_argument("point", nargs="*", type=float, help="lat lon")
+    opts = parser.parse_args()
+    if opts.report:
+        accuracy_report(snap_m=opts.snap_m)
+    elif len(opts.point) == 2:
+        res = ReverseGeocoder(snap_m=opts.snap_m).lookup([opts.point[0]], [opts.point[1]])
+        print({k: v[0] for k, v in res.items()})
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
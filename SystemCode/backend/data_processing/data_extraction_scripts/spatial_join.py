@@ -0,0 +1,208 @@
+"""
+Point-in-subzone assignment over the planning_areas boundaries.
+
+The subzone polygons are built once (holes and every MultiPolygon part
+included) and indexed in a shapely 2.0 STRtree. assign() then maps all points
+to subzones in one bulk call: the tree narrows each point to the polygons
+whose bounding box contains it, and shapely.contains_xy runs the exact test
+for all candidate pairs against prepared geometries.
+This replaces looping over every polygon with shape.contains(point) per point.
+
+    index = SubzoneIndex.from_store()            # or .from_rows(planning_areas rows)
+    subzones = index.assign(lons, lats)          # None where no subzone contains the point
+
+As before, a point on a shared boundary belongs to neither side (contains()
+excludes the boundary), and where subzones overlap the first row wins.
+
+    python spatial_join.py --benchmark           # 53k points: per-polygon loop vs STRtree
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import shapely
+from shapely import MultiPolygon, Polygon, STRtree
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PLANNING_AREAS_CSV = os.path.join(os.path.dirname(os.path.dirname(HERE)), "supabase_setup", "data", "planning_areas.csv")
+LISTINGS_CSV = os.path.join(os.path.dirname(os.path.dirname(HERE)), "supabase_setup", "data", "industrial_properties.csv")
+
+
+def _ring(coords):
+    return [(lng, lat) for lng, lat, *_ in coords]
+
+
+def _polygon(rings):
+    """GeoJSON polygon rings (outer first, then holes) → Polygon."""
+    return Polygon(_ring(rings[0]), [_ring(r) for r in rings[1:] if len(r) >= 4])
+
+
+def area_geometry(geometry_type: str, coordinates):
+    """planning_areas row geometry (coordinates as stored: JSON text or lists) → shapely geometry."""
+    coords = json.loads(coordinates) if isinstance(coordinates, str) else coordinates
+    if not coords or not coords[0]:
+        return None
+    if geometry_type == "Polygon":
+        geom = _polygon(coords)
+    else:
+        geom = MultiPolygon([_polygon(part) for part in coords if part and part[0]])
+    # Self-touching rings in the source data would make contains() unreliable
+    return geom if geom.is_valid else shapely.make_valid(geom)
+
+
+class SubzoneIndex:
+    def __init__(self, geometries, names):
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        shapely.prepare(self.geometries)  # no-op for already prepared geometries
+        self.tree = STRtree(self.geometries)
+
+    @classmethod
+    def from_rows(cls, rows, name_key: str = "subzone"):
+        """Build from planning_areas rows (subzone, geometry_type, coordinates)."""
+        geoms, names = [], []
+        for row in rows:
+            try:
+                geom = area_geometry(row["geometry_type"], row["coordinates"])
+            except Exception as e:
+                print(f"Error parsing polygon for {row.get(name_key)}: {e}")
+                continue
+            if geom is not None and not geom.is_empty:
+                geoms.append(geom)
+                names.append(row[name_key])
+        return cls(geoms, names)
+
+    @classmethod
+    def from_store(cls, store=None):
+        """Build from the cached WKB geometry store (geometry_store.load_store())."""
+        if store is None:
+            from geometry_store import load_store
+            store = load_store()
+        return cls(store.geometries(), store.names)
+
+    @classmethod
+    def from_csv(cls, path: str = PLANNING_AREAS_CSV):
+        import pandas as pd
+        return cls.from_rows(pd.read_csv(path).to_dict("records"))
+
+    def lookup(self, lons, lats) -> np.ndarray:
+        """Index into .names of the subzone containing each point; -1 where none does."""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        out = np.full(len(lons), -1, dtype=np.intp)
+        valid = np.isfinite(lons) & np.isfinite(lats)
+        if not valid.any():
+            return out
+        x, y = lons[valid], lats[valid]
+        # Bounding-box candidates from the tree, then the exact test on the prepared polygons
+        pt_idx, geom_idx = self.tree.query(shapely.points(x, y))
+        hit = shapely.contains_xy(self.geometries[geom_idx], x[pt_idx], y[pt_idx])
+        pt_idx, geom_idx = pt_idx[hit], geom_idx[hit]
+        # Lowest geometry index per point: the first matching row, like the old loop
+        order = np.lexsort((geom_idx, pt_idx))
+        pt_idx, geom_idx = pt_idx[order], geom_idx[order]
+        first = np.ones(len(pt_idx), dtype=bool)
+        first[1:] = pt_idx[1:] != pt_idx[:-1]
+        out[np.flatnonzero(valid)[pt_idx[first]]] = geom_idx[first]
+        return out
+
+    def assign(self, lons, lats) -> list:
+        """Subzone name for each point; None where no subzone contains it."""
+        idx = self.lookup(lons, lats)
+        return [self.names[i] if i >= 0 else None for i in idx]
+
+
+# ─── Benchmark ────────────────────────────────────────────────────────────────
+def _loop_assign(shapes, lons, lats):
+    """The per-point, per-polygon loop the extraction scripts used (outer rings only)."""
+    from shapely.geometry import Point
+    out = []
+    for lon, lat in zip(lons, lats):
+        point = Point(lon, lat)
+        match = None
+        for shape, name in shapes:
+            if shape.contains(point):
+                match = name
+                break
+        out.append(match)
+    return out
+
+
+def _outer_ring_shapes(rows):
+    shapes = []
+    for row in rows:
+        coords = json.loads(row["coordinates"])
+        if not coords or not coords[0]:
+            continue
+        if row["geometry_type"] == "Polygon":
+            shapes.append((Polygon(_ring(coords[0])), row["subzone"]))
+        else:
+            shapes.append((MultiPolygon([Polygon(_ring(p[0])) for p in coords if p]), row["subzone"]))
+    return shapes
+
+
+def benchmark(n_points: int = 53_000, loop_sample: int = 2_000, seed: int = 0):
+    import pandas as pd
+
+    rows = pd.read_csv(PLANNING_AREAS_CSV).to_dict("records")
+    listings = pd.read_csv(LISTINGS_CSV, usecols=["latitude", "longitude", "subzone"]).dropna(
+        subset=["latitude", "longitude"])
+    # Resample the listings' coordinates with ~100 m of jitter up to n_points
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(listings), n_points)
+    lons = listings["longitude"].to_numpy()[pick] + rng.normal(0, 0.001, n_points)
+    lats = listings["latitude"].to_numpy()[pick] + rng.normal(0, 0.001, n_points)
+    print(f"🔍 {len(rows)} subzones, {n_points:,} points resampled from {len(listings):,} listings")
+
+    start = time.perf_counter()
+    index = SubzoneIndex.from_rows(rows)
+    build_s = time.perf_counter() - start
+    from geometry_store import load_store
+    start = time.perf_counter()
+    SubzoneIndex.from_store(load_store())
+    print(f"   • index from planning_areas rows {build_s*1000:.0f} ms, "
+          f"from the WKB store {(time.perf_counter() - start)*1000:.0f} ms")
+    start = time.perf_counter()
+    tree_idx = index.lookup(lons, lats)
+    tree_s = time.perf_counter() - start
+    print(f"   • STRtree join {tree_s*1000:.0f} ms "
+          f"({n_points / tree_s:,.0f} points/s), {int((tree_idx >= 0).sum()):,} matched")
+
+    shapes = _outer_ring_shapes(rows)
+    sample = slice(0, min(loop_sample, n_points))
+    start = time.perf_counter()
+    loop = _loop_assign(shapes, lons[sample], lats[sample])
+    loop_s = time.perf_counter() - start
+    per_point = loop_s / len(loop)
+    print(f"   • per-polygon loop: {loop_s:.2f}s for {len(loop):,} points → "
+          f"~{per_point * n_points:.0f}s for all {n_points:,} ({per_point * n_points / tree_s:,.0f}× slower)")
+
+    tree_names = [index.names[i] if i >= 0 else None for i in tree_idx[sample]]
+    differ = sum(a != b for a, b in zip(loop, tree_names))
+    print(f"   • {differ} of {len(loop):,} sampled points assigned differently (holes and invalid rings)")
+
+    stored = listings["subzone"].to_numpy()
+    real = index.assign(listings["longitude"], listings["latitude"])
+    known = [s for s in stored if isinstance(s, str)]
+    agree = sum(isinstance(s, str) and s == r for s, r in zip(stored, real))
+    print(f"   • {agree:,} of {len(known):,} stored listing subzones reproduced")
+    return {"build_s": build_s, "join_s": tree_s, "loop_s_per_point": per_point, "differ": differ}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-subzone spatial join")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--points", type=int, default=53_000)
+    parser.add_argument("--loop-sample", type=int, default=2_000)
+    opts = parser.parse_args()
+    if opts.benchmark:
+        benchmark(opts.points, opts.loop_sample)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
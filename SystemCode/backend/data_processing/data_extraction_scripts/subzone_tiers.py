@@ -0,0 +1,296 @@
+"""
+Simplification tiers of the subzone polygons, with shared borders kept shared.
+
+Every consumer of the geometry store decodes the full-resolution subzone
+polygons (~59k vertices) even when it only needs a map outline or a coarse
+point-in-polygon answer. Simplifying each polygon on its own (shapely.simplify,
+as map_layers.py used to) moves the two sides of a shared border differently,
+leaving gaps and overlaps between neighbours. Here the subzones are treated as
+one coverage: shapely.coverage_clean first makes shared edges identical (the
+source has a few mismatched vertices), then shapely.coverage_simplify
+simplifies every shared edge once for both sides, in local metres.
+
+    TIERS         exact        the geometry store as built from the source
+                  5m, 25m      coverage-simplified at that tolerance
+
+Each tier is a geometry store of its own (subzones-<hash>-<tier>.geo in
+GEOMETRY_CACHE, built on first use) whose header records, against the exact
+polygons:
+
+    vertices         total vertex count
+    area_error       symmetric-difference area / total area
+    max_area_error   largest per-subzone relative area change
+    max_shift_m      largest boundary displacement (Hausdorff distance)
+    shift_m          the displacement per subzone
+
+Consumers pick the cheapest tier whose recorded error meets their need. On
+the current boundaries the 25m tier drops coastline spits on the southern
+islands (max_shift_m 182.7 m), so a shift limit usually lands on 5m:
+
+    pick_tier(max_area_error=0.03)               # "25m" (largest per-subzone change 2.1%)
+    pick_tier(max_shift_m=50)                    # "5m"  (21.5 m)
+    store = load_tier("25m")
+
+TieredSubzoneIndex answers point-in-polygon on a simplified tier and re-tests
+points near a simplified boundary against the exact polygons, so its answers
+match the exact SubzoneIndex. It is not faster: a prepared exact SubzoneIndex
+is already cheap per point, and the boundary test and re-tests add to that
+(~150-190 ms against ~70-100 ms for 53k points in --benchmark). The
+point-in-polygon scripts therefore keep the exact index.
+
+    python subzone_tiers.py                      # build the tiers and print their stats
+    python subzone_tiers.py --benchmark          # exact vs tiered point-in-polygon
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from geometry_store import CACHE_DIR, SUBZONE_GEOJSON, build, file_hash, load_store, GeometryStore
+
+# Tier name → coverage simplification tolerance in metres; exact is the source store
+TIERS = {"exact": 0.0, "5m": 5.0, "25m": 25.0}
+
+# Equirectangular metres around Singapore's latitude; < 0.1% error across the island
+METRES_PER_DEGREE = 111_320
+LAT0 = 1.35
+KX = METRES_PER_DEGREE * np.cos(np.radians(LAT0))
+# Slack on the boundary band for coverage cleaning and round-off, in metres
+BAND_SLACK_M = 1.0
+
+
+def _to_metres(geoms):
+    import shapely
+    return shapely.transform(geoms, lambda xy: xy * [KX, METRES_PER_DEGREE])
+
+
+def _to_degrees(geoms):
+    import shapely
+    return shapely.transform(geoms, lambda xy: xy / [KX, METRES_PER_DEGREE])
+
+
+# ─── Build ────────────────────────────────────────────────────────────────────
+def simplify_coverage(geoms, tolerance_m: float) -> np.ndarray:
+    """Coverage-simplified copies of `geoms` (lon/lat), shared edges simplified once."""
+    import shapely
+
+    metric = _to_metres(geoms)
+    # Snapping off: only make shared edges identical and resolve the tiny overlaps
+    cleaned = shapely.coverage_clean(metric, snapping_distance=0)
+    simplified = shapely.coverage_simplify(cleaned, tolerance_m) if tolerance_m > 0 else cleaned
+    # A subzone simplified away entirely keeps its cleaned outline
+    empty = shapely.is_empty(simplified)
+    simplified[empty] = cleaned[empty]
+    return _to_degrees(simplified)
+
+
+def tier_stats(exact, simplified) -> dict:
+    """Vertex count and area / boundary error of `simplified` against `exact`."""
+    import shapely
+
+    exact_m, simple_m = _to_metres(exact), _to_metres(simplified)
+    area = shapely.area(exact_m)
+    diff = shapely.area(shapely.symmetric_difference(exact_m, simple_m))
+    shift = shapely.hausdorff_distance(exact_m, simple_m)
+    return {
+        "vertices": int(shapely.get_num_coordinates(simplified).sum()),
+        "area_error": float(diff.sum() / area.sum()),
+        "max_area_error": float(np.max(np.abs(shapely.area(simple_m) - area) / area)),
+        "max_shift_m": float(shift.max()),
+        "shift_m": np.round(shift, 3).tolist(),
+    }
+
+
+def tier_path(tier: str, source: str = SUBZONE_GEOJSON, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"subzones-{file_hash(source)}-{tier}.geo")
+
+
+def build_tier(tier: str, exact_store: GeometryStore, path: str) -> str:
+    import shapely
+
+    exact = exact_store.geometries()
+    tolerance = TIERS[tier]
+    start = time.perf_counter()
+    simplified = simplify_coverage(exact, tolerance)
+    seconds = time.perf_counter() - start
+    rows = []
+    for i, geometry in enumerate(shapely.to_geojson(simplified)):
+        geometry = json.loads(geometry)
+        rows.append({
+            "subzone": exact_store.names[i], "planning_area": exact_store.planning_areas[i],
+            "region": exact_store.regions[i], "geometry_type": geometry["type"],
+            "coordinates": geometry["coordinates"],
+        })
+    meta = {"tier": tier, "tolerance_m": tolerance, "seconds": round(seconds, 3),
+            **tier_stats(exact, simplified)}
+    return build(rows, path, source_hash=exact_store.source_hash, meta=meta)
+
+
+# ─── Load / pick ──────────────────────────────────────────────────────────────
+_tiers = {}
+
+
+def load_tier(tier: str, source: str = SUBZONE_GEOJSON, cache_dir: str = CACHE_DIR) -> GeometryStore:
+    """Geometry store of `tier` for `source`, built on first use of each content hash."""
+    if tier not in TIERS:
+        raise ValueError(f"Unknown tier {tier!r}; expected one of {list(TIERS)}")
+    exact = load_store(source, cache_dir)
+    if tier == "exact":
+        if not exact.meta:
+            import shapely
+            exact.meta = {
+                "tier": "exact", "tolerance_m": 0.0,
+                "vertices": int(shapely.get_num_coordinates(exact.geometries()).sum()),
+                "area_error": 0.0, "max_area_error": 0.0, "max_shift_m": 0.0, "shift_m": [0.0] * len(exact),
+            }
+        return exact
+    path = tier_path(tier, source, cache_dir)
+    if path in _tiers:
+        return _tiers[path]
+    if not os.path.exists(path):
+        build_tier(tier, exact, path)
+        print(f"✅ Built {tier} subzone tier {path}")
+    _tiers[path] = GeometryStore(path)
+    return _tiers[path]
+
+
+def tier_table(source: str = SUBZONE_GEOJSON, cache_dir: str = CACHE_DIR) -> list:
+    """Stats of every tier, finest first."""
+    return [
+        {k: v for k, v in load_tier(tier, source, cache_dir).meta.items() if k != "shift_m"}
+        for tier in TIERS
+    ]
+
+
+def pick_tier(max_shift_m: float = None, max_area_error: float = None,
+              source: str = SUBZONE_GEOJSON, cache_dir: str = CACHE_DIR) -> str:
+    """Cheapest tier (fewest vertices) whose recorded errors are within the given limits."""
+    ok = [
+        t for t in tier_table(source, cache_dir)
+        if (max_shift_m is None or t["max_shift_m"] <= max_shift_m)
+        and (max_area_error is None or t["max_area_error"] <= max_area_error)
+    ]
+    return min(ok, key=lambda t: t["vertices"])["tier"]
+
+
+# ─── Point-in-polygon ─────────────────────────────────────────────────────────
+class TieredSubzoneIndex:
+    """SubzoneIndex over a simplified tier, with the exact polygons as tie-breaker.
+
+    A point is settled by the simplified polygons unless it is within its
+    subzone's boundary shift (+ BAND_SLACK_M) of the simplified boundary, or in
+    no simplified subzone; those points alone are looked up again exactly. The
+    band is tested against the envelopes of the boundary segments, each grown
+    by its subzone's band, so it may re-test a few more points than needed
+    but never misses one.
+
+    Slower than the exact SubzoneIndex for bulk lookups (see --benchmark);
+    nothing in the pipeline uses it.
+    """
+
+    def __init__(self, tier: str = "25m", source: str = SUBZONE_GEOJSON, cache_dir: str = CACHE_DIR):
+        import shapely
+        from spatial_join import SubzoneIndex
+
+        self.tier = tier
+        self.store = load_tier(tier, source, cache_dir)
+        self.exact_store = load_store(source, cache_dir)
+        self.names = np.asarray(self.store.names, dtype=object)
+        self.index = SubzoneIndex.from_store(self.store)
+        # Shift in metres → degrees of longitude, the shorter way, so the band only widens
+        band = (np.asarray(self.store.meta["shift_m"]) + BAND_SLACK_M) / KX
+        xy, row = shapely.get_coordinates(shapely.boundary(self.store.geometries()), return_index=True)
+        # Consecutive coordinates of the same boundary are a segment (ring closures repeat a vertex)
+        seg = np.flatnonzero(row[1:] == row[:-1])
+        a, b, pad = xy[seg], xy[seg + 1], band[row[seg]]
+        self.band_tree = shapely.STRtree(shapely.box(
+            np.minimum(a[:, 0], b[:, 0]) - pad, np.minimum(a[:, 1], b[:, 1]) - pad,
+            np.maximum(a[:, 0], b[:, 0]) + pad, np.maximum(a[:, 1], b[:, 1]) + pad,
+        ))
+        self._exact = None
+
+    @property
+    def exact(self):
+        if self._exact is None:
+            from spatial_join import SubzoneIndex
+            self._exact = SubzoneIndex.from_store(self.exact_store)
+        return self._exact
+
+    def lookup(self, lons, lats, return_checked: bool = False):
+        """Row of the subzone containing each point (-1 where none does), as SubzoneIndex.lookup."""
+        import shapely
+
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        rows = self.index.lookup(lons, lats)
+        check = rows < 0
+        inside = np.flatnonzero(~check)
+        near, _ = self.band_tree.query(shapely.points(lons[inside], lats[inside]))
+        check[inside[near]] = True
+        # The exact lookup already returns -1 for points without coordinates
+        if check.any():
+            rows[check] = self.exact.lookup(lons[check], lats[check])
+        return (rows, check) if return_checked else rows
+
+    def assign(self, lons, lats) -> list:
+        idx = self.lookup(lons, lats)
+        return [self.names[i] if i >= 0 else None for i in idx]
+
+
+# ─── Benchmark ────────────────────────────────────────────────────────────────
+def benchmark(n_points: int = 53_000, seed: int = 0):
+    import pandas as pd
+    from spatial_join import LISTINGS_CSV, SubzoneIndex
+
+    listings = pd.read_csv(LISTINGS_CSV, usecols=["latitude", "longitude"]).dropna()
+    # Resample the listings' coordinates with ~100 m of jitter, as spatial_join.py does
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(listings), n_points)
+    lons = listings["longitude"].to_numpy()[pick] + rng.normal(0, 0.001, n_points)
+    lats = listings["latitude"].to_numpy()[pick] + rng.normal(0, 0.001, n_points)
+
+    exact_store = load_store()
+    start = time.perf_counter()
+    exact = SubzoneIndex.from_store(exact_store)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = exact.lookup(lons, lats)
+    exact_s = time.perf_counter() - start
+    print(f"🔍 {n_points:,} points resampled from {len(listings):,} listings")
+    print(f"   • exact: index {build_s*1000:.0f} ms, lookup {exact_s*1000:.0f} ms")
+    for tier in TIERS:
+        if tier == "exact":
+            continue
+        start = time.perf_counter()
+        index = TieredSubzoneIndex(tier)
+        _ = index.exact
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        rows, checked = index.lookup(lons, lats, return_checked=True)
+        lookup_s = time.perf_counter() - start
+        start = time.perf_counter()
+        coarse = index.index.lookup(lons, lats)
+        coarse_s = time.perf_counter() - start
+        print(f"   • {tier}: index {build_s*1000:.0f} ms, lookup {lookup_s*1000:.0f} ms "
+              f"({int(checked.sum()):,} points re-tested exactly, {int((rows != expected).sum())} differ from exact); "
+              f"simplified alone {coarse_s*1000:.0f} ms, {int((coarse != expected).sum())} differ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subzone polygon simplification tiers")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--points", type=int, default=53_000)
+    opts = parser.parse_args()
+    if opts.benchmark:
+        benchmark(opts.points)
+        return
+    for t in tier_table():
+        print(f"   • {t['tier']:<6} {t['vertices']:>7,} vertices, area error {t['area_error']:.2e} "
+              f"(max {t['max_area_error']:.2e} per subzone), max boundary shift {t['max_shift_m']:.1f} m")
+
+
+if __name__ == "__main__":
+    main()
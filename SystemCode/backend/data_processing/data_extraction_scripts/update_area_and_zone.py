@@ -3,10 +3,10 @@ import json
 import os
 import uuid
 import requests
-from shapely import MultiPolygon
 from supabase import ClientOptions, create_client, Client
 from dotenv import load_dotenv
-from shapely.geometry import Point, Polygon
+from reverse_geocoder import ReverseGeocoder
+from kg_snapshot import invalidate
 
 # --- Replace these with your actual credentials ---
 dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
@@ -22,7 +22,6 @@ print("connected to DB")
 ONEMAP_TOKEN = os.getenv("ONEMAP_TOKEN")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-area_polygons = []
 
 def get_planning_area(lat, lon):
     url = f"https://www.onemap.gov.sg/api/public/popapi/getPlanningarea?latitude={lat}&longitude={lon}&year=2019"
@@ -50,23 +49,31 @@ def update_planning_area(property_id, planning_area):
     return response
 
 def main():
+    # Planning areas and subzones come from the local subzone polygons (cached WKB geometry
+    # store) in one bulk lookup; OneMap is only asked about points outside every polygon
+    geocoder = ReverseGeocoder()
+    print("Formed polygons for all areas")
+
     # Step 1: Get all records from industrial_properties
     records = supabase.table("industrial_properties").select("property_id, latitude, longitude").is_("planning_area","null").execute()
 
     if not records.data:
         print("No records found with null planning areas.")
 
+    located = [r for r in records.data if r.get("latitude") is not None and r.get("longitude") is not None]
     for record in records.data:
-        prop_id = record["property_id"]
-        lat = record.get("latitude")
-        lon = record.get("longitude")
+        if record.get("latitude") is None or record.get("longitude") is None:
+            print(f"Skipping property_id {record['property_id']} due to missing coordinates.")
 
-        if lat is None or lon is None:
-            print(f"Skipping property_id {prop_id} due to missing coordinates.")
-            continue
+    # Step 2: Reverse geocode all of them at once
+    areas = geocoder.lookup([r["latitude"] for r in located], [r["longitude"] for r in located])["planning_area"]
+    for record, planning_area in zip(located, areas):
+        prop_id = record["property_id"]
+        lat = record["latitude"]
+        lon = record["longitude"]
 
-        # Step 2: Get planning area from OneMap
-        planning_area = get_planning_area(lat, lon)
+        if planning_area is None:
+            planning_area = get_planning_area(lat, lon)
 
         if planning_area:
             print(f"Updating property_id {prop_id} with planning area: {planning_area}")
@@ -75,39 +82,6 @@ def main():
             print(f"No planning area found for property_id {prop_id} (lat: {lat}, lon: {lon})")
 
     # Step 3 populate subzones
-
-    planning_areas_resp = (
-        supabase.table("planning_areas")
-        .select("subzone, planning_area, geometry_type, coordinates")
-        .execute()
-    )
-    planning_areas = planning_areas_resp.data
-
-    print("Retrieved planning areas")
-
-    for area in planning_areas:
-        try:
-            coords_raw = json.loads(area["coordinates"])
-            if not coords_raw or not coords_raw[0]:
-                continue
-            if (area["geometry_type"] == "Polygon"):
-                polygon = Polygon([(lng, lat) for lng, lat, *_ in coords_raw[0]])
-                area_polygons.append((polygon, area["subzone"]))
-            else: #Multi polygon
-                polygons = []
-                for part in coords_raw:
-                    if not part:
-                        continue
-                    # part[0] is usually the outer ring; ignore holes for now
-                    poly = Polygon([(lng, lat) for lng, lat, *_ in part[0]])
-                    polygons.append(poly)
-                multi = MultiPolygon(polygons)
-                area_polygons.append((multi, area["subzone"]))
-        except Exception as e:
-            print(f"Error parsing polygon for {area['subzone']}: {e}")
-
-    print("Formed polygons for all areas")
-
     properties_resp = supabase.table("industrial_properties").select("property_id, latitude, longitude, planning_area").is_("subzone","null").execute()
     properties = properties_resp.data
     updates = []
@@ -115,15 +89,8 @@ def main():
         print("No records found with null subzones.")
         return
    
-    for prop in properties:
-        point = Point(prop["longitude"], prop["latitude"])
-        matched_subzone = None
-
-        for shape, subzone in area_polygons:
-            if shape.contains(point):
-                matched_subzone = subzone
-                break
-
+    subzones = geocoder.lookup([p["latitude"] for p in properties], [p["longitude"] for p in properties])["subzone"]
+    for prop, matched_subzone in zip(properties, subzones):
         if matched_subzone:
             updates.append({
                 "property_id": prop["property_id"],
@@ -139,4 +106,8 @@ def main():
         print(f"Updated id {id} with subzone {sz}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Rows were written in place, possibly only some of them
+        invalidate("industrial_properties")
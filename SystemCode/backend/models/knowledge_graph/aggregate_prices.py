@@ -1,17 +1,15 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
+import snapshot
 
-def fetch_industrial_properties(supabase: Client):
+def fetch_industrial_properties():
     """
-    Retrieve all records from the industrial_properties table.
+    Retrieve all records from the industrial_properties table (local snapshot cache).
     """
-    response = supabase.table("industrial_properties").select("*").execute()
-    # Convert the Pydantic model to a dict
-    response_dict = response.dict()
-    if response_dict.get("error"):
-        raise Exception(f"Error fetching data: {response_dict.get('error')}")
-    return response_dict.get("data")
+    return snapshot.fetch_records(
+        "industrial_properties", ["subzone", "sub_category", "listing_type", "price"]
+    )
 
 def calculate_average_prices(records):
     """
@@ -54,12 +52,16 @@ def calculate_average_prices(records):
 def insert_aggregated_data(supabase: Client, data):
     """
     Inserts the aggregated average pricing data into a new table (avg_industrial_prices).
+    Upserts on the primary key so the pipeline can re-run this step.
     """
-    response = supabase.table("avg_industrial_prices").insert(data).execute()
+    response = supabase.table("avg_industrial_prices") \
+        .upsert(data, on_conflict="subzone,sub_category,listing_type") \
+        .execute()
     # Convert the response to a dict for safe access
     response_dict = response.dict()
     if response_dict.get("error"):
         raise Exception(f"Error inserting aggregated data: {response_dict.get('error')}")
+    snapshot.invalidate("avg_industrial_prices")
     print("Aggregated data successfully inserted into avg_industrial_prices.")
 
 def main():
@@ -72,7 +74,7 @@ def main():
 
     # Fetch records from industrial_properties
     print("Fetching industrial_properties records...")
-    records = fetch_industrial_properties(supabase)
+    records = fetch_industrial_properties()
 
     # Calculate averages by grouping records (by subzone, sub_category, listing_type)
     print("Calculating average prices...")
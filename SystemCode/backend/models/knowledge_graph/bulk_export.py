@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Offline graph build: write the knowledge graph as `neo4j-admin database import`
+CSVs instead of MERGE-ing it over Bolt one row at a time.
+
+Rows come from Supabase or from the supabase_setup/data dumps and go through
+the same normalisation as graph_builder.py (see graph_schema.py), so the
+imported graph matches a Bolt-built one. Typical use:
+
+    python bulk_export.py --source csv --out import_csv
+    neo4j-admin database import full <printed --nodes/--relationships flags> neo4j
+
+    # after a Bolt build, check both paths agree
+    python bulk_export.py --source csv --out import_csv --parity
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+from graph_schema import (
+    normalise_subzone, clean_props, is_competitor, is_filtered_property,
+    group_average_prices, industrial_property_props
+)
+import supabase_csv
+
+# Order matches the tuple returned by graph_builder.fetch_supabase_data()
+TABLE_ORDER = [
+    "planning_areas", "venue_types", "establishments", "competitor_stats",
+    "demographics_age_group", "demographics_housing_types", "demographics_population",
+    "industrial_properties", "avg_industrial_prices",
+]
+
+# Properties that identify a node, used by the parity check
+NODE_KEYS = {
+    "PlanningArea":       ("subzone",),
+    "VenueType":          ("type_name",),
+    "Competitor":         ("venue_name", "subzone"),
+    "CompetitorStats":    ("subzone", "venue_type"),
+    "AgeDistribution":    ("subzone",),
+    "HousingProfile":     ("subzone",),
+    "PopulationStats":    ("subzone",),
+    "PropertiesAvailable": ("subzone",),
+    "IndustrialProperty": ("property_id",),
+}
+
+
+# ─── Loading ────────────────────────────────────────────────────────────────────
+def load_tables(source="csv", data_dir=supabase_csv.DATA_DIR):
+    """Return the nine tables in graph_builder.fetch_supabase_data() order."""
+    if source == "supabase":
+        from graph_builder import fetch_supabase_data
+        return fetch_supabase_data()
+    tables = []
+    for name in TABLE_ORDER:
+        rows = supabase_csv.read_table(name, data_dir)
+        print(f"   ↳ Read {len(rows)} rows from {name}.csv")
+        tables.append(rows)
+    return tuple(tables)
+
+
+# ─── In-memory graph mirroring graph_builder's MERGE semantics ────────────────
+class GraphExport:
+    """Nodes keyed like graph_builder's MERGE patterns, plus deduplicated relationships."""
+
+    def __init__(self):
+        self.nodes = {}   # label -> {key: props}
+        self.rels = {}    # rel type -> (start label, end label, set of (start key, end key))
+
+    def merge_node(self, label, key, props=None):
+        node = self.nodes.setdefault(label, {}).setdefault(key, {})
+        if props:
+            node.update(props)
+        return node
+
+    def has_node(self, label, key):
+        return key in self.nodes.get(label, {})
+
+    def merge_rel(self, rel_type, start_label, start_key, end_label, end_key):
+        # graph_builder MATCHes both ends first, so a missing endpoint means no edge
+        if not (self.has_node(start_label, start_key) and self.has_node(end_label, end_key)):
+            return
+        entry = self.rels.setdefault(rel_type, (start_label, end_label, set()))
+        entry[2].add((start_key, end_key))
+
+    def counts(self):
+        return (
+            {label: len(nodes) for label, nodes in self.nodes.items()},
+            {rel_type: len(pairs) for rel_type, (_, _, pairs) in self.rels.items()},
+        )
+
+
+def build_export(planning_areas, venue_types, competitor_data, competitor_stats,
+                 demographics_age, demographics_housing, demographics_pop,
+                 industrial_props, avg_industrial_prices):
+    """Apply graph_builder's node/relationship rules to the raw table rows."""
+    g = GraphExport()
+
+    for pa in planning_areas:
+        if pa.get("subzone"):
+            sz = normalise_subzone(pa["subzone"])
+            g.merge_node("PlanningArea", sz, {"subzone": sz})
+
+    for vt in venue_types:
+        t = vt.get("type_name")
+        if t:
+            g.merge_node("VenueType", t, {"type_name": t})
+
+    for cd in competitor_data:
+        name = cd.get("venue_name")
+        if not is_competitor(name):
+            continue
+        sz = normalise_subzone(cd.get("subzone"))
+        if not sz:
+            # MERGE on a null subzone fails in Neo4j, so the Bolt build never has these
+            continue
+        key = (name, sz)
+        g.merge_node("Competitor", key, {"venue_name": name, "subzone": sz})
+        g.merge_rel("LOCATED_IN", "Competitor", key, "PlanningArea", sz)
+        if cd.get("venue_type"):
+            g.merge_rel("OF_TYPE", "Competitor", key, "VenueType", cd["venue_type"])
+
+    for rec in competitor_stats:
+        subzone, vt = rec.get("subzone"), rec.get("venue_type")
+        if not (subzone and vt):
+            continue
+        sz = normalise_subzone(subzone)
+        key = (sz, vt)
+        g.merge_node("CompetitorStats", key, {
+            "subzone": sz,
+            "venue_type": vt,
+            "overall_score": rec.get("overall_score"),
+            "density": rec.get("competitor_density"),
+            "competitor_count": rec.get("competitor_count"),
+            "name": f"Stats for {sz} {vt}",
+        })
+        g.merge_rel("HAS_COMPETITOR_STATS", "PlanningArea", sz, "CompetitorStats", key)
+        g.merge_rel("FOR_TYPE", "CompetitorStats", key, "VenueType", vt)
+
+    demographic_tables = [
+        ("AgeDistribution", "HAS_AGE_DISTRIBUTION", "Age Dist for ", demographics_age),
+        ("HousingProfile", "HAS_HOUSING_PROFILE", "Housing Prof for ", demographics_housing),
+        ("PopulationStats", "HAS_POPULATION_STATS", "Pop Stats for ", demographics_pop),
+    ]
+    for label, rel_type, prefix, rows in demographic_tables:
+        for rec in rows:
+            props = clean_props(rec)
+            if not props.get("subzone"):
+                continue
+            sz = normalise_subzone(props["subzone"])
+            g.merge_node(label, sz, {**props, "name": prefix + sz})
+            g.merge_rel(rel_type, "PlanningArea", sz, label, sz)
+
+    for rec in industrial_props:
+        if is_filtered_property(rec.get("sub_category")) or not rec.get("subzone"):
+            continue
+        sz = normalise_subzone(rec["subzone"])
+        g.merge_node("PropertiesAvailable", sz, {"subzone": sz})
+        g.merge_rel("OFFERS_PROPERTIES", "PlanningArea", sz, "PropertiesAvailable", sz)
+        pid = rec.get("property_id")
+        g.merge_node("IndustrialProperty", pid, industrial_property_props(rec))
+        g.merge_rel("HAS_PROPERTY", "PropertiesAvailable", sz, "IndustrialProperty", pid)
+
+    for sz, attrs in group_average_prices(avg_industrial_prices).items():
+        # MATCH-then-SET in graph_builder: only existing PropertiesAvailable nodes
+        if g.has_node("PropertiesAvailable", sz):
+            g.merge_node("PropertiesAvailable", sz, attrs)
+
+    return g
+
+
+# ─── CSV writing ──────────────────────────────────────────────────────────────
+def _column_type(values):
+    """neo4j-admin header type for a property, inferred from its non-null values."""
+    kinds = {type(v) for v in values if v is not None}
+    if kinds and kinds <= {bool}:
+        return "boolean"
+    if kinds and kinds <= {int}:
+        return "long"
+    if kinds and kinds <= {int, float}:
+        return "double"
+    return "string"
+
+
+def _format(value):
+    if value is None:
+        return ""  # empty field = property not set, same as a null in CREATE/SET
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def write_import_files(g: GraphExport, out_dir: str):
+    """Write one CSV per label and relationship type; return the neo4j-admin arguments."""
+    os.makedirs(out_dir, exist_ok=True)
+    args = []
+    ids = {}  # (label, key) -> integer import id
+
+    for label, nodes in g.nodes.items():
+        columns = sorted({k for props in nodes.values() for k in props})
+        types = {c: _column_type(props.get(c) for props in nodes.values()) for c in columns}
+        path = os.path.join(out_dir, f"nodes_{label}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([f":ID({label})"] + [
+                c if types[c] == "string" else f"{c}:{types[c]}" for c in columns
+            ])
+            for i, (key, props) in enumerate(nodes.items()):
+                ids[(label, key)] = i
+                writer.writerow([i] + [_format(props.get(c)) for c in columns])
+        args.append(f"--nodes={label}={path}")
+
+    for rel_type, (start_label, end_label, pairs) in g.rels.items():
+        path = os.path.join(out_dir, f"rels_{rel_type}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([f":START_ID({start_label})", f":END_ID({end_label})"])
+            for start_key, end_key in pairs:
+                writer.writerow([ids[(start_label, start_key)], ids[(end_label, end_key)]])
+        args.append(f"--relationships={rel_type}={path}")
+
+    # Listing descriptions contain newlines
+    args.append("--multiline-fields=true")
+    node_counts, rel_counts = g.counts()
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump({"nodes": node_counts, "relationships": rel_counts, "args": args}, f, indent=2)
+    return args
+
+
+# ─── Parity check against a Bolt-built graph ──────────────────────────────────
+def parity_check(g: GraphExport, driver=None):
+    """Compare node keys, relationship counts and averagePrice_* attributes with Neo4j.
+
+    Returns a list of mismatch messages; empty means the two builds agree.
+    """
+    from neo4j import GraphDatabase
+    from dotenv import load_dotenv
+
+    own_driver = driver is None
+    if own_driver:
+        load_dotenv()
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+        )
+
+    problems = []
+    node_counts, rel_counts = g.counts()
+    with driver.session() as session:
+        for label, key_props in NODE_KEYS.items():
+            returns = ", ".join(f"n.{p} AS {p}" for p in key_props)
+            in_graph = {
+                tuple(r[p] for p in key_props)
+                for r in session.run(f"MATCH (n:{label}) RETURN {returns}")
+            }
+            exported = {
+                tuple(props.get(p) for p in key_props)
+                for props in g.nodes.get(label, {}).values()
+            }
+            if in_graph != exported:
+                problems.append(
+                    f"{label}: {len(exported - in_graph)} only in export, "
+                    f"{len(in_graph - exported)} only in Neo4j"
+                )
+
+        for rel_type in set(rel_counts) | {"LOCATED_IN", "OF_TYPE"}:
+            actual = session.run(
+                f"MATCH ()-[r:{rel_type}]->() RETURN count(r) AS c"
+            ).single()["c"]
+            if actual != rel_counts.get(rel_type, 0):
+                problems.append(f"{rel_type}: export {rel_counts.get(rel_type, 0)}, Neo4j {actual}")
+
+        for record in session.run("MATCH (pa:PropertiesAvailable) RETURN pa"):
+            node = record["pa"]
+            exported = g.nodes.get("PropertiesAvailable", {}).get(node.get("subzone"), {})
+            for attr, expected in exported.items():
+                if attr.startswith("averagePrice_") and str(node.get(attr)) != str(expected):
+                    problems.append(
+                        f"PropertiesAvailable '{node.get('subzone')}' {attr}: "
+                        f"export {expected}, Neo4j {node.get(attr)}"
+                    )
+
+    if own_driver:
+        driver.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["csv", "supabase"], default="csv")
+    parser.add_argument("--data-dir", default=supabase_csv.DATA_DIR,
+                        help="directory holding the <table>.csv dumps (csv source only)")
+    parser.add_argument("--out", default="import_csv")
+    parser.add_argument("--parity", action="store_true",
+                        help="compare the export with the graph currently in Neo4j")
+    opts = parser.parse_args()
+
+    print(f"🔍 Exporting graph from {opts.source}")
+    start = time.perf_counter()
+    g = build_export(*load_tables(opts.source, opts.data_dir))
+    args = write_import_files(g, opts.out)
+    node_counts, rel_counts = g.counts()
+    print(f"   • {sum(node_counts.values())} nodes, {sum(rel_counts.values())} relationships "
+          f"written to {opts.out}/ in {time.perf_counter() - start:.1f}s")
+    for label, n in node_counts.items():
+        print(f"     {label}: {n}")
+    for rel_type, n in rel_counts.items():
+        print(f"     {rel_type}: {n}")
+    print("➡️  Load with (database must be stopped):")
+    print("   neo4j-admin database import full --overwrite-destination " + " ".join(args) + " neo4j")
+
+    if opts.parity:
+        problems = parity_check(g)
+        for p in problems:
+            print(f"[ERROR] {p}")
+        print("✅ Export matches Neo4j" if not problems else f"❌ {len(problems)} parity mismatches")
+
+
+if __name__ == "__main__":
+    main()
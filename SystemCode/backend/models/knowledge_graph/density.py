@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Kernel-density surface of competitors per venue type, aggregated to subzones.
+
+competitor_count / subzone_size treats a subzone as a bag: a cluster of cafes
+just across the border counts for nothing, and two cafes at opposite ends of a
+large subzone count as much as two next door. Here establishments are binned
+on a fixed metric grid over Singapore (KDE_CELL_M, default 100 m), and each
+venue type's counts are convolved with a Gaussian kernel (KDE_BANDWIDTH_M,
+default 400 m) by FFT. That is a Gaussian KDE evaluated at every cell
+centre, in competitors per km².
+
+The surface is then aggregated back to subzones through the cell centres:
+  kde_density   mean competitors per km² over the subzone (competition pressure)
+  kde_count     surface integrated over the subzone: the smoothed competitor
+                count, including spill-over from neighbouring subzones
+
+    surface = build()          # establishments snapshot + subzone geometry store
+    save(surface)              # outputs/competitor_kde.npz + competitor_kde_by_subzone.csv
+    pressure = load_pressure() # {(SUBZONE, venue_type): kde_density}
+
+    python density.py [--cell-m 100] [--bandwidth-m 400]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GEOMETRY_DIR = os.getenv(
+    "GEOMETRY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(HERE)), "data_processing", "data_extraction_scripts"),
+)
+# geometry_store / spatial_join are imported lazily, also when the caller passes its own store
+if GEOMETRY_DIR not in sys.path:
+    sys.path.insert(0, GEOMETRY_DIR)
+KDE_CELL_M = float(os.getenv("KDE_CELL_M", "100"))
+KDE_BANDWIDTH_M = float(os.getenv("KDE_BANDWIDTH_M", "400"))
+GRID_PATH = os.path.join(HERE, "outputs", "competitor_kde.npz")
+SUBZONE_PATH = os.path.join(HERE, "outputs", "competitor_kde_by_subzone.csv")
+
+METRES_PER_DEGREE = 111_320
+# Kernel support in bandwidths; the Gaussian beyond 4σ is below 0.04% of its peak
+TRUNCATE = 4.0
+
+
+def _load_store():
+    from geometry_store import load_store
+    return load_store()
+
+
+class Grid:
+    """Fixed metric grid: equirectangular metres around the bounds' mid latitude."""
+
+    def __init__(self, bounds, cell_m: float, pad_m: float = 0.0):
+        minx, miny, maxx, maxy = bounds
+        self.lat0 = (miny + maxy) / 2
+        self.kx = METRES_PER_DEGREE * np.cos(np.radians(self.lat0))  # metres per degree of longitude
+        self.ky = METRES_PER_DEGREE
+        self.cell_m = cell_m
+        self.lon0 = minx - pad_m / self.kx
+        self.lat_min = miny - pad_m / self.ky
+        self.nx = int(np.ceil(((maxx - minx) * self.kx + 2 * pad_m) / cell_m))
+        self.ny = int(np.ceil(((maxy - miny) * self.ky + 2 * pad_m) / cell_m))
+
+    @property
+    def shape(self):
+        return self.ny, self.nx
+
+    @property
+    def cell_km2(self) -> float:
+        return (self.cell_m / 1000) ** 2
+
+    def cell_of(self, lats, lons) -> np.ndarray:
+        """Flat cell index of each point; -1 outside the grid or without coordinates."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            ix = np.floor((lons - self.lon0) * self.kx / self.cell_m)
+            iy = np.floor((lats - self.lat_min) * self.ky / self.cell_m)
+        ok = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        out = np.full(len(lats), -1, dtype=np.int64)
+        out[ok] = iy[ok].astype(np.int64) * self.nx + ix[ok].astype(np.int64)
+        return out
+
+    def centres(self):
+        """(lats, lons) of every cell centre, flattened row-major like cell_of()."""
+        xs = self.lon0 + (np.arange(self.nx) + 0.5) * self.cell_m / self.kx
+        ys = self.lat_min + (np.arange(self.ny) + 0.5) * self.cell_m / self.ky
+        lon, lat = np.meshgrid(xs, ys)
+        return lat.ravel(), lon.ravel()
+
+    def meta(self) -> dict:
+        return {"lon0": self.lon0, "lat_min": self.lat_min, "kx": self.kx, "ky": self.ky,
+                "cell_m": self.cell_m, "nx": self.nx, "ny": self.ny}
+
+
+def gaussian_kernel(bandwidth_m: float, cell_m: float) -> np.ndarray:
+    """2D Gaussian over cells, truncated at TRUNCATE bandwidths and summing to 1."""
+    sigma = bandwidth_m / cell_m
+    r = int(np.ceil(TRUNCATE * sigma))
+    x = np.arange(-r, r + 1)
+    g = np.exp(-0.5 * (x / sigma) ** 2)
+    k = np.outer(g, g)
+    return k / k.sum()
+
+
+def kde_surface(grid: Grid, lats, lons, types, bandwidth_m: float):
+    """(venue_types, surface (n_types, ny, nx) float32 in points per km²)."""
+    types = np.asarray(types, dtype=object)
+    cells = grid.cell_of(lats, lons)
+    keep = (cells >= 0) & np.array([isinstance(t, str) and bool(t) for t in types])
+    venue_types, t_idx = np.unique(types[keep].astype(str), return_inverse=True)
+    n_cells = grid.nx * grid.ny
+    counts = np.bincount(t_idx * n_cells + cells[keep], minlength=len(venue_types) * n_cells)
+    counts = counts.reshape(len(venue_types), grid.ny, grid.nx).astype(np.float64)
+    kernel = gaussian_kernel(bandwidth_m, grid.cell_m)
+    smooth = fftconvolve(counts, kernel[None], mode="same", axes=(1, 2))
+    # FFT round-off leaves ±1e-16 noise where there is nothing
+    smooth[smooth < 1e-9] = 0.0
+    return venue_types.tolist(), (smooth / grid.cell_km2).astype(np.float32)
+
+
+def cell_subzones(grid: Grid, store) -> np.ndarray:
+    """Store row of the subzone containing each cell centre (-1 for sea / outside).
+
+    A subzone too small to contain any cell centre is given the cell under its
+    representative point, so every subzone gets a value.
+    """
+    import shapely
+    from spatial_join import SubzoneIndex
+
+    index = SubzoneIndex.from_store(store)
+    lat, lon = grid.centres()
+    rows = index.lookup(lon, lat).astype(np.int32)
+    missing = np.setdiff1d(np.arange(len(store)), rows)
+    if len(missing):
+        pts = shapely.point_on_surface(store.geometries()[missing])
+        cells = grid.cell_of(shapely.get_y(pts), shapely.get_x(pts))
+        ok = cells >= 0
+        rows[cells[ok]] = missing[ok]
+    return rows
+
+
+def subzone_aggregates(surface: np.ndarray, cell_rows: np.ndarray, n_subzones: int, cell_km2: float):
+    """(kde_density, kde_count), each (n_types, n_subzones): mean per km² and integral over the subzone."""
+    inside = cell_rows >= 0
+    rows = cell_rows[inside]
+    n_cells = np.bincount(rows, minlength=n_subzones).astype(np.float64)
+    flat = surface.reshape(len(surface), -1)[:, inside].astype(np.float64)
+    sums = np.stack([np.bincount(rows, weights=f, minlength=n_subzones) for f in flat])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n_cells > 0, sums / n_cells, np.nan)
+    return mean, sums * cell_km2
+
+
+# ─── Build / save / load ──────────────────────────────────────────────────────
+def build(cell_m: float = KDE_CELL_M, bandwidth_m: float = KDE_BANDWIDTH_M, establishments=None, store=None) -> dict:
+    """Surface and subzone aggregates for the establishments snapshot (or the given frame)."""
+    timings = {}
+    start = time.perf_counter()
+    if establishments is None:
+        establishments = snapshot.load_frame(
+            "establishments", ["latitude", "longitude", "venue_type"], zero_copy=False
+        )
+    store = store if store is not None else _load_store()
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    b = store.bounds
+    grid = Grid((b[:, 0].min(), b[:, 1].min(), b[:, 2].max(), b[:, 3].max()), cell_m, pad_m=bandwidth_m)
+    venue_types, surface = kde_surface(
+        grid, establishments["latitude"], establishments["longitude"], establishments["venue_type"], bandwidth_m
+    )
+    timings["kde"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = cell_subzones(grid, store)
+    density, count = subzone_aggregates(surface, rows, len(store), grid.cell_km2)
+    timings["aggregate"] = time.perf_counter() - start
+    return {
+        "grid": grid, "venue_types": venue_types, "surface": surface, "cell_subzone": rows,
+        "subzones": list(store.names), "kde_density": density, "kde_count": count,
+        "bandwidth_m": bandwidth_m, "points": len(establishments), "timings": timings,
+    }
+
+
+def save(result: dict, grid_path: str = GRID_PATH, subzone_path: str = SUBZONE_PATH):
+    os.makedirs(os.path.dirname(grid_path) or ".", exist_ok=True)
+    meta = result["grid"].meta()
+    np.savez_compressed(
+        grid_path,
+        surface=result["surface"], cell_subzone=result["cell_subzone"],
+        venue_types=np.array(result["venue_types"]), subzones=np.array(result["subzones"]),
+        bandwidth_m=result["bandwidth_m"], **{k: np.array(v) for k, v in meta.items()},
+    )
+    os.makedirs(os.path.dirname(subzone_path) or ".", exist_ok=True)
+    with open(subzone_path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["subzone", "venue_type", "kde_density", "kde_count"])
+        for t, vt in enumerate(result["venue_types"]):
+            for s, sz in enumerate(result["subzones"]):
+                d = result["kde_density"][t, s]
+                if np.isfinite(d):
+                    w.writerow([sz, vt, round(float(d), 4), round(float(result["kde_count"][t, s]), 4)])
+
+
+def load_pressure(path: str = SUBZONE_PATH, column: str = "kde_density") -> dict:
+    """{(SUBZONE, venue_type): value} from the saved subzone aggregates."""
+    with open(path, newline="") as f:
+        return {
+            (r["subzone"].strip().upper(), r["venue_type"]): float(r[column]) for r in csv.DictReader(f)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Competitor kernel-density surface and subzone aggregates")
+    parser.add_argument("--cell-m", type=float, default=KDE_CELL_M)
+    parser.add_argument("--bandwidth-m", type=float, default=KDE_BANDWIDTH_M)
+    opts = parser.parse_args()
+
+    res = build(opts.cell_m, opts.bandwidth_m)
+    grid, t = res["grid"], res["timings"]
+    print(f"✅ KDE of {res['points']:,} establishments, {len(res['venue_types'])} venue types on a "
+          f"{grid.nx}×{grid.ny} grid ({opts.cell_m:g} m cells, {opts.bandwidth_m:g} m bandwidth)")
+    print(f"   • load {t['load']:.2f}s, KDE {t['kde']:.2f}s, subzone aggregation {t['aggregate']:.2f}s")
+    save(res)
+    print(f"📁 Saved {GRID_PATH} and {SUBZONE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Observed footfall per (subzone, venue_type), the reference the scoring model is
+trained and tuned against (train_gnn.py, sweep_weights.py).
+"""
+
+import os
+
+import pandas as pd
+
+FOOTFALL_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data_processing", "data_extraction_scripts", "data_files", "aggregated_venue_footfall.csv"
+)
+
+
+def footfall_targets(path: str = FOOTFALL_CSV) -> dict:
+    """{(SUBZONE, VENUE_TYPE): percentile in [0, 1]} of weekly footfall within each venue type."""
+    df = pd.read_csv(path)
+    df = df[df["number_of_places"] > 0].copy()
+    df["weekly"] = (5 * df["avg_weekday_footfall"] + 2 * df["avg_weekend_footfall"]) / 7
+    df["pct"] = df.groupby("venue_type")["weekly"].rank(pct=True)
+    return {
+        (sz.strip().upper(), vt): float(p)
+        for sz, vt, p in zip(df["subzone"], df["venue_type"], df["pct"])
+    }
@@ -0,0 +1,146 @@
+"""
+Vectorized fuzzy-inference engine for the competitor scoring rule base.
+
+The rule base in neuro_symbolic.py (SOFT_RULES + RULE_IMPORTANCE) is compiled
+once into per-venue-type weight rows, and the memberships of every
+(subzone, venue_type) record are evaluated as array operations over the
+comp_count / pop_relevant / spending_power columns. Scores match the scalar
+compute_rule_scores() + aggregate_rules() path exactly: weights are applied in
+the same order and summed rule by rule, so the floating-point results are
+identical.
+
+    engine = FuzzyEngine(SOFT_RULES, RULE_IMPORTANCE, venue_types)
+    th     = tercile_thresholds(comp, pop, spend, has_count)
+    scores = engine.score(comp, pop, spend, has_count, engine.type_index(vts), th)
+
+The rule base itself now comes from scoring_rules.yaml: rule_spec.py compiles
+it into a membership function and hands it to FuzzyEngine, and memberships()
+below remains the reference for the default spec.
+"""
+
+import numpy as np
+
+# Column order of the membership matrix, as used by SOFT_RULES
+RULE_NAMES = [
+    "few_comp_high_pop",
+    "many_competitors",
+    "medium_default",
+    "high_population",
+    "high_spending",
+    "underserved_high_spend",
+]
+
+
+def fuzzy_membership(x, low, high):
+    """Array version of neuro_symbolic.fuzzy_membership: 1 at/below low, 0 at/above high."""
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ramp = (high - x) / (high - low)
+    return np.where(x <= low, 1.0, np.where(x >= high, 0.0, ramp))
+
+
+def inverse_fuzzy(x, low, high):
+    """Array version of neuro_symbolic.inverse_fuzzy: 0 at/below low, 1 at/above high."""
+    x = np.asarray(x, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ramp = (x - low) / (high - low)
+    return np.where(x <= low, 0.0, np.where(x >= high, 1.0, ramp))
+
+
+def _terciles(values):
+    values = np.sort(np.asarray(values))
+    if not len(values):
+        return None
+    n = len(values)
+    return values[n // 3].item(), values[2 * n // 3].item()
+
+
+def tercile_thresholds(comp_count, pop_relevant, spending_power, has_count, defaults=None) -> dict:
+    """The dynamic 1/3 and 2/3 thresholds neuro_symbolic derives from the data.
+
+    Returns {"comp": (few, many), "pop": (low, high), "spend": (low, high)};
+    a column with no usable values keeps its entry from `defaults`.
+    """
+    comp_count = np.asarray(comp_count)
+    pop_relevant = np.asarray(pop_relevant)
+    has_count = np.asarray(has_count, dtype=bool)
+    th = dict(defaults or {})
+    for key, vals in (
+        ("comp", comp_count[has_count & (comp_count > 0)]),
+        ("pop", pop_relevant[pop_relevant > 0]),
+        ("spend", spending_power),
+    ):
+        t = _terciles(vals)
+        if t is not None:
+            th[key] = t
+    return th
+
+
+def memberships(comp_count, pop_relevant, spending_power, has_count, thresholds: dict) -> np.ndarray:
+    """(n_records, n_rules) rule activations, columns in RULE_NAMES order."""
+    few_t, many_t = thresholds["comp"]
+    pop_low, pop_high = thresholds["pop"]
+    spend_low, spend_high = thresholds["spend"]
+
+    few = fuzzy_membership(comp_count, few_t, many_t)
+    many = inverse_fuzzy(comp_count, few_t, many_t)
+    pop_hi = fuzzy_membership(pop_relevant, pop_low, pop_high)
+    r1 = few * pop_hi
+    r3 = 1.0 - np.abs(r1 - many)
+    high_pop = inverse_fuzzy(pop_relevant, pop_low, pop_high)
+    high_spend = inverse_fuzzy(spending_power, spend_low, spend_high)
+
+    m = np.column_stack([r1, many, r3, high_pop, high_spend, few * high_spend])
+    # Missing competitor data falls back entirely to the medium_default rule
+    missing = ~np.asarray(has_count, dtype=bool)
+    m[missing] = 0.0
+    m[missing, RULE_NAMES.index("medium_default")] = 1.0
+    return m
+
+
+class FuzzyEngine:
+    """SOFT_RULES × RULE_IMPORTANCE compiled to one weight row per venue type."""
+
+    def __init__(self, soft_rules, rule_importance, venue_types=(),
+                 rule_names=RULE_NAMES, membership=memberships):
+        """`membership(comp, pop, spend, has_count, thresholds)` returns the activation
+        matrix whose columns are `rule_names`."""
+        by_name = {r["name"]: r["weight"] for r in soft_rules}
+        self.rule_names = [r["name"] for r in soft_rules]
+        unknown = set(self.rule_names) - set(rule_names)
+        if unknown:
+            raise ValueError(f"No membership function for rules: {sorted(unknown)}")
+        self._columns = [list(rule_names).index(n) for n in self.rule_names]
+        self._membership = membership
+        self.base = np.array([by_name[n] for n in self.rule_names], dtype=np.float64)
+
+        # Row 0 is the default (all multipliers 1.0) for venue types without overrides
+        self.venue_types = [None] + sorted(set(venue_types) | set(rule_importance))
+        self._index = {vt: i for i, vt in enumerate(self.venue_types)}
+        self.mult = np.ones((len(self.venue_types), len(self.rule_names)))
+        for vt, overrides in rule_importance.items():
+            for j, name in enumerate(self.rule_names):
+                self.mult[self._index[vt], j] = overrides.get(name, 1.0)
+        # Summed in rule order, like aggregate_rules()
+        self.total_w = np.array([
+            sum(b * m for b, m in zip(self.base, row)) for row in self.mult.tolist()
+        ])
+
+    def type_index(self, venue_types) -> np.ndarray:
+        """Weight-row index for each record's venue type (0 for unknown types)."""
+        return np.array([self._index.get(vt, 0) for vt in venue_types], dtype=np.intp)
+
+    def aggregate(self, m: np.ndarray, type_idx: np.ndarray) -> np.ndarray:
+        """Weighted mean of the activations with each record's venue-type weights."""
+        mult = self.mult[type_idx]
+        acc = np.zeros(len(m))
+        for j, col in enumerate(self._columns):
+            acc = acc + m[:, col] * self.base[j] * mult[:, j]
+        total = self.total_w[type_idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total != 0, acc / total, 0.0)
+
+    def score(self, comp_count, pop_relevant, spending_power, has_count, type_idx, thresholds) -> np.ndarray:
+        """Rule score in [0, 1] for every record in one pass."""
+        m = self._membership(comp_count, pop_relevant, spending_power, has_count, thresholds)
+        return self.aggregate(m, np.asarray(type_idx, dtype=np.intp))
@@ -2,8 +2,10 @@ from neo4j import GraphDatabase
 import pandas as pd
 import os
 from dotenv import load_dotenv
-import folium
+from map_layers import build_map
 from supabase import create_client, Client  # NEW: supabase import
+import snapshot
+from score_sink import ScoreSink
 
 # Load credentials
 load_dotenv()
@@ -40,64 +42,29 @@ print("🏙️ Top Subzones by Venue Count:")
 print(venue_counts.sort_values(by='venue_count', ascending=False).head(10))
 print("-----------------------------------------------")
 
-# Step 2: Base map with all venues
-m = folium.Map(location=[1.3521, 103.8198], zoom_start=12)
-
-for _, row in df.iterrows():
-    if row['lat'] and row['lon'] and row['type']:
-        folium.CircleMarker(
-            location=[float(row['lat']), float(row['lon'])],
-            radius=3,
-            popup=f"{row['name']} ({row['type']}) in {row['subzone']}",
-            color='blue',
-            fill=True
-        ).add_to(m)
-
-# Step 3: Fetch population stats
+# Step 3: Fetch population stats (Supabase snapshot)
 def fetch_population_stats():
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (pop:PopulationStats)
-            RETURN pop.subzone AS subzone,
-                   toFloat(pop.population_density) AS density,
-                   toFloat(pop.subzone_size) AS size
-        """)
-        return pd.DataFrame([dict(r) for r in result])
-
-# Step 4: Fetch competitor stats
+    pop = snapshot.load_frame(
+        "demographics_population", ["subzone", "population_density", "subzone_size"], zero_copy=False
+    )
+    return pd.DataFrame({
+        "subzone": pop["subzone"],
+        "density": pd.to_numeric(pop["population_density"], errors="coerce"),
+        "size": pd.to_numeric(pop["subzone_size"], errors="coerce"),
+    })
+
+# Step 4: Fetch competitor stats (Supabase snapshot)
 def fetch_competitor_stats():
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (cs:CompetitorStats)
-            RETURN cs.subzone AS subzone,
-                   cs.venue_type AS type,
-                   toInteger(cs.competitor_count) AS count
-        """)
-        return pd.DataFrame([dict(r) for r in result])
-
-# Step 5: Update Neo4j with underserved_score
-def update_underserved_scores(data):
-    updated = 0
-    with driver.session() as session:
-        for _, row in data.iterrows():
-            subzone = row['subzone']
-            venue_type = row['type']
-            underserved_score = round(row['underserved_score'], 2)
-
-            session.run("""
-                MATCH (cs:CompetitorStats)
-                WHERE cs.subzone = $subzone AND cs.venue_type = $venue_type
-                      AND (cs.underserved_score IS NULL OR cs.underserved_score = 0)
-                SET cs.underserved_score = $underserved_score
-            """, {
-                "subzone": subzone,
-                "venue_type": venue_type,
-                "underserved_score": underserved_score
-            })
-
-            updated += 1
-
-    print(f"✅ Updated underserved_score for {updated} CompetitorStats nodes")
+    stats = snapshot.load_frame(
+        "competitor_stats", ["subzone", "venue_type", "competitor_count", "overall_score"], zero_copy=False
+    )
+    stats = stats.dropna(subset=["subzone", "venue_type"])
+    return pd.DataFrame({
+        "subzone": stats["subzone"].str.strip().str.upper(),
+        "type": stats["venue_type"],
+        "count": stats["competitor_count"],
+        "overall_score": pd.to_numeric(stats["overall_score"], errors="coerce"),
+    })
 
 # ---------------- MAIN FLOW ----------------
 pop_df = fetch_population_stats()
@@ -129,76 +96,31 @@ underserved = merged.sort_values(by='underserved_score', ascending=False)
 print("🔍 Top Underserved Venue Types by Subzone:")
 print(underserved[['subzone', 'type', 'density', 'competitor_count', 'underserved_score']].head(10))
 
-# Step 9: Update Supabase competitor_stats table ──────────────────────────────
-def update_supabase_scores(data):
-    updated = 0
-
-    for idx, row in data.iterrows():
-        subzone = row['subzone']
-        venue_type = row['type']
-        underserved_score = row.get('underserved_score', None)
-
-        # Skip rows with missing bits
-        if pd.isna(subzone) or pd.isna(venue_type) or underserved_score is None:
-            print(f"⏭️ Skipping row {idx}: subzone={subzone}, type={venue_type}, underserved_score={underserved_score}")
-            continue
-
-        # Build a strictly Python-native dict
-        payload = { "underserved_score": float(round(underserved_score, 2)) }
-        match_filter = {
-            "subzone": str(subzone),
-            "venue_type": str(venue_type)
-        }
-
-        # Debug print
-        # print(f"🔄 Row {idx} → match={match_filter}, payload={payload}")
-
-        try:
-            res = (
-                supabase
-                .table("competitor_stats")
-                .update(payload)
-                .match(match_filter)
-                .execute()
-            )
-        except Exception as e:
-            print(f"❌ Exception for row {idx}: {e}")
-            continue
-
-        # Supabase-py returns a `.error` field if something went wrong
-        if hasattr(res, 'error') and res.error:
-            print(f"❌ Supabase error for row {idx}: {res.error}")
-        else:
-            updated += 1
-
-    print(f"✅ Updated {updated} rows in Supabase")
-
-update_supabase_scores(merged)
-
-# Update Neo4j with new underserved scores
-update_underserved_scores(merged)
+# Step 9: Publish underserved_score to Supabase and Neo4j ─────────────────────
+def publish_underserved_scores(data):
+    valid = data.dropna(subset=['subzone', 'type', 'underserved_score'])
+    skipped = len(data) - len(valid)
+    if skipped:
+        print(f"⏭️ Skipping {skipped} rows with a missing subzone, type or underserved_score")
+    rows = [
+        {"subzone": str(sz), "venue_type": str(vt), "underserved_score": float(round(score, 2))}
+        for sz, vt, score in zip(valid['subzone'], valid['type'], valid['underserved_score'])
+    ]
+    # Neo4j only fills in scores that are not set yet, as before
+    ScoreSink(supabase, driver).publish(
+        rows, {"underserved_score": "underserved_score"},
+        where="n.underserved_score IS NULL OR n.underserved_score = 0",
+        desc="underserved_score",
+    )
+
+publish_underserved_scores(merged)
 
 # Save results
 underserved.to_csv("outputs/underserved_by_density.csv", index=False)
 print("📁 Saved CSV: outputs/underserved_by_density.csv")
 
-# Highlight top underserved venues on map
-top_underserved = underserved.head(10)
-for _, row in top_underserved.iterrows():
-    venues_in_zone = df[(df['subzone'] == row['subzone']) & (df['type'] == row['type'])]
-    for _, venue in venues_in_zone.iterrows():
-        if venue['lat'] and venue['lon']:
-            folium.CircleMarker(
-                location=[float(venue['lat']), float(venue['lon'])],
-                radius=6,
-                popup=f"UNDERSERVED: {venue['name']} ({venue['type']}) in {venue['subzone']}",
-                color='red',
-                fill=True,
-                fill_opacity=0.9
-            ).add_to(m)
-
-
-
-# Final map output
+# Map: one clustered GeoJSON layer per venue type, the top underserved venues in red,
+# and subzone choropleths of the underserved and last published overall scores
+m = build_map(df, merged[['subzone', 'underserved_score', 'overall_score']], underserved.head(10))
 m.save("outputs/sg_venue_map.html")
-print("🗺️ Map saved: outputs/sg_venue_map.html")
\ No newline at end of file
+print("🗺️ Map saved: outputs/sg_venue_map.html")
@@ -1,72 +1,42 @@
 import os
+import tracemalloc
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from supabase import create_client, Client
 from neo4j import GraphDatabase
 from tqdm import tqdm  # progress bars
+import snapshot
+from neo4j_writer import PartitionedWriter
+from graph_schema import (
+    normalise_subzone, clean_props, is_competitor,
+    is_filtered_property, group_average_prices, industrial_property_props
+)
 
 print("🔍 Starting graph_builder_updated.py")
 
-# ─── Helper: fetch all records with pagination ─────────────────────────────────
-def fetch_all_records(supabase: Client, table_name: str, page_size: int = 1000):
-    print(f"   ↳ Fetching all from {table_name}…")
-    records = []
-    offset = 0
-    while True:
-        batch = supabase.table(table_name) \
-                        .select("*") \
-                        .range(offset, offset + page_size - 1) \
-                        .execute().data
-        if not batch:
-            break
-        records.extend(batch)
-        offset += page_size
-    print(f"     • Retrieved {len(records)} rows from {table_name}")
-    return records
-
-# ─── Step 1: Fetch data from Supabase ─────────────────────────────────────────
+# ─── Step 1: Fetch data (via the local snapshot cache of Supabase) ─────────────
+SOURCE_TABLES = [
+    "planning_areas", "venue_types", "establishments", "competitor_stats",
+    "demographics_age_group", "demographics_housing_types", "demographics_population",
+    "industrial_properties", "avg_industrial_prices",
+]
+
 def fetch_supabase_data():
     print("➡️  Enter fetch_supabase_data()")
     load_dotenv()
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    print(f"   • SUPABASE_URL loaded: {'YES' if supabase_url else 'NO'}")
-    supabase: Client = create_client(supabase_url, supabase_key)
-
-    # ─── One‐shot fetches with logging ───────────────────────────────
-    planning_areas = supabase.table("planning_areas") \
-                             .select("*") \
-                             .execute().data
-    print(f"   ↳ Retrieved {len(planning_areas)} rows from planning_areas")
-
-    venue_types = supabase.table("venue_types") \
-                          .select("*") \
-                          .execute().data
-    print(f"   ↳ Retrieved {len(venue_types)} rows from venue_types")
-
-    demographics_age = supabase.table("demographics_age_group") \
-                               .select("*") \
-                               .execute().data
-    print(f"   ↳ Retrieved {len(demographics_age)} rows from demographics_age_group")
-
-    demographics_housing = supabase.table("demographics_housing_types") \
-                                   .select("*") \
-                                   .execute().data
-    print(f"   ↳ Retrieved {len(demographics_housing)} rows from demographics_housing_types")
-
-    demographics_pop = supabase.table("demographics_population") \
-                               .select("*") \
-                               .execute().data
-    print(f"   ↳ Retrieved {len(demographics_pop)} rows from demographics_population")
-
-    avg_industrial_prices = supabase.table("avg_industrial_prices") \
-                                     .select("*") \
-                                     .execute().data
-    print(f"   ↳ Retrieved {len(avg_industrial_prices)} rows from avg_industrial_prices")
-
-    # ─── Paginated fetches (already logged inside helper) ───────────
-    competitor_data  = fetch_all_records(supabase, "establishments")
-    competitor_stats = fetch_all_records(supabase, "competitor_stats")
-    industrial_props = fetch_all_records(supabase, "industrial_properties")
+    print(f"   • SUPABASE_URL loaded: {'YES' if os.getenv('SUPABASE_URL') else 'NO'}")
+
+    # Snapshots are only re-fetched when the table has changed since the last run
+    tables = []
+    for name in SOURCE_TABLES:
+        rows = snapshot.fetch_records(name)
+        print(f"   ↳ Retrieved {len(rows)} rows from {name}")
+        tables.append(rows)
+
+    (
+        planning_areas, venue_types, competitor_data, competitor_stats,
+        demographics_age, demographics_housing, demographics_pop,
+        industrial_props, avg_industrial_prices
+    ) = tables
 
     # ─── Complete summary ────────────────────────────────────────────
     print(
@@ -82,11 +52,7 @@ def fetch_supabase_data():
         f"     {len(avg_industrial_prices)} avg industrial price records"
     )
 
-    return (
-        planning_areas, venue_types, competitor_data, competitor_stats,
-        demographics_age, demographics_housing, demographics_pop,
-        industrial_props, avg_industrial_prices
-    )
+    return tuple(tables)
 # ─── Step 2: Clear existing graph ───────────────────────────────────────────────
 def clear_graph():
     print("➡️  Enter clear_graph()")
@@ -99,13 +65,89 @@ def clear_graph():
     driver.close()
     print("   • All nodes and relationships deleted")
 
+# ─── Streaming: snapshot pages → normalised rows → writers ────────────────────
+# Each row normaliser returns the compact dict written to Neo4j, or None to skip
+def planning_area_row(pa):
+    if pa.get("subzone"):
+        return {"sz": normalise_subzone(pa["subzone"])}
+
+def venue_type_row(vt):
+    if vt.get("type_name"):
+        return {"vt": vt["type_name"]}
+
+def competitor_row(cd):
+    # MERGE on a null subzone fails in Neo4j, so such competitors are skipped
+    if is_competitor(cd.get("venue_name")) and cd.get("subzone"):
+        return {"name": cd["venue_name"], "sz": normalise_subzone(cd["subzone"]), "vt": cd.get("venue_type")}
+
+def competitor_stats_row(rec):
+    if rec.get("subzone") and rec.get("venue_type"):
+        return {
+            "sz": normalise_subzone(rec["subzone"]),
+            "vt": rec["venue_type"],
+            "overall_score": rec.get("overall_score"),
+            "density": rec.get("competitor_density"),
+            "competitor_count": rec.get("competitor_count"),
+        }
+
+def demographic_row(rec):
+    props = clean_props(rec)
+    if props.get("subzone"):
+        return {"sz": normalise_subzone(props["subzone"]), "props": props}
+
+def industrial_property_row(rec):
+    if not is_filtered_property(rec.get("sub_category")) and rec.get("subzone"):
+        return {"sz": normalise_subzone(rec["subzone"]), "pid": rec.get("property_id"),
+                "props": industrial_property_props(rec)}
+
+def stream_rows(table_name, normalise, where=None):
+    """Yield one page of normalised rows at a time from the table's snapshot."""
+    for page in snapshot.iter_batches(table_name):
+        rows = [r for r in map(normalise, page) if r is not None]
+        if where is not None:
+            rows = [r for r in rows if where(r)]
+        if rows:
+            yield rows
+
+def collect_keys(pages, into: set, key):
+    """Pass pages through, remembering only each row's key for validation."""
+    for page in pages:
+        into.update(key(r) for r in page)
+        yield page
+
+def unique_subzones(pages):
+    for page in pages:
+        yield [{"sz": sz} for sz in dict.fromkeys(r["sz"] for r in page)]
+
 # ─── Step 3: Create nodes & relationships ─────────────────────────────────────
-def create_graph_nodes_and_relationships(
-    planning_areas, venue_types,
-    competitor_data, competitor_stats,
-    demographics_age, demographics_housing, demographics_pop,
-    industrial_props, avg_industrial_prices
-):
+# Indexes on every MERGE/MATCH key; without them each batched MERGE is a label scan
+INDEXES = [
+    ("PlanningArea", ("subzone",)),
+    ("VenueType", ("type_name",)),
+    ("Competitor", ("venue_name", "subzone")),
+    ("CompetitorStats", ("subzone", "venue_type")),
+    ("AgeDistribution", ("subzone",)),
+    ("HousingProfile", ("subzone",)),
+    ("PopulationStats", ("subzone",)),
+    ("PropertiesAvailable", ("subzone",)),
+    ("IndustrialProperty", ("property_id",)),
+]
+
+DEMOGRAPHIC_NODES = [
+    # (label, relationship from PlanningArea, name prefix, source table)
+    ("AgeDistribution", "HAS_AGE_DISTRIBUTION", "Age Dist for ", "demographics_age_group"),
+    ("HousingProfile", "HAS_HOUSING_PROFILE", "Housing Prof for ", "demographics_housing_types"),
+    ("PopulationStats", "HAS_POPULATION_STATS", "Pop Stats for ", "demographics_population"),
+]
+
+def by_subzone(row):
+    return row["sz"]
+
+def by_venue_type(row):
+    return row["vt"]
+
+def create_graph_nodes_and_relationships():
+    """Stream every table into Neo4j; return the key sets validate_graph() checks."""
     print("➡️  Enter create_graph_nodes_and_relationships()")
     uri      = os.getenv("NEO4J_URI")
     user     = os.getenv("NEO4J_USERNAME")
@@ -113,229 +155,146 @@ def create_graph_nodes_and_relationships(
     driver = GraphDatabase.driver(uri, auth=(user, password))
 
     with driver.session() as session:
-        # -- PlanningArea nodes --
-        for pa in tqdm(planning_areas, desc="Creating PlanningArea nodes"):
-            subzone = pa.get("subzone")
-            if subzone:
-                norm = subzone.strip().upper()
-                session.run("MERGE (pa:PlanningArea {subzone:$norm})", norm=norm)
-
-        # -- VenueType nodes --
-        for vt in tqdm(venue_types, desc="Creating VenueType nodes"):
-            t = vt.get("type_name")
-            if t:
-                session.run("MERGE (vt:VenueType {type_name:$t})", t=t)
-
-        # -- Competitor nodes & relationships --
-        for cd in tqdm(competitor_data, desc="Creating Competitor nodes"):
-            name        = cd.get("venue_name")
-            subzone     = cd.get("subzone")
-            venue_type  = cd.get("venue_type")
-            if not name or name == "No venues found":
-                continue
-            norm_zone = subzone.strip().upper() if subzone else None
-
-            # Merge competitor
-            session.run(
-                "MERGE (c:Competitor {venue_name:$name, subzone:$norm_zone})",
-                name=name, norm_zone=norm_zone
-            )
-            # Competitor -> PlanningArea
-            if norm_zone:
-                session.run(
-                    """
-                    MATCH (c:Competitor {venue_name:$name, subzone:$norm_zone})
-                    MATCH (pa:PlanningArea {subzone:$norm_zone})
-                    MERGE (c)-[:LOCATED_IN]->(pa)
-                    """,
-                    name=name, norm_zone=norm_zone
-                )
-            # Competitor -> VenueType
-            if venue_type:
-                session.run(
-                    """
-                    MATCH (c:Competitor {venue_name:$name, subzone:$norm_zone})
-                    MATCH (vt:VenueType {type_name:$vt})
-                    MERGE (c)-[:OF_TYPE]->(vt)
-                    """,
-                    name=name, norm_zone=norm_zone, vt=venue_type
-                )
-
-        # -- CompetitorStats: one node per (subzone, venue_type) --
-        for rec in tqdm(competitor_stats, desc="Creating CompetitorStats nodes"):
-            subzone    = rec.get("subzone")
-            venue_type = rec.get("venue_type")
-            overall_score      = rec.get("overall_score")
-            density    = rec.get("competitor_density")
-            competitor_count      = rec.get("competitor_count")
-            if not (subzone and venue_type):
-                continue
-
-            sz = subzone.strip().upper()
-            # Merge stats node
-            session.run(
-                """
-                MERGE (cs:CompetitorStats {subzone:$sz, venue_type:$vt})
-                SET cs.overall_score = $overall_score,
-                    cs.density  = $density,
-                    cs.competitor_count  = $competitor_count,
-                    cs.name  = 'Stats for ' + $sz + ' ' + $vt
-                """,
-                sz=sz, vt=venue_type, overall_score=overall_score, density=density, competitor_count=competitor_count
-            )
-            # Link to PlanningArea
-            session.run(
-                """
-                MATCH (pa:PlanningArea {subzone:$sz})
-                MATCH (cs:CompetitorStats {subzone:$sz, venue_type:$vt})
-                MERGE (pa)-[:HAS_COMPETITOR_STATS]->(cs)
-                """,
-                sz=sz, vt=venue_type
-            )
-            # Link to VenueType
-            session.run(
-                """
-                MATCH (cs:CompetitorStats {subzone:$sz, venue_type:$vt})
-                MATCH (vt:VenueType {type_name:$vt})
-                MERGE (cs)-[:FOR_TYPE]->(vt)
-                """,
-                sz=sz, vt=venue_type
-            )
-
-        # -- AgeDistribution nodes --
-        for rec in tqdm(demographics_age, desc="Creating AgeDistribution nodes"):
-            props = {k: ("No data available" if v == "-" else v) for k, v in rec.items()}
-            subzone = props.get("subzone")
-            if not subzone:
-                continue
-            sz = subzone.strip().upper()
-            session.run(
-                "MERGE (ad:AgeDistribution {subzone:$sz}) SET ad += $props, ad.name = 'Age Dist for '+$sz",
-                sz=sz, props=props
-            )
-            session.run(
-                """
-                MATCH (pa:PlanningArea {subzone:$sz})
-                MATCH (ad:AgeDistribution {subzone:$sz})
-                MERGE (pa)-[:HAS_AGE_DISTRIBUTION]->(ad)
-                """,
-                sz=sz
-            )
-
-        # -- HousingProfile nodes --
-        for rec in tqdm(demographics_housing, desc="Creating HousingProfile nodes"):
-            props = {k: ("No data available" if v == "-" else v) for k, v in rec.items()}
-            subzone = props.get("subzone")
-            if not subzone:
-                continue
-            sz = subzone.strip().upper()
-            session.run(
-                "MERGE (hp:HousingProfile {subzone:$sz}) SET hp += $props, hp.name = 'Housing Prof for '+$sz",
-                sz=sz, props=props
-            )
-            session.run(
-                """
-                MATCH (pa:PlanningArea {subzone:$sz})
-                MATCH (hp:HousingProfile {subzone:$sz})
-                MERGE (pa)-[:HAS_HOUSING_PROFILE]->(hp)
-                """,
-                sz=sz
-            )
-
-        # -- PopulationStats nodes --
-        for rec in tqdm(demographics_pop, desc="Creating PopulationStats nodes"):
-            props = {k: ("No data available" if v == "-" else v) for k, v in rec.items()}
-            subzone = props.get("subzone")
-            if not subzone:
-                continue
-            sz = subzone.strip().upper()
-            session.run(
-                "MERGE (ps:PopulationStats {subzone:$sz}) SET ps += $props, ps.name = 'Pop Stats for '+$sz",
-                sz=sz, props=props
-            )
-            session.run(
-                """
-                MATCH (pa:PlanningArea {subzone:$sz})
-                MATCH (ps:PopulationStats {subzone:$sz})
-                MERGE (pa)-[:HAS_POPULATION_STATS]->(ps)
-                """,
-                sz=sz
-            )
-
-        # -- IndustrialProperty & PropertiesAvailable nodes --
-        FILTERED = ["dormitory", "showroom", "office_grade_a", "generic_office", "factory", "warehouse"]
-        for rec in tqdm(industrial_props, desc="Creating IndustrialProperty nodes"):
-            subcat = rec.get("sub_category")
-            if subcat in FILTERED:
-                continue
-            subzone = rec.get("subzone")
-            if not subzone:
-                continue
-            sz = subzone.strip().upper()
-            # Merge PropertiesAvailable
-            session.run("MERGE (pa:PropertiesAvailable {subzone:$sz})", sz=sz)
-            session.run(
-                """
-                MATCH (pl:PlanningArea {subzone:$sz})
-                MATCH (pa:PropertiesAvailable {subzone:$sz})
-                MERGE (pl)-[:OFFERS_PROPERTIES]->(pa)
-                """,
-                sz=sz
-            )
-            # Create IndustrialProperty
-            props = {
-                "property_id": rec.get("property_id"),
-                "listing_id":  rec.get("listing_id"),
-                "listing_url": rec.get("listing_url"),
-                "price":       rec.get("price"),
-                "description": rec.get("description"),
-                "sub_category": subcat,
-                "status":      rec.get("status"),
-                "area_size":   rec.get("area_size"),
-                "listing_type": rec.get("listing_type")
-            }
-            session.run("CREATE (ip:IndustrialProperty $props)", props=props)
-            session.run(
-                """
-                MATCH (pa:PropertiesAvailable {subzone:$sz})
-                MATCH (ip:IndustrialProperty {property_id:$pid})
-                MERGE (pa)-[:HAS_PROPERTY]->(ip)
-                """,
-                sz=sz, pid=rec.get("property_id")
-            )
-
-        # -- Update PropertiesAvailable with average prices --
-        EXCL = FILTERED
-        avg_group = {}
-        for rec in avg_industrial_prices:
-            subcat = rec.get("sub_category")
-            if subcat in EXCL:
-                continue
-            subzone = rec.get("subzone")
-            lt = rec.get("listing_type")
-            avg  = rec.get("average_price")
-            if not subzone or not lt:
-                continue
-            sz = subzone.strip().upper()
-            key = f"averagePrice_{subcat.lower().replace(' ', '_')}_{lt.lower()}"
-            avg_group.setdefault(sz, {})[key] = avg
-
-        for sz, attrs in tqdm(avg_group.items(), desc="Updating avg prices"):
-            session.run(
-                "MATCH (pa:PropertiesAvailable {subzone:$sz}) SET pa += $attrs",
-                sz=sz, attrs=attrs
-            )
+        for label, keys in INDEXES:
+            on = ", ".join(f"n.{k}" for k in keys)
+            session.run(f"CREATE INDEX {label.lower()}_key IF NOT EXISTS FOR (n:{label}) ON ({on})").consume()
+
+    expected = {label: set() for label, _ in INDEXES}
+    expected["OF_TYPE"] = set()
+    # Small: one entry per subzone with properties
+    expected["prices"] = group_average_prices(snapshot.fetch_records("avg_industrial_prices"))
+
+    # -- Phase 1: nodes (key sets are collected on this pass) --
+    node_phase = [
+        {"query": "UNWIND $rows AS row MERGE (:PlanningArea {subzone: row.sz})",
+         "pages": collect_keys(stream_rows("planning_areas", planning_area_row),
+                               expected["PlanningArea"], by_subzone),
+         "partition_by": by_subzone, "desc": "Creating PlanningArea nodes"},
+        {"query": "UNWIND $rows AS row MERGE (:VenueType {type_name: row.vt})",
+         "pages": collect_keys(stream_rows("venue_types", venue_type_row),
+                               expected["VenueType"], by_venue_type),
+         "partition_by": by_venue_type, "desc": "Creating VenueType nodes"},
+        {"query": "UNWIND $rows AS row MERGE (:Competitor {venue_name: row.name, subzone: row.sz})",
+         "pages": collect_keys(stream_rows("establishments", competitor_row),
+                               expected["Competitor"], lambda r: (r["name"], r["sz"])),
+         "partition_by": by_subzone, "desc": "Creating Competitor nodes"},
+        {"query": """
+            UNWIND $rows AS row
+            MERGE (cs:CompetitorStats {subzone: row.sz, venue_type: row.vt})
+            SET cs.overall_score    = row.overall_score,
+                cs.density          = row.density,
+                cs.competitor_count = row.competitor_count,
+                cs.name             = 'Stats for ' + row.sz + ' ' + row.vt
+         """,
+         "pages": collect_keys(stream_rows("competitor_stats", competitor_stats_row),
+                               expected["CompetitorStats"], lambda r: (r["sz"], r["vt"])),
+         "partition_by": by_subzone, "desc": "Creating CompetitorStats nodes"},
+    ]
+    for label, _, prefix, table in DEMOGRAPHIC_NODES:
+        node_phase.append({
+            "query": f"UNWIND $rows AS row MERGE (n:{label} {{subzone: row.sz}}) "
+                     f"SET n += row.props, n.name = '{prefix}' + row.sz",
+            "pages": collect_keys(stream_rows(table, demographic_row), expected[label], by_subzone),
+            "partition_by": by_subzone, "desc": f"Creating {label} nodes",
+        })
+    node_phase += [
+        {"query": "UNWIND $rows AS row MERGE (:PropertiesAvailable {subzone: row.sz})",
+         "pages": collect_keys(unique_subzones(stream_rows("industrial_properties", industrial_property_row)),
+                               expected["PropertiesAvailable"], by_subzone),
+         "partition_by": by_subzone, "desc": "Creating PropertiesAvailable nodes"},
+        {"query": "UNWIND $rows AS row CREATE (ip:IndustrialProperty) SET ip = row.props",
+         "pages": collect_keys(stream_rows("industrial_properties", industrial_property_row),
+                               expected["IndustrialProperty"], lambda r: (r["sz"], r["pid"])),
+         "partition_by": by_subzone, "desc": "Creating IndustrialProperty nodes"},
+    ]
+
+    # -- Phase 2: attributes on nodes created above --
+    attr_phase = [
+        {"query": "UNWIND $rows AS row MATCH (pa:PropertiesAvailable {subzone: row.sz}) SET pa += row.attrs",
+         "rows": [{"sz": sz, "attrs": attrs} for sz, attrs in expected["prices"].items()],
+         "partition_by": by_subzone, "desc": "Updating avg prices"},
+    ]
+
+    # -- Phase 3: relationships (tables are streamed again from the snapshot) --
+    rel_phase = [
+        {"query": """
+            UNWIND $rows AS row
+            MATCH (c:Competitor {venue_name: row.name, subzone: row.sz})
+            MATCH (pa:PlanningArea {subzone: row.sz})
+            MERGE (c)-[:LOCATED_IN]->(pa)
+         """, "pages": stream_rows("establishments", competitor_row),
+         "partition_by": by_subzone, "desc": "Linking Competitor→PlanningArea"},
+        # VenueType nodes are shared by every subzone, so these go by venue type instead
+        {"query": """
+            UNWIND $rows AS row
+            MATCH (c:Competitor {venue_name: row.name, subzone: row.sz})
+            MATCH (vt:VenueType {type_name: row.vt})
+            MERGE (c)-[:OF_TYPE]->(vt)
+         """,
+         "pages": collect_keys(stream_rows("establishments", competitor_row, where=lambda r: r["vt"]),
+                               expected["OF_TYPE"], lambda r: (r["name"], r["sz"], r["vt"])),
+         "partition_by": by_venue_type, "desc": "Linking Competitor→VenueType"},
+        {"query": """
+            UNWIND $rows AS row
+            MATCH (pa:PlanningArea {subzone: row.sz})
+            MATCH (cs:CompetitorStats {subzone: row.sz, venue_type: row.vt})
+            MERGE (pa)-[:HAS_COMPETITOR_STATS]->(cs)
+         """, "pages": stream_rows("competitor_stats", competitor_stats_row),
+         "partition_by": by_subzone, "desc": "Linking PlanningArea→CompetitorStats"},
+        {"query": """
+            UNWIND $rows AS row
+            MATCH (cs:CompetitorStats {subzone: row.sz, venue_type: row.vt})
+            MATCH (vt:VenueType {type_name: row.vt})
+            MERGE (cs)-[:FOR_TYPE]->(vt)
+         """, "pages": stream_rows("competitor_stats", competitor_stats_row),
+         "partition_by": by_venue_type, "desc": "Linking CompetitorStats→VenueType"},
+    ]
+    for label, rel, _, table in DEMOGRAPHIC_NODES:
+        rel_phase.append({
+            "query": f"""
+                UNWIND $rows AS row
+                MATCH (pa:PlanningArea {{subzone: row.sz}})
+                MATCH (n:{label} {{subzone: row.sz}})
+                MERGE (pa)-[:{rel}]->(n)
+            """,
+            "pages": stream_rows(table, demographic_row),
+            "partition_by": by_subzone, "desc": f"Linking PlanningArea→{label}",
+        })
+    rel_phase += [
+        {"query": """
+            UNWIND $rows AS row
+            MATCH (pl:PlanningArea {subzone: row.sz})
+            MATCH (pa:PropertiesAvailable {subzone: row.sz})
+            MERGE (pl)-[:OFFERS_PROPERTIES]->(pa)
+         """, "pages": unique_subzones(stream_rows("industrial_properties", industrial_property_row)),
+         "partition_by": by_subzone, "desc": "Linking PlanningArea→PropertiesAvailable"},
+        {"query": """
+            UNWIND $rows AS row
+            MATCH (pa:PropertiesAvailable {subzone: row.sz})
+            MATCH (ip:IndustrialProperty {property_id: row.pid})
+            MERGE (pa)-[:HAS_PROPERTY]->(ip)
+         """, "pages": stream_rows("industrial_properties", industrial_property_row),
+         "partition_by": by_subzone, "desc": "Linking PropertiesAvailable→IndustrialProperty"},
+    ]
+
+    PartitionedWriter(driver).run_phases([node_phase, attr_phase, rel_phase])
 
     driver.close()
     print("   • Finished create_graph_nodes_and_relationships()")
+    return expected
 
 # ─── Step 4: Validate graph ─────────────────────────────────────────────────────
-def validate_graph(planning_areas, venue_types, competitor_data, competitor_stats,
-                   demographics_age_group, demographics_housing_types, demographics_population,
-                   industrial_properties, avg_industrial_prices):
+def _report_missing(missing, fmt, limit=20):
+    for key in sorted(missing, key=str)[:limit]:
+        tqdm.write("[ERROR] " + fmt(key))
+    if len(missing) > limit:
+        tqdm.write(f"[ERROR] … and {len(missing) - limit} more")
+
+def validate_graph(expected):
     """
     Validate that every node and relationship in the Neo4j graph corresponds
-    to the data fetched from Supabase.
+    to the data streamed from Supabase, using the key sets collected while
+    building instead of the raw rows. Each check is one set-returning query.
 
     Validations performed:
       1. PlanningArea nodes exist.
@@ -351,243 +310,139 @@ def validate_graph(planning_areas, venue_types, competitor_data, competitor_stat
     user     = os.getenv("NEO4J_USERNAME")
     password = os.getenv("NEO4J_PASSWORD")
     driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    def keys(session, query):
+        return {tuple(r.values()) if len(r) > 1 else r[0] for r in session.run(query)}
+
     with driver.session() as session:
         # 1. Validate PlanningArea nodes
-        for pa in tqdm(planning_areas, desc="Validating PlanningArea"):
-            subzone = pa.get("subzone")
-            if not subzone:
-                continue
-            norm = subzone.strip().upper()
-            result = session.run(
-                "MATCH (p:PlanningArea {subzone: $subzone}) RETURN p",
-                subzone=norm
-            )
-            if not result.single():
-                tqdm.write(f"[ERROR] Missing PlanningArea node for '{norm}'")
+        actual = keys(session, "MATCH (p:PlanningArea) RETURN p.subzone")
+        _report_missing(expected["PlanningArea"] - actual,
+                        lambda sz: f"Missing PlanningArea node for '{sz}'")
 
         # 2. Validate VenueType nodes
-        for vt in tqdm(venue_types, desc="Validating VenueType"):
-            tname = vt.get("type_name")
-            if not tname:
-                continue
-            result = session.run(
-                "MATCH (v:VenueType {type_name: $name}) RETURN v",
-                name=tname
-            )
-            if not result.single():
-                tqdm.write(f"[ERROR] Missing VenueType node for '{tname}'")
+        actual = keys(session, "MATCH (v:VenueType) RETURN v.type_name")
+        _report_missing(expected["VenueType"] - actual,
+                        lambda t: f"Missing VenueType node for '{t}'")
 
         # 3. Validate Competitor nodes and relationships
-        for cd in tqdm(competitor_data, desc="Validating Competitor"):
-            vname = cd.get("venue_name")
-            subzone = cd.get("subzone")
-            vtype = cd.get("venue_type")
-            if not vname or vname == "No venues found":
-                continue
-            norm = subzone.strip().upper() if subzone else None
-
-            # Competitor itself
-            comp = session.run(
-                "MATCH (c:Competitor {venue_name: $v, subzone: $sz}) RETURN c",
-                v=vname, sz=norm
-            )
-            if not comp.single():
-                tqdm.write(f"[ERROR] Missing Competitor '{vname}' in '{norm}'")
-                continue
-
-            # LOCATED_IN relationship
-            loc = session.run(
-                """
-                MATCH (c:Competitor {venue_name: $v, subzone: $sz})-[:LOCATED_IN]->(p:PlanningArea {subzone: $sz})
-                RETURN c
-                """, v=vname, sz=norm
-            )
-            if not loc.single():
-                tqdm.write(f"[ERROR] Competitor '{vname}' not linked to PlanningArea '{norm}'")
-
-            # OF_TYPE relationship
-            if vtype:
-                typ = session.run(
-                    """
-                    MATCH (c:Competitor {venue_name: $v, subzone: $sz})-[:OF_TYPE]->(vt:VenueType {type_name: $t})
-                    RETURN c
-                    """, v=vname, sz=norm, t=vtype
-                )
-                if not typ.single():
-                    tqdm.write(f"[ERROR] Competitor '{vname}' not linked to VenueType '{vtype}'")
+        competitors = keys(session, "MATCH (c:Competitor) RETURN c.venue_name, c.subzone")
+        _report_missing(expected["Competitor"] - competitors,
+                        lambda k: f"Missing Competitor '{k[0]}' in '{k[1]}'")
+        located = keys(session, """
+            MATCH (c:Competitor)-[:LOCATED_IN]->(p:PlanningArea)
+            WHERE p.subzone = c.subzone
+            RETURN c.venue_name, c.subzone
+        """)
+        _report_missing((expected["Competitor"] & competitors) - located,
+                        lambda k: f"Competitor '{k[0]}' not linked to PlanningArea '{k[1]}'")
+        of_type = keys(session, """
+            MATCH (c:Competitor)-[:OF_TYPE]->(vt:VenueType)
+            RETURN c.venue_name, c.subzone, vt.type_name
+        """)
+        _report_missing({k for k in expected["OF_TYPE"] - of_type if k[:2] in competitors},
+                        lambda k: f"Competitor '{k[0]}' not linked to VenueType '{k[2]}'")
 
         # 4. Validate demographic nodes and relationships
-        # AgeDistribution
-        for rec in tqdm(demographics_age_group, desc="Validating AgeDistribution"):
-            sz = rec.get("subzone")
-            if not sz:
-                continue
-            norm = sz.strip().upper()
-            res = session.run(
-                """
-                MATCH (p:PlanningArea {subzone: $sz})-[:HAS_AGE_DISTRIBUTION]->(ad:AgeDistribution {subzone: $sz})
-                RETURN ad
-                """, sz=norm
-            )
-            if not res.single():
-                tqdm.write(f"[ERROR] Missing AgeDistribution for '{norm}'")
-
-        # HousingProfile
-        for rec in tqdm(demographics_housing_types, desc="Validating HousingProfile"):
-            sz = rec.get("subzone")
-            if not sz:
-                continue
-            norm = sz.strip().upper()
-            res = session.run(
-                """
-                MATCH (p:PlanningArea {subzone: $sz})-[:HAS_HOUSING_PROFILE]->(hp:HousingProfile {subzone: $sz})
-                RETURN hp
-                """, sz=norm
-            )
-            if not res.single():
-                tqdm.write(f"[ERROR] Missing HousingProfile for '{norm}'")
-
-        # PopulationStats
-        for rec in tqdm(demographics_population, desc="Validating PopulationStats"):
-            sz = rec.get("subzone")
-            if not sz:
-                continue
-            norm = sz.strip().upper()
-            res = session.run(
-                """
-                MATCH (p:PlanningArea {subzone: $sz})-[:HAS_POPULATION_STATS]->(ps:PopulationStats {subzone: $sz})
-                RETURN ps
-                """, sz=norm
-            )
-            if not res.single():
-                tqdm.write(f"[ERROR] Missing PopulationStats for '{norm}'")
+        for label, rel, _, _ in DEMOGRAPHIC_NODES:
+            actual = keys(session, f"""
+                MATCH (p:PlanningArea)-[:{rel}]->(n:{label})
+                WHERE n.subzone = p.subzone
+                RETURN p.subzone
+            """)
+            _report_missing(expected[label] - actual, lambda sz, l=label: f"Missing {l} for '{sz}'")
 
         # 5. Validate CompetitorStats nodes are linked from PlanningArea
-        seen = set()
-        for rec in competitor_stats:
-            sz = rec.get("subzone")
-            vt = rec.get("venue_type")
-            if sz and vt:
-                seen.add((sz.strip().upper(), vt))
-        for sz, vt in tqdm(seen, desc="Validating CompetitorStats links"):
-            res = session.run(
-                """
-                MATCH (pa:PlanningArea {subzone: $sz})
-                      -[:HAS_COMPETITOR_STATS]->
-                      (cs:CompetitorStats {subzone: $sz, venue_type: $vt})
-                RETURN cs
-                """,
-                sz=sz, vt=vt
-            )
-            if not res.single():
-                tqdm.write(f"[ERROR] Missing HAS_COMPETITOR_STATS for '{sz}' / '{vt}'")
+        actual = keys(session, """
+            MATCH (pa:PlanningArea)-[:HAS_COMPETITOR_STATS]->(cs:CompetitorStats)
+            WHERE cs.subzone = pa.subzone
+            RETURN cs.subzone, cs.venue_type
+        """)
+        _report_missing(expected["CompetitorStats"] - actual,
+                        lambda k: f"Missing HAS_COMPETITOR_STATS for '{k[0]}' / '{k[1]}'")
 
         # 6. Validate IndustrialProperty and PropertiesAvailable
-        FILTERED = {"dormitory", "showroom", "office_grade_a", "generic_office", "factory", "warehouse"}
-        unique_subzones = set()
-
-        for rec in tqdm(industrial_properties, desc="Validating IndustrialProperty"):
-            sub = rec.get("sub_category")
-            if sub in FILTERED:
-                continue
-            sz = rec.get("subzone")
-            pid = rec.get("property_id")
-            if not sz or not pid:
-                continue
-            norm = sz.strip().upper()
-            unique_subzones.add(norm)
-
-            # IndustrialProperty node
-            ip = session.run(
-                "MATCH (ip:IndustrialProperty {property_id: $pid}) RETURN ip",
-                pid=pid
-            )
-            if not ip.single():
-                tqdm.write(f"[ERROR] Missing IndustrialProperty '{pid}' in '{norm}'")
-                continue
-
-            # HAS_PROPERTY relationship
-            link = session.run(
-                """
-                MATCH (pa:PropertiesAvailable {subzone: $sz})-[:HAS_PROPERTY]->(ip:IndustrialProperty {property_id: $pid})
-                RETURN ip
-                """, sz=norm, pid=pid
-            )
-            if not link.single():
-                tqdm.write(f"[ERROR] IndustrialProperty '{pid}' not linked under PropertiesAvailable '{norm}'")
+        props = keys(session, "MATCH (ip:IndustrialProperty) RETURN ip.property_id")
+        _report_missing({k for k in expected["IndustrialProperty"] if k[1] not in props},
+                        lambda k: f"Missing IndustrialProperty '{k[1]}' in '{k[0]}'")
+        linked = keys(session, """
+            MATCH (pa:PropertiesAvailable)-[:HAS_PROPERTY]->(ip:IndustrialProperty)
+            RETURN pa.subzone, ip.property_id
+        """)
+        _report_missing({k for k in expected["IndustrialProperty"] - linked if k[1] in props},
+                        lambda k: f"IndustrialProperty '{k[1]}' not linked under PropertiesAvailable '{k[0]}'")
 
         # OFFERS_PROPERTIES relationship
-        for norm in tqdm(unique_subzones, desc="Validating PropertiesAvailable→PlanningArea"):
-            rel = session.run(
-                """
-                MATCH (pl:PlanningArea {subzone: $sz})-[:OFFERS_PROPERTIES]->(pa:PropertiesAvailable {subzone: $sz})
-                RETURN pa
-                """, sz=norm
-            )
-            if not rel.single():
-                tqdm.write(f"[ERROR] PropertiesAvailable '{norm}' not offered by PlanningArea")
+        actual = keys(session, """
+            MATCH (pl:PlanningArea)-[:OFFERS_PROPERTIES]->(pa:PropertiesAvailable)
+            WHERE pl.subzone = pa.subzone
+            RETURN pa.subzone
+        """)
+        _report_missing(expected["PropertiesAvailable"] - actual,
+                        lambda sz: f"PropertiesAvailable '{sz}' not offered by PlanningArea")
 
         # 7. Validate averagePrice_* attributes
-        EXCL = {"dormitory", "showroom", "office_grade_a", "generic_office", "factory", "warehouse"}
-        price_map = {}
-        for rec in avg_industrial_prices:
-            sub = rec.get("sub_category")
-            if sub in EXCL:
-                continue
-            sz = rec.get("subzone")
-            lt = rec.get("listing_type")
-            avg = rec.get("average_price")
-            if not sz or not lt:
-                continue
-            norm = sz.strip().upper()
-            key = f"averagePrice_{sub.lower().replace(' ', '_')}_{lt.lower()}"
-            price_map.setdefault(norm, {})[key] = avg
-
-        for norm, attrs in tqdm(price_map.items(), desc="Validating averagePrice attributes"):
-            node = session.run(
-                "MATCH (pa:PropertiesAvailable {subzone: $sz}) RETURN pa",
-                sz=norm
-            ).single()
-            if not node:
+        nodes = {r["sz"]: r["pa"] for r in session.run(
+            "MATCH (pa:PropertiesAvailable) RETURN pa.subzone AS sz, pa"
+        )}
+        for norm, attrs in expected["prices"].items():
+            pavail = nodes.get(norm)
+            if pavail is None:
                 tqdm.write(f"[ERROR] Missing PropertiesAvailable node for '{norm}'")
                 continue
-            pavail = node["pa"]
-            for attr, expected in attrs.items():
-                actual = pavail.get(attr)
-                if str(actual) != str(expected):
-                    tqdm.write(f"[ERROR] '{attr}' for '{norm}': expected {expected}, got {actual}")
-
+            for attr, value in attrs.items():
+                actual_value = pavail.get(attr)
+                if str(actual_value) != str(value):
+                    tqdm.write(f"[ERROR] '{attr}' for '{norm}': expected {value}, got {actual_value}")
 
         # 8. Validate CompetitorStats → VenueType links
-        #    (assumes you have a relationship type—for example :TYPE_STATS—linking stats to their venue type)
-        for record in tqdm(competitor_stats, desc="Validating CompetitorStats→VenueType"):
-            sz = record.get("subzone")
-            vt = record.get("venue_type")
-            if not sz or not vt:
-                continue
-            norm = sz.strip().upper()
-
-            rel = session.run(
-                """
-                MATCH (cs:CompetitorStats {subzone: $sz})
-                    -[:FOR_TYPE]->(vt:VenueType {type_name: $vt})
-                RETURN vt
-                """,
-                sz=norm, vt=vt
-            )
-            if not rel.single():
-                tqdm.write(f"[ERROR] CompetitorStats for '{norm}' → VenueType '{vt}' link missing")
+        actual = keys(session, """
+            MATCH (cs:CompetitorStats)-[:FOR_TYPE]->(vt:VenueType)
+            RETURN cs.subzone, vt.type_name
+        """)
+        _report_missing(expected["CompetitorStats"] - actual,
+                        lambda k: f"CompetitorStats for '{k[0]}' → VenueType '{k[1]}' link missing")
 
     driver.close()
     print("Graph validation completed successfully.")
 
+# ─── Memory report ─────────────────────────────────────────────────────────────
+# TRACE_MEMORY=1 python graph_builder.py  → tracemalloc peak per step
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "").lower() in ("1", "true", "yes")
+memory_peaks = []
+
+@contextmanager
+def memory_step(name):
+    if not TRACE_MEMORY:
+        yield
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        memory_peaks.append((name, current, peak))
+
+def print_memory_report():
+    if not memory_peaks:
+        return
+    print("   • Peak Python memory per step (tracemalloc):")
+    for name, current, peak in memory_peaks:
+        print(f"     {name:<12} peak {peak / 2**20:8.1f} MiB   retained {current / 2**20:8.1f} MiB")
+
 # ─── Main entrypoint ───────────────────────────────────────────────────────────
 def main():
     print("➡️  Enter main()")
-    data = fetch_supabase_data()
-    clear_graph()
-    create_graph_nodes_and_relationships(*data)
-    validate_graph(*data)
+    load_dotenv()
+    with memory_step("clear"):
+        clear_graph()
+    with memory_step("build"):
+        expected = create_graph_nodes_and_relationships()
+    with memory_step("validate"):
+        validate_graph(expected)
+    print_memory_report()
     print("✅ All done!")
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+"""
+Shared normalisation rules for turning Supabase rows into knowledge-graph nodes.
+
+graph_builder.py (Bolt) and bulk_export.py (neo4j-admin import CSVs) both go
+through these helpers so the two build paths produce the same graph.
+"""
+
+# Industrial sub-categories that are never loaded into the graph
+FILTERED_SUBCATEGORIES = ["dormitory", "showroom", "office_grade_a", "generic_office", "factory", "warehouse"]
+
+# Demographic tables use "-" for empty cells
+NO_DATA = "No data available"
+
+# Placeholder venue name written by the establishments scraper
+NO_VENUES = "No venues found"
+
+
+def normalise_subzone(subzone):
+    """Subzone keys are matched case-insensitively, stored upper-cased."""
+    return subzone.strip().upper() if subzone else None
+
+
+def clean_props(rec):
+    """Replace the "-" placeholder with a readable value."""
+    return {k: (NO_DATA if v == "-" else v) for k, v in rec.items()}
+
+
+def is_competitor(name):
+    return bool(name) and name != NO_VENUES
+
+
+def is_filtered_property(sub_category):
+    return sub_category in FILTERED_SUBCATEGORIES
+
+
+def average_price_key(sub_category, listing_type):
+    """Attribute name used on PropertiesAvailable, e.g. averagePrice_retail_shop_rent."""
+    return f"averagePrice_{sub_category.lower().replace(' ', '_')}_{listing_type.lower()}"
+
+
+def group_average_prices(avg_industrial_prices):
+    """Group avg_industrial_prices rows into {subzone: {averagePrice_*: price}}."""
+    avg_group = {}
+    for rec in avg_industrial_prices:
+        subcat = rec.get("sub_category")
+        if not subcat or is_filtered_property(subcat):
+            continue
+        subzone = rec.get("subzone")
+        lt = rec.get("listing_type")
+        if not subzone or not lt:
+            continue
+        sz = normalise_subzone(subzone)
+        avg_group.setdefault(sz, {})[average_price_key(subcat, lt)] = rec.get("average_price")
+    return avg_group
+
+
+def industrial_property_props(rec):
+    """Property map stored on an IndustrialProperty node."""
+    return {
+        "property_id": rec.get("property_id"),
+        "listing_id":  rec.get("listing_id"),
+        "listing_url": rec.get("listing_url"),
+        "price":       rec.get("price"),
+        "description": rec.get("description"),
+        "sub_category": rec.get("sub_category"),
+        "status":      rec.get("status"),
+        "area_size":   rec.get("area_size"),
+        "listing_type": rec.get("listing_type")
+    }
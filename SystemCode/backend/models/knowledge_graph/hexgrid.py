@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Hexagonal grid aggregation below the subzone level.
+
+Subzones range from a few hectares to tens of km², so a hotspot inside a
+large subzone disappears in its totals. This module bins everything onto
+pointy-top hexagons of a fixed size in a local metric projection, at several
+resolutions (HEX_SIZES_M, circumradius in metres). It is plain NumPy with no
+H3 dependency.
+
+Per cell and resolution it precomputes:
+  venues_<TYPE>    establishments of each venue type
+  venues_total     all establishments
+  listings         industrial property listings
+  mean_psf         mean area_ppsf of those listings (NaN without any)
+  population       subzone population placed at its subzone's centroid
+  subzone / planning_area   of the cell centre (None at sea)
+
+Each resolution is a compact array-backed table: sorted int64 cell ids plus
+one NumPy column per measure, saved as outputs/hex_<size>m.npz. Lookups and
+neighbour queries are searchsorted calls over the ids.
+
+    table = HexTable.load(500)
+    table.at(lats, lons)                       # row per point (-1 if no cell)
+    table.neighbours(cell_ids, k=1)            # rows of the k-ring around each cell
+    table.top("TAMPINES", "venues_CAFE", n=5)  # busiest cells of a planning area / subzone
+
+    python hexgrid.py                          # build every resolution
+    python hexgrid.py --query TAMPINES --column venues_CAFE --size 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GEOMETRY_DIR = os.getenv(
+    "GEOMETRY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(HERE)), "data_processing", "data_extraction_scripts"),
+)
+# geometry_store / spatial_join are imported lazily, also when the caller passes its own store
+if GEOMETRY_DIR not in sys.path:
+    sys.path.insert(0, GEOMETRY_DIR)
+OUTPUT_DIR = os.path.join(HERE, "outputs")
+HEX_SIZES_M = [int(s) for s in os.getenv("HEX_SIZES_M", "250,500,1000").split(",")]
+
+# Equirectangular metres around Singapore's latitude; < 0.1% error across the island
+METRES_PER_DEGREE = 111_320
+LAT0 = 1.35
+KX = METRES_PER_DEGREE * np.cos(np.radians(LAT0))
+SQRT3 = np.sqrt(3.0)
+
+# Axial (q, r) packed into one int64: 21 bits each, offset to be non-negative
+_OFFSET = 1 << 20
+_SHIFT = 21
+
+
+def _load_store():
+    from geometry_store import load_store
+    return load_store()
+
+
+# ─── Hex geometry ─────────────────────────────────────────────────────────────
+class HexGrid:
+    """Pointy-top hexagons of circumradius size_m over local metric coordinates."""
+
+    def __init__(self, size_m: float):
+        self.size_m = float(size_m)
+
+    def axial(self, lats, lons):
+        """(q, r) of the hexagon containing each point (cube rounding)."""
+        x = np.asarray(lons, dtype=np.float64) * KX
+        y = np.asarray(lats, dtype=np.float64) * METRES_PER_DEGREE
+        qf = (SQRT3 / 3 * x - y / 3) / self.size_m
+        rf = (2 / 3 * y) / self.size_m
+        sf = -qf - rf
+        q, r, s = np.round(qf), np.round(rf), np.round(sf)
+        dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+        fix_q = (dq > dr) & (dq > ds)
+        fix_r = ~fix_q & (dr > ds)
+        q = np.where(fix_q, -r - s, q)
+        r = np.where(fix_r, -q - s, r)
+        return q.astype(np.int64), r.astype(np.int64)
+
+    def cell_of(self, lats, lons) -> np.ndarray:
+        """Packed cell id of each point; -1 without coordinates."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        out = np.full(len(lats), -1, dtype=np.int64)
+        ok = np.isfinite(lats) & np.isfinite(lons)
+        q, r = self.axial(lats[ok], lons[ok])
+        out[ok] = pack(q, r)
+        return out
+
+    def centres(self, ids):
+        """(lats, lons) of cell centres."""
+        q, r = unpack(ids)
+        x = self.size_m * SQRT3 * (q + r / 2)
+        y = self.size_m * 1.5 * r
+        return y / METRES_PER_DEGREE, x / KX
+
+    def covering(self, bounds) -> np.ndarray:
+        """Ids of every cell whose centre lies in (minx, miny, maxx, maxy), padded by one cell."""
+        minx, miny, maxx, maxy = bounds
+        q0, r0 = self.axial([miny, maxy, miny, maxy], [minx, minx, maxx, maxx])
+        q, r = np.meshgrid(np.arange(q0.min() - 1, q0.max() + 2), np.arange(r0.min() - 1, r0.max() + 2))
+        ids = pack(q.ravel(), r.ravel())
+        lat, lon = self.centres(ids)
+        inside = (lon >= minx) & (lon <= maxx) & (lat >= miny) & (lat <= maxy)
+        return ids[inside]
+
+
+def pack(q, r) -> np.ndarray:
+    return (np.asarray(q, dtype=np.int64) + _OFFSET) << _SHIFT | (np.asarray(r, dtype=np.int64) + _OFFSET)
+
+
+def unpack(ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    return (ids >> _SHIFT) - _OFFSET, (ids & ((1 << _SHIFT) - 1)) - _OFFSET
+
+
+def ring_offsets(k: int):
+    """Axial offsets of every cell within k steps, the centre included."""
+    dq, dr = np.meshgrid(np.arange(-k, k + 1), np.arange(-k, k + 1))
+    dq, dr = dq.ravel(), dr.ravel()
+    keep = np.maximum.reduce([np.abs(dq), np.abs(dr), np.abs(dq + dr)]) <= k
+    return dq[keep], dr[keep]
+
+
+# ─── Array-backed table ───────────────────────────────────────────────────────
+class HexTable:
+    """Sorted cell ids and one NumPy array per column, row-aligned."""
+
+    def __init__(self, size_m: float, ids: np.ndarray, columns: dict):
+        order = np.argsort(ids)
+        self.grid = HexGrid(size_m)
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.columns = {name: np.asarray(col)[order] for name, col in columns.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, ids) -> np.ndarray:
+        """Row of each cell id; -1 where the table has no such cell."""
+        ids = np.asarray(ids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, ids).clip(0, max(len(self.ids) - 1, 0))
+        return np.where((len(self.ids) > 0) & (self.ids[pos] == ids), pos, -1)
+
+    def at(self, lats, lons) -> np.ndarray:
+        return self.rows(self.grid.cell_of(lats, lons))
+
+    def neighbours(self, ids, k: int = 1) -> np.ndarray:
+        """(len(ids), ring size) rows of the k-ring around each cell, -1 for cells not in the table."""
+        q, r = unpack(ids)
+        dq, dr = ring_offsets(k)
+        return self.rows(pack(q[:, None] + dq[None, :], r[:, None] + dr[None, :]))
+
+    def top(self, area: str, column: str, n: int = 5) -> np.ndarray:
+        """Rows of the n highest `column` cells whose centre is in the planning area or subzone `area`."""
+        area = area.strip().upper()
+        mask = (self.columns["planning_area"] == area) | (self.columns["subzone"] == area)
+        rows = np.flatnonzero(mask)
+        values = np.nan_to_num(self.columns[column][rows].astype(np.float64), nan=-np.inf)
+        return rows[np.argsort(-values, kind="stable")[:n]]
+
+    @staticmethod
+    def path(size_m: float) -> str:
+        return os.path.join(OUTPUT_DIR, f"hex_{int(size_m)}m.npz")
+
+    def save(self, path: str = None):
+        path = path or HexTable.path(self.grid.size_m)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cols = {f"col_{k}": (v.astype(str) if v.dtype == object else v) for k, v in self.columns.items()}
+        np.savez_compressed(path, size_m=self.grid.size_m, ids=self.ids, **cols)
+        return path
+
+    @classmethod
+    def load(cls, size_m: float, path: str = None) -> "HexTable":
+        with np.load(path or cls.path(size_m)) as f:
+            cols = {k[4:]: f[k] for k in f.files if k.startswith("col_")}
+            table = cls(float(f["size_m"]), f["ids"], {})
+        for key in ("subzone", "planning_area"):
+            if key in cols:
+                cols[key] = np.where(cols[key] == "None", None, cols[key]).astype(object)
+        table.columns = cols  # saved already sorted
+        return table
+
+
+# ─── Build ────────────────────────────────────────────────────────────────────
+def _subzone_population() -> dict:
+    """{SUBZONE: total population} from demographics_population."""
+    import pandas as pd
+    pop = snapshot.load_frame("demographics_population", zero_copy=False)
+    cols = [c for c in pop.columns if c.startswith("population_") and c != "population_density"]
+    values = pop[cols].apply(lambda c: pd.to_numeric(c.astype(str).str.replace(",", ""), errors="coerce"))
+    totals = values.fillna(0).sum(axis=1)
+    return {
+        str(sz).strip().upper(): float(t) for sz, t in zip(pop["subzone"], totals) if isinstance(sz, str)
+    }
+
+
+def load_inputs(store=None) -> dict:
+    import shapely
+
+    est = snapshot.load_frame("establishments", ["latitude", "longitude", "venue_type"], zero_copy=False)
+    props = snapshot.load_frame("industrial_properties", ["latitude", "longitude", "area_ppsf"], zero_copy=False)
+    store = store if store is not None else _load_store()
+    centroids = shapely.centroid(store.geometries())
+    population = _subzone_population()
+    return {
+        "est": est, "props": props, "store": store,
+        "centroid_lats": shapely.get_y(centroids), "centroid_lons": shapely.get_x(centroids),
+        "centroid_pop": np.array([population.get(n.strip().upper(), 0.0) for n in store.names]),
+    }
+
+
+def build_table(size_m: float, inputs: dict) -> HexTable:
+    from spatial_join import SubzoneIndex
+
+    grid = HexGrid(size_m)
+    est, props, store = inputs["est"], inputs["props"], inputs["store"]
+    est_cells = grid.cell_of(est["latitude"], est["longitude"])
+    prop_cells = grid.cell_of(props["latitude"], props["longitude"])
+    pop_cells = grid.cell_of(inputs["centroid_lats"], inputs["centroid_lons"])
+
+    # Every land cell (centre inside a subzone) plus every cell that holds data
+    b = store.bounds
+    land = grid.covering((b[:, 0].min(), b[:, 1].min(), b[:, 2].max(), b[:, 3].max()))
+    index = SubzoneIndex.from_store(store)
+    lat, lon = grid.centres(land)
+    land = land[index.lookup(lon, lat) >= 0]
+    ids = np.unique(np.concatenate([land, est_cells, prop_cells, pop_cells]))
+    ids = ids[ids >= 0]
+
+    lat, lon = grid.centres(ids)
+    sz_rows = index.lookup(lon, lat)
+    names = np.asarray(store.names, dtype=object)
+    areas = np.asarray(store.planning_areas, dtype=object)
+    columns = {
+        "subzone": np.where(sz_rows >= 0, names[sz_rows], None),
+        "planning_area": np.where(sz_rows >= 0, areas[sz_rows], None),
+    }
+
+    def binned(cells, weights=None):
+        pos = np.searchsorted(ids, cells[cells >= 0])
+        w = None if weights is None else np.asarray(weights, dtype=np.float64)[cells >= 0]
+        return np.bincount(pos, weights=w, minlength=len(ids))
+
+    types = est["venue_type"].astype(object).to_numpy()
+    for vt in sorted({t for t in types if isinstance(t, str) and t}):
+        columns[f"venues_{vt}"] = binned(np.where(types == vt, est_cells, -1)).astype(np.int32)
+    columns["venues_total"] = binned(est_cells).astype(np.int32)
+
+    psf = np.asarray(props["area_ppsf"], dtype=np.float64)
+    has_psf = np.where(np.isfinite(psf), prop_cells, -1)
+    columns["listings"] = binned(prop_cells).astype(np.int32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        columns["mean_psf"] = (binned(has_psf, np.nan_to_num(psf)) / binned(has_psf)).astype(np.float32)
+    columns["population"] = binned(pop_cells, inputs["centroid_pop"]).astype(np.float32)
+    return HexTable(size_m, ids, columns)
+
+
+def build_all(sizes=HEX_SIZES_M) -> dict:
+    start = time.perf_counter()
+    inputs = load_inputs()
+    print(f"🔍 {len(inputs['est']):,} establishments, {len(inputs['props']):,} listings, "
+          f"{len(inputs['store'])} subzones loaded in {time.perf_counter() - start:.2f}s")
+    tables = {}
+    for size in sizes:
+        start = time.perf_counter()
+        table = build_table(size, inputs)
+        path = table.save()
+        print(f"✅ {size} m: {len(table):,} cells, {len(table.columns)} columns in "
+              f"{time.perf_counter() - start:.2f}s → {path} ({os.path.getsize(path) / 1e3:.0f} kB)")
+        tables[size] = table
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hex-grid aggregation of venues, listings and population")
+    parser.add_argument("--sizes", default=",".join(map(str, HEX_SIZES_M)), help="hex circumradius in metres")
+    parser.add_argument("--query", default=None, help="planning area or subzone to list the top cells of")
+    parser.add_argument("--column", default="venues_total")
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--top", type=int, default=5)
+    opts = parser.parse_args()
+
+    if opts.query:
+        table = HexTable.load(opts.size)
+        lats, lons = table.grid.centres(table.ids)
+        for row in table.top(opts.query, opts.column, opts.top):
+            around = table.neighbours(table.ids[[row]], k=1)[0]
+            ring_total = table.columns[opts.column][around[around >= 0]].sum()
+            print(f"   • cell {table.ids[row]} at ({lats[row]:.5f}, {lons[row]:.5f}) in "
+                  f"{table.columns['subzone'][row]}: {opts.column} = {table.columns[opts.column][row]}, "
+                  f"{ring_total} with its neighbours")
+        return
+    build_all([int(s) for s in opts.sizes.split(",")])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Map layers for geo_analysis.py's outputs/sg_venue_map.html.
+
+The map used to get one folium.CircleMarker (and one popup) per venue, which
+for ~7k venues means ~7k Leaflet objects written out one by one in the HTML.
+Here each venue type is one GeoJSON FeatureCollection inside a marker
+cluster: the features are embedded once as JSON and Leaflet builds the
+markers and popups in the browser. Subzone underserved and overall scores are
+drawn as choropleth layers from the cheapest subzone simplification tier
+(subzone_tiers.py) within MAP_MAX_AREA_ERROR, so neighbouring outlines still
+share their borders.
+
+    m = build_map(venues, scores)          # venues: name, type, lat, lon, subzone
+    m.save("outputs/sg_venue_map.html")
+
+    python map_layers.py --benchmark       # per-venue CircleMarkers vs these layers
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import MarkerCluster
+from folium.template import Template
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GEOMETRY_DIR = os.getenv(
+    "GEOMETRY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(HERE)), "data_processing", "data_extraction_scripts"),
+)
+DATA_DIR = os.path.join(HERE, "..", "..", "supabase_setup", "data")
+
+CENTER = [1.3521, 103.8198]
+# Largest per-subzone area change accepted for display; per-polygon simplification
+# at ~10 m, which this replaced, changed subzones by up to 2.7%
+MAP_MAX_AREA_ERROR = float(os.getenv("MAP_MAX_AREA_ERROR", "0.03"))
+COORD_DECIMALS = 5
+PALETTE = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b",
+    "#e377c2", "#7f7f7f", "#bcbd22", "#17becf", "#393b79", "#637939",
+]
+
+
+class ClusteredGeoJson(MarkerCluster):
+    """A point FeatureCollection rendered as circle markers in a marker cluster.
+
+    Features carry name / type / subzone properties; popups are built in the
+    browser when opened.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+                L.geoJSON({{ this.data|tojson }}, {
+                    pointToLayer: function (feature, latlng) {
+                        return L.circleMarker(latlng, {{ this.marker|tojson }});
+                    },
+                    onEachFeature: function (feature, layer) {
+                        layer.bindPopup(function () {
+                            var p = feature.properties;
+                            return {{ this.prefix|tojson }} + p.name + " (" + p.type + ") in " + p.subzone;
+                        });
+                    }
+                }).addTo(cluster);
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, data: dict, color: str = "blue", radius: int = 3, prefix: str = "",
+                 name=None, show=True, **kwargs):
+        super().__init__(name=name, show=show, **kwargs)
+        self._name = "ClusteredGeoJson"
+        self.data = data
+        self.prefix = prefix
+        self.marker = {"radius": radius, "color": color, "fill": True, "fillOpacity": 0.7, "weight": 1}
+
+
+def venue_features(venues: pd.DataFrame) -> dict:
+    """FeatureCollection of the venues with coordinates, built column-wise."""
+    lat = pd.to_numeric(venues["lat"], errors="coerce").to_numpy()
+    lon = pd.to_numeric(venues["lon"], errors="coerce").to_numpy()
+    keep = np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+    names = venues["name"].astype(str).to_numpy()[keep]
+    types = venues["type"].astype(str).to_numpy()[keep]
+    subzones = venues["subzone"].astype(str).to_numpy()[keep]
+    coords = np.round(np.column_stack([lon[keep], lat[keep]]), 6).tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": c},
+             "properties": {"name": n, "type": t, "subzone": s}}
+            for c, n, t, s in zip(coords, names, types, subzones)
+        ],
+    }
+
+
+def add_venue_layers(m, venues: pd.DataFrame):
+    """One clustered GeoJSON layer per venue type."""
+    venues = venues[venues["type"].notna() & (venues["type"].astype(str) != "")]
+    for i, (vtype, group) in enumerate(sorted(venues.groupby("type"), key=lambda kv: str(kv[0]))):
+        ClusteredGeoJson(
+            venue_features(group), color=PALETTE[i % len(PALETTE)],
+            name=f"{vtype} ({len(group)})", disableClusteringAtZoom=16,
+        ).add_to(m)
+
+
+def add_highlight_layer(m, venues: pd.DataFrame, top: pd.DataFrame):
+    """Venues of the top underserved (subzone, type) combinations, unclustered and in red."""
+    keys = pd.MultiIndex.from_frame(top[["subzone", "type"]])
+    hit = pd.MultiIndex.from_frame(venues[["subzone", "type"]]).isin(keys)
+    if not hit.any():
+        return
+    ClusteredGeoJson(
+        venue_features(venues[hit]), color="red", radius=6, prefix="UNDERSERVED: ",
+        name="Top underserved", disableClusteringAtZoom=1,
+    ).add_to(m)
+
+
+def subzone_shapes(store=None) -> dict:
+    """FeatureCollection of the subzone outlines at display resolution, rounded."""
+    import shapely
+
+    if store is None:
+        sys.path.insert(0, GEOMETRY_DIR)
+        from subzone_tiers import load_tier, pick_tier
+        store = load_tier(pick_tier(max_area_error=MAP_MAX_AREA_ERROR))
+    geoms = shapely.set_precision(store.geometries(), 10 ** -COORD_DECIMALS)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": json.loads(g), "properties": {"subzone": name}}
+            for g, name in zip(shapely.to_geojson(geoms), store.names)
+        ],
+    }
+
+
+def add_choropleths(m, shapes: dict, scores: pd.DataFrame):
+    """Subzone choropleths of the per-subzone mean underserved and overall scores."""
+    by_subzone = scores.groupby("subzone")[["underserved_score", "overall_score"]].mean().reset_index()
+    for column, show in (("underserved_score", True), ("overall_score", False)):
+        data = by_subzone.dropna(subset=[column])
+        if data.empty:
+            continue
+        folium.Choropleth(
+            geo_data=shapes, data=data, columns=["subzone", column], key_on="feature.properties.subzone",
+            fill_color="YlOrRd", fill_opacity=0.5, line_weight=0.5, nan_fill_opacity=0.0,
+            name=f"Subzone {column.replace('_', ' ')}", legend_name=f"Mean {column} (all venue types)",
+            show=show,
+        ).add_to(m)
+
+
+def build_map(venues: pd.DataFrame, scores: pd.DataFrame, top_underserved: pd.DataFrame = None, store=None):
+    """venues: name, type, lat, lon, subzone; scores: subzone, underserved_score, overall_score."""
+    m = folium.Map(location=CENTER, zoom_start=12)
+    add_choropleths(m, subzone_shapes(store), scores)
+    add_venue_layers(m, venues)
+    if top_underserved is not None and not top_underserved.empty:
+        add_highlight_layer(m, venues, top_underserved)
+    folium.LayerControl(collapsed=True).add_to(m)
+    return m
+
+
+# ─── Benchmark ────────────────────────────────────────────────────────────────
+def _circle_marker_map(venues: pd.DataFrame):
+    """The map as geo_analysis.py used to build it: one CircleMarker per venue."""
+    m = folium.Map(location=CENTER, zoom_start=12)
+    for _, row in venues.iterrows():
+        if row['lat'] and row['lon'] and row['type']:
+            folium.CircleMarker(
+                location=[float(row['lat']), float(row['lon'])],
+                radius=3,
+                popup=f"{row['name']} ({row['type']}) in {row['subzone']}",
+                color='blue',
+                fill=True
+            ).add_to(m)
+    return m
+
+
+def _timed_save(m, path):
+    start = time.perf_counter()
+    m.save(path)
+    return time.perf_counter() - start, os.path.getsize(path)
+
+
+def benchmark(out_dir: str = "/tmp"):
+    est = pd.read_csv(os.path.join(DATA_DIR, "establishments.csv"))
+    venues = pd.DataFrame({
+        "name": est["venue_name"], "type": est["venue_type"],
+        "lat": est["latitude"], "lon": est["longitude"], "subzone": est["subzone"],
+    })
+    stats = pd.read_csv(os.path.join(DATA_DIR, "competitor_stats.csv"))
+    scores = stats[["subzone", "underserved_score", "overall_score"]]
+    print(f"🔍 {len(venues):,} venues, {scores['subzone'].nunique()} scored subzones")
+
+    start = time.perf_counter()
+    old = _circle_marker_map(venues)
+    build_s = time.perf_counter() - start
+    save_s, size = _timed_save(old, os.path.join(out_dir, "sg_venue_map_circles.html"))
+    print(f"   • per-venue CircleMarkers: build {build_s:.2f}s, save {save_s:.2f}s, {size / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    top = stats.sort_values("underserved_score", ascending=False).head(10).rename(columns={"venue_type": "type"})
+    new = build_map(venues, scores, top)
+    build_s2 = time.perf_counter() - start
+    save_s2, size2 = _timed_save(new, os.path.join(out_dir, "sg_venue_map_layers.html"))
+    print(f"   • GeoJSON layers + choropleths: build {build_s2:.2f}s, save {save_s2:.2f}s, {size2 / 1e6:.1f} MB")
+    print(f"   • {(build_s + save_s) / (build_s2 + save_s2):.1f}× faster, {size / size2:.1f}× smaller")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Venue map layers")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--out-dir", default="/tmp")
+    opts = parser.parse_args()
+    if opts.benchmark:
+        benchmark(opts.out_dir)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
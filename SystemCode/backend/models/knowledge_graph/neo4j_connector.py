@@ -1,5 +1,16 @@
 from neo4j import GraphDatabase
 from config import load_config
+from neo4j_writer import PartitionedWriter
+from proximity import ProximityIndex
+
+# Undirected MERGE: an existing NEAR edge in either direction is reused
+NEAR_QUERY = """
+UNWIND $rows AS row
+MATCH (a:Location {id: row.a})
+MATCH (b:Location {id: row.b})
+MERGE (a)-[r:NEAR]-(b)
+SET r.distance = row.distance
+"""
 
 class Neo4jConnector:
     """Class to handle Neo4j database interactions"""
@@ -102,37 +113,37 @@ class Neo4jConnector:
     
     def create_proximity_relationships(self, distance_threshold=2.0):
         """Create NEAR relationships between locations within a certain distance
-        
+
+        Pairs are found with a KD-tree radius query in Python (proximity.py)
+        and written as batched UNWIND MERGEs, instead of a cartesian MATCH
+        with haversine evaluated for every pair inside one transaction.
+
         Args:
             distance_threshold (float): Maximum distance in kilometers to create NEAR relationship
             
         Returns:
-            int: Number of relationships created
+            int: Number of relationships written
         """
         with self.driver.session(database=self.database) as session:
-            result = session.execute_write(self._create_proximity_relationships_tx, distance_threshold)
-            return result
-    
-    def _create_proximity_relationships_tx(self, tx, distance_threshold):
-        """Transaction function to create proximity relationships"""
-        # Haversine formula in Cypher to calculate distance between coordinates
+            locations = session.execute_read(self._get_location_coords_tx)
+        index = ProximityIndex(
+            [l["id"] for l in locations],
+            [l["latitude"] for l in locations],
+            [l["longitude"] for l in locations],
+        )
+        rows = index.near_rows(distance_threshold)
+        # One session: each row locks both of its nodes, so parallel sessions could deadlock
+        writer = PartitionedWriter(self.driver, workers=1, database=self.database)
+        return writer.write(NEAR_QUERY, rows, partition_by=lambda r: 0)
+
+    def _get_location_coords_tx(self, tx):
+        """Transaction function to read the coordinates of every location"""
         query = """
-        MATCH (a:Location), (b:Location)
-        WHERE a.id <> b.id
-        AND NOT EXISTS((a)-[:NEAR]-(b))
-        WITH a, b, 
-             6371 * acos(cos(radians(a.latitude)) * cos(radians(b.latitude)) * 
-             cos(radians(b.longitude) - radians(a.longitude)) + 
-             sin(radians(a.latitude)) * sin(radians(b.latitude))) AS distance
-        WHERE distance < $distance_threshold
-        MERGE (a)-[r:NEAR]->(b)
-        SET r.distance = distance
-        RETURN count(r) as count
+        MATCH (l:Location)
+        WHERE l.latitude IS NOT NULL AND l.longitude IS NOT NULL
+        RETURN l.id AS id, l.latitude AS latitude, l.longitude AS longitude
         """
-        
-        result = tx.run(query, distance_threshold=distance_threshold)
-        record = result.single()
-        return record['count'] if record else 0
+        return [record.data() for record in tx.run(query)]
     
     def get_location_by_id(self, location_id):
         """Get a location by its ID
@@ -8,109 +8,41 @@ Now supports venue-type-specific rule importance adjustments and includes an und
 import os
 from dotenv import load_dotenv
 from typing import Dict, List
-from tqdm import tqdm
 import math
+import numpy as np
 
 # Toggle graph transformer on/off via env var
 USE_GNN = os.getenv("USE_GNN", "true").lower() in ("1", "true", "yes")
 
+# Re-score every cell instead of only those whose inputs changed since the last run
+SCORING_FULL = os.getenv("SCORING_FULL", "false").lower() in ("1", "true", "yes")
+
+# A clean cell whose GNN score moves by more than this (through a shared hub) is re-blended too
+GNN_TOLERANCE = float(os.getenv("GNN_RESCORE_TOL", "1e-6"))
+
 import torch
-import torch.nn.functional as F
-from torch_geometric.data import HeteroData
-from torch_geometric.nn import HGTConv
 from neo4j import GraphDatabase
 from supabase import create_client, Client
-from postgrest.exceptions import APIError  # to catch upsert failures
+import snapshot
+from score_sink import ScoreSink
+import scoring
+import scoring_gnn
 
-# Fuzzy thresholds (tune to domain)
-# FEW_COMP_THRESH    = 3.0
-# MANY_COMP_THRESH   = 10.0
-# POP_LOW_THRESH     = 500.0
-# POP_HIGH_THRESH    = 1200.0
-# SPEND_LOW_THRESH   = 100000.0
-# SPEND_HIGH_THRESH  = 500000.0
+# Fuzzy thresholds are derived from the data on every run (see fuzzy_engine.tercile_thresholds)
 
 torch.manual_seed(0)
 
-# Blend factor: how much weight to give GNN vs. rule‑based
-ALPHA             = 0.6
-
-# How much of the final overall_score should come from the existing underserved_score
-UNDERSERVED_RATIO = 0.35
-
-# ——— SOFT RULES ———
-# Increased weights give any non‑zero membership more “oomph”
-OTHER_WEIGHTS = {
-    "few_comp_high_pop":      1.0,
-    "many_competitors":       2.0,
-    "high_population":        1.5,
-    "high_spending":          1.5,
-    "underserved_high_spend": 2.5,
-}
-
-sum_other = sum(OTHER_WEIGHTS.values())  # = 8.5
-
-SOFT_RULES = [
-    {"name": "few_comp_high_pop",      "weight": OTHER_WEIGHTS["few_comp_high_pop"]},
-    {"name": "many_competitors",       "weight": OTHER_WEIGHTS["many_competitors"]},
-    {"name": "medium_default",         "weight": 4},          # now 50% baseline
-    {"name": "high_population",        "weight": OTHER_WEIGHTS["high_population"]},
-    {"name": "high_spending",          "weight": OTHER_WEIGHTS["high_spending"]},
-    {"name": "underserved_high_spend", "weight": OTHER_WEIGHTS["underserved_high_spend"]},
-]
-
-# ——— VENUE‑TYPE MULTIPLIERS ———
-# Bump the multipliers for the rules you care most about per venue type:
-RULE_IMPORTANCE: Dict[str, Dict[str, float]] = {
-    "CAFE": {
-        "few_comp_high_pop":      2.0,   # small boost
-        "many_competitors":       1.5,   # ↑ from 1.2
-        "high_spending":          1.2,   # ↑ from 0.8
-        "underserved_high_spend": 1.8,   # new boost
-    },
-    "RESTAURANT": {
-        "many_competitors":       3.5,   # ↑ from 1.5
-        "high_population":        2.0,   # ↑ from 1.3
-        "high_spending":          1.2,   # new
-    },
-    "SCHOOL": {
-        "few_comp_high_pop":      1.8,   # ↑ from 1.1
-        "high_population":        3.0,   # ↑ from 1.5
-        "medium_default":         0.8,   # slight de‑emphasis
-    },
-    # …and so on for other types
-}
+# The rule base, blend weights and feature weights live in scoring_rules.yaml,
+# loaded by scoring.py and shared with the what-if service
 
 # Housing weights
-HOUSING_WEIGHTS = {
-    "hdb_2_room": 1.0,
-    "hdb_3_room": 1.5,
-    "hdb_4_room": 2.0,
-    "hdb_5_room_ea": 2.5,
-    "condominiums_and_apartments": 3.0,
-    "landed_properties": 3.0,
-    "other_types_properties": 1.0,
-}
-
-# Age map
+HOUSING_WEIGHTS = scoring.SPEC["features"]["housing_weights"]
+
 # Which age brackets drive demand per venue type
-VENUE_AGE_MAP = {
-    "SCHOOL":        ["5-9","10-14","15-19"],
-    "CAFE":          ["20-24","25-29","30-34"],
-    "RESTAURANT":    ["25-29","30-34","35-39","40-44"],
-    "DOCTOR":        ["60-64","65-69","70-74"],
-    "APPAREL":       ["25-29","30-34","35-39"],
-    "ARTS":          ["20-24","25-29","30-34"],
-    "CLUBS":         ["20-24","25-29","30-34"],
-    "SHOPPING":      ["25-29","30-34","35-39","40-44"],
-    "PERSONAL_CARE": ["35-39","40-44","45-49"],
-    "VEHICLE":       ["25-29","30-34","35-39","40-44"],
-    "SPORTS_COMPLEX":["20-24","25-29","30-34"]
-}
-
-def fetch_venue_types(supa: Client) -> List[str]:
-    resp = supa.table("venue_types").select("type_name").execute()
-    return [r["type_name"] for r in resp.data]
+VENUE_AGE_MAP = scoring.SPEC["features"]["venue_age_map"]
+
+def fetch_venue_types() -> List[str]:
+    return [r["type_name"] for r in snapshot.fetch_records("venue_types", ["type_name"])]
 
 def parse_int(val: str) -> int:
     try:
@@ -118,67 +50,171 @@ def parse_int(val: str) -> int:
     except:
         return 0
 
-def fuzzy_membership(x, low, high):
-    if x <= low:  return 1.0
-    if x >= high: return 0.0
-    return (high - x)/(high - low)
-
-def inverse_fuzzy(x, low, high):
-    if x <= low:  return 0.0
-    if x >= high: return 1.0
-    return (x - low)/(high - low)
-
-# Modified to handle missing vs. zero counts
-# Enhanced compute to include spending_power and population
-def compute_rule_scores(comp_count, pop_relevant, has_count, spending_power):
-    # If count is missing, fall back entirely to the "medium_default" rule
-    if not has_count:
-        # fallback fully to medium_default when no competitor data
-        return {r["name"]: (1.0 if r["name"] == "medium_default" else 0.0) for r in SOFT_RULES}
-
-    few = fuzzy_membership(comp_count, FEW_COMP_THRESH, MANY_COMP_THRESH)
-    many = inverse_fuzzy(comp_count, FEW_COMP_THRESH, MANY_COMP_THRESH)
-    pop_high = fuzzy_membership(pop_relevant, POP_LOW_THRESH, POP_HIGH_THRESH)
-    r1 = few * pop_high
-    r2 = many
-    r3 = 1.0 - abs(r1 - r2)
-
-    high_pop = inverse_fuzzy(pop_relevant, POP_LOW_THRESH, POP_HIGH_THRESH)
-    high_spend = inverse_fuzzy(spending_power, SPEND_LOW_THRESH, SPEND_HIGH_THRESH)
-    underserved_spend = few * high_spend
-
-    return {
-        "few_comp_high_pop":      r1,
-        "many_competitors":       r2,
-        "medium_default":         r3,
-        "high_population":        high_pop,
-        "high_spending":          high_spend,
-        "underserved_high_spend": underserved_spend,
-    }
+# ─── Feature extraction ────────────────────────────────────────────────────────
+AGE_KEYS = sorted({k for ages in VENUE_AGE_MAP.values() for k in ages},
+                  key=lambda k: int(k.split("-")[0]))
+
+# One pass over PlanningArea for every venue type; everything variable is a parameter
+FEATURES_QUERY = """
+MATCH (pa:PlanningArea)
+OPTIONAL MATCH (pa)-[:HAS_AGE_DISTRIBUTION]->(ad:AgeDistribution)
+OPTIONAL MATCH (pa)-[:HAS_HOUSING_PROFILE]->(hp:HousingProfile)
+OPTIONAL MATCH (pa)-[:HAS_COMPETITOR_STATS]->(cs:CompetitorStats {subzone: pa.subzone})
+WHERE cs.venue_type IN $venue_types
+WITH pa, ad, hp,
+     collect(cs {.venue_type, .competitor_count, .underserved_score}) AS stats
+RETURN
+  pa.subzone                                   AS subzone,
+  ad IS NOT NULL                               AS has_ages,
+  [k IN $age_keys | ad[k]]                     AS ages,
+  [k IN $housing_keys | hp[k]]                 AS housing,
+  stats
+"""
 
-# Aggregate with venue-type-specific adjustments
-def aggregate_rules(scores: Dict[str, float], venue_type: str) -> float:
-    # apply base weights
-    weighted = []
-    for rule in SOFT_RULES:
-        name = rule["name"]
-        base_w = rule["weight"]
-        # lookup multiplier, default to 1.0
-        mult = RULE_IMPORTANCE.get(venue_type, {}).get(name, 1.0)
-        weighted.append(scores[name] * base_w * mult)
-    total_w = sum(r["weight"] * RULE_IMPORTANCE.get(venue_type, {}).get(r["name"], 1.0)
-                  for r in SOFT_RULES)
-    return sum(weighted) / total_w if total_w else 0.0
-
-class CompetitionHGT(torch.nn.Module):
-    def __init__(self, in_dim, hid_dim, out_dim, metadata, heads=4):
-        super().__init__()
-        self.conv1 = HGTConv(in_dim, hid_dim, metadata=metadata, heads=heads)
-        self.conv2 = HGTConv(hid_dim, out_dim, metadata=metadata, heads=1)
-    def forward(self, x_dict, edge_index_dict):
-        x = self.conv1(x_dict, edge_index_dict)
-        x = {k: F.relu(v) for k,v in x.items()}
-        return self.conv2(x, edge_index_dict)
+def _to_integer(val):
+    """Python equivalent of Cypher toInteger(): None where Neo4j returns null."""
+    if val is None or isinstance(val, bool):
+        return None
+    if isinstance(val, (int, float)):
+        return None if isinstance(val, float) and math.isnan(val) else int(val)
+    try:
+        return int(val)
+    except ValueError:
+        try:
+            return int(float(val))
+        except ValueError:
+            return None
+
+def _score_or_none(raw):
+    # catches true float("nan") as well as any non-numeric
+    try:
+        f = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(f) else f
+
+def relevant_population(ages: np.ndarray, bad: np.ndarray, venue_types: List[str]) -> np.ndarray:
+    """(n_subzones, n_types) sum of each venue type's age brackets.
+
+    ages holds the toInteger() value per AGE_KEYS column (0 where absent) and
+    bad marks values toInteger() turns into null. A null makes the Cypher
+    reduce() null, which the pipeline reads as 0, so those sums are zeroed.
+    """
+    mask = np.array([[k in VENUE_AGE_MAP.get(vt, []) for k in AGE_KEYS] for vt in venue_types],
+                    dtype=np.int64).reshape(len(venue_types), len(AGE_KEYS))
+    pop = ages @ mask.T
+    pop[(bad.astype(np.int64) @ mask.T) > 0] = 0
+    return pop
+
+def extract_features(driver, venue_types: List[str]) -> List[dict]:
+    """One record per (subzone, venue type), ordered by venue type like the old per-type loop."""
+    with driver.session() as sess:
+        rows = sess.run(
+            FEATURES_QUERY, venue_types=venue_types,
+            age_keys=AGE_KEYS, housing_keys=list(HOUSING_WEIGHTS)
+        ).data()
+    print(f"→ Fetched features for {len(rows)} subzones × {len(venue_types)} venue types")
+
+    ages = np.zeros((len(rows), len(AGE_KEYS)), dtype=np.int64)
+    bad = np.zeros((len(rows), len(AGE_KEYS)), dtype=bool)
+    for i, rec in enumerate(rows):
+        if not rec["has_ages"]:
+            bad[i] = True  # keys(null) → null sum
+            continue
+        for j, raw in enumerate(rec["ages"]):
+            if raw is None:
+                continue  # bracket not on the node: filtered out by keys(ad)
+            val = _to_integer(raw)
+            if val is None:
+                bad[i, j] = True
+            else:
+                ages[i, j] = val
+    pop = relevant_population(ages, bad, venue_types)
+
+    # Spending power only depends on the subzone's housing profile
+    spending = [
+        sum(parse_int(str(v)) * w for v, w in zip(rec["housing"], HOUSING_WEIGHTS.values()))
+        for rec in rows
+    ]
+    stats = [{s["venue_type"]: s for s in rec["stats"]} for rec in rows]
+
+    records = []
+    for t, vt in enumerate(venue_types):
+        for i, rec in enumerate(rows):
+            cs = stats[i].get(vt, {})
+            raw_count = cs.get("competitor_count")
+            records.append({
+                "subzone":        rec["subzone"] or "",
+                "venue_type":     vt,
+                "comp_count":     raw_count if raw_count is not None else 0,
+                "has_count":      raw_count is not None,
+                "pop_relevant":   int(pop[i, t]),
+                "spending_power": spending[i],
+                "underserved_score": _score_or_none(cs.get("underserved_score")),
+            })
+    return records
+
+def rule_scores_for(records: List[dict]) -> np.ndarray:
+    """Fuzzy rule score per record, with thresholds at the data's 1/3 and 2/3 quantiles."""
+    return _rule_scores(records)[0]
+
+def _rule_scores(records: List[dict], thresholds=None):
+    return scoring.rule_scores(
+        [r["comp_count"] for r in records],
+        [r["pop_relevant"] for r in records],
+        [r["spending_power"] for r in records],
+        [bool(r["has_count"]) for r in records],
+        [r["venue_type"] for r in records],
+        thresholds,
+    )
+
+def fetch_subzone_population() -> Dict[str, tuple]:
+    """{SUBZONE: (population_density, total population)} for the scoring state."""
+    out = {}
+    for rec in snapshot.fetch_records("demographics_population"):
+        if not rec.get("subzone"):
+            continue
+        total = sum(parse_int(str(v)) for k, v in rec.items() if k.startswith("population_") and k != "population_density")
+        try:
+            density = float(str(rec.get("population_density")).replace(",", ""))
+        except ValueError:
+            density = float("nan")
+        out[rec["subzone"].strip().upper()] = (density, total)
+    return out
+
+def save_scoring_state(records, thresholds, rule_scores, gnn_scores, overall, meta):
+    """Persist the run's cells for scenario.py and incremental re-scoring."""
+    pop = fetch_subzone_population()
+    cells = [pop.get(r["subzone"].strip().upper(), (float("nan"), 0)) for r in records]
+    columns = {col: [r[col] for r in records] for col in
+               ("subzone", "venue_type", *scoring.FEATURE_COLUMNS)}
+    columns.update({
+        "rule_score": rule_scores,
+        "gnn_score": gnn_scores,
+        "overall_score": overall,
+        "density": [c[0] for c in cells],
+        "population": [c[1] for c in cells],
+    })
+    scoring.save_state(columns, thresholds, meta)
+    print(f"✅ Saved scoring state for {len(records)} cells → {scoring.STATE_PATH}")
+
+def run_gnn(records: List[dict], ckpt) -> np.ndarray:
+    """GNN score per record, from the trained checkpoint or an untrained model."""
+    feats = [[r[k] for k in scoring_gnn.FEATURE_NAMES] for r in records]
+    subzones = [r["subzone"] for r in records]
+    venue_types = [r["venue_type"] for r in records]
+    if ckpt is not None:
+        scorer = scoring_gnn.GNNScorer(ckpt)
+        scores = scorer.score(feats, subzones, venue_types)
+        t = scorer.timings
+        print(f"   • GNN {scorer.version}: graph {t['graph_s']*1000:.1f} ms, "
+              f"forward {t['forward_s']*1000:.1f} ms on {t['threads']} threads "
+              f"(TorchScript={t['torchscript']})")
+        return np.asarray(scores, dtype=np.float64)
+    # Records link to Subzone / VenueType hub nodes (linear in records)
+    print("⚠️ No trained GNN checkpoint (run train_gnn.py); using an untrained model")
+    het = scoring_gnn.build_hub_graph(feats, subzones, venue_types)
+    return np.asarray(scoring_gnn.gnn_scores(het), dtype=np.float64)
 
 def main():
     load_dotenv()
@@ -190,260 +226,86 @@ def main():
     )
     supa = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
 
-    # 1) Fetch raw records
-    records = []
-    for vt in fetch_venue_types(supa):
-        print(f"→ Querying venue type: {vt}")
-        with driver.session() as sess:
-            cypher = f"""
-            MATCH (pa:PlanningArea)
-            OPTIONAL MATCH (pa)-[:HAS_COMPETITOR_STATS]->
-                          (cs:CompetitorStats {{subzone: pa.subzone, venue_type: '{vt}'}})
-            OPTIONAL MATCH (pa)-[:HAS_AGE_DISTRIBUTION]->(ad:AgeDistribution)
-            OPTIONAL MATCH (pa)-[:HAS_HOUSING_PROFILE]->(hp:HousingProfile)
-            WITH
-              pa.subzone                 AS subzone,
-              cs.competitor_count        AS comp_count,
-	          cs.underserved_score       AS underserved_score, 
-              (cs.competitor_count IS NOT NULL)     AS has_count,
-              [ ageKey IN keys(ad)
-                WHERE ageKey IN {list(VENUE_AGE_MAP.get(vt, []))}
-                | toInteger(ad[ageKey]) ]  AS age_vals,
-              hp.hdb_2_room              AS hdb2,
-              hp.hdb_3_room              AS hdb3,
-              hp.hdb_4_room              AS hdb4,
-              hp.hdb_5_room_ea           AS hdb5,
-              hp.condominiums_and_apartments AS condos,
-              hp.landed_properties       AS landed,
-              hp.other_types_properties  AS other
-            RETURN
-              subzone,
-              comp_count,
-              underserved_score,
-              has_count,
-              reduce(s=0, x IN age_vals | s + x) AS pop_relevant,
-              hdb2,
-              hdb3,
-              hdb4,
-              hdb5,
-              condos,
-              landed,
-              other;
-            """
-            for rec in sess.run(cypher).data():
-                # Differentiate missing vs zero
-                raw_count = rec.get("comp_count")
-                has_count = rec.get("has_count", False)
-                comp_count = raw_count if raw_count is not None else 0
-                pop_relevant = rec.get("pop_relevant", 0) or 0
-                hv = {
-                    "hdb_2_room": str(rec.get("hdb2", "0")),
-                    "hdb_3_room": str(rec.get("hdb3", "0")),
-                    "hdb_4_room": str(rec.get("hdb4", "0")),
-                    "hdb_5_room_ea": str(rec.get("hdb5", "0")),
-                    "condominiums_and_apartments": str(rec.get("condos", "0")),
-                    "landed_properties": str(rec.get("landed", "0")),
-                    "other_types_properties": str(rec.get("other", "0")),
-                }
-                spending_power = sum(parse_int(hv[k]) * w for k, w in HOUSING_WEIGHTS.items())
-                
-                # **Log each fetched record**
-                # print(f"   • subzone={rec.get('subzone')} | comp_count={comp_count} | pop_relevant={pop_relevant} | spending_power={spend}")
-                raw_us = rec.get("underserved_score")
-                if raw_us is None:
-                    us_val = None
-                else:
-                    # catches true float("nan") as well as any non-numeric
-                    try:
-                        f = float(raw_us)
-                        us_val = None if math.isnan(f) else f
-                    except (TypeError, ValueError):
-                        us_val = None
-                records.append({
-                    "subzone":       rec.get("subzone") or "",
-                    "venue_type":    vt,
-                    "comp_count":    comp_count,
-                    "has_count":     has_count,
-                    "pop_relevant":  pop_relevant,
-                    "spending_power": spending_power,
-                    "underserved_score": us_val
-                })
-
-
-    # ── INSERT DYNAMIC THRESHOLDS HERE ──────────────────
-    comp_vals  = sorted(r["comp_count"]     for r in records if r["has_count"] and r["comp_count"] > 0)
-    pop_vals   = sorted(r["pop_relevant"]   for r in records if r["pop_relevant"] > 0)
-    spend_vals = sorted(r["spending_power"] for r in records)
-
-    if comp_vals:
-        i1, i2 = len(comp_vals)//3, 2*len(comp_vals)//3
-        global FEW_COMP_THRESH, MANY_COMP_THRESH
-        FEW_COMP_THRESH  = comp_vals[i1]
-        MANY_COMP_THRESH = comp_vals[i2]
-
-    if pop_vals:
-        i1, i2 = len(pop_vals)//3, 2*len(pop_vals)//3
-        global POP_LOW_THRESH, POP_HIGH_THRESH
-        POP_LOW_THRESH  = pop_vals[i1]
-        POP_HIGH_THRESH = pop_vals[i2]
-
-    if spend_vals:
-        i1, i2 = len(spend_vals)//3, 2*len(spend_vals)//3
-        global SPEND_LOW_THRESH, SPEND_HIGH_THRESH
-        SPEND_LOW_THRESH  = spend_vals[i1]
-        SPEND_HIGH_THRESH = spend_vals[i2]
-    # ─────────────────────────────────────────────────────    
-        
+    # 1) Fetch raw records: one query for all venue types, features derived in NumPy
+    records = extract_features(driver, fetch_venue_types())
+
     print(f"✅ Fetched total records: {len(records)}")
 
-    # Compute rule_scores with venue-type-specific weights
-    rule_scores = [
-        aggregate_rules(
-            compute_rule_scores(r["comp_count"], r["pop_relevant"], r["has_count"], r["spending_power"]),
-            r["venue_type"]
-        ) for r in records
-    ]
+    # 2) Compare against the last run: only cells whose inputs changed are re-scored,
+    #    unless the terciles (or the rules / GNN checkpoint) moved under every cell
+    rule_all, thresholds = _rule_scores(records)
+    ckpt = scoring_gnn.load_checkpoint() if USE_GNN else None
+    meta = {
+        "use_gnn": USE_GNN,
+        "rules": scoring.rules_version(),
+        "gnn": ckpt["version"] if ckpt is not None else None,
+    }
+    subzones = [r["subzone"] for r in records]
+    venue_types = [r["venue_type"] for r in records]
+    current = {"subzone": subzones, "venue_type": venue_types,
+               **{col: [r[col] for r in records] for col in scoring.FEATURE_COLUMNS}}
+    plan = scoring.plan_rescore(current, thresholds, meta, full=SCORING_FULL)
+    dirty, rows, prev = plan["dirty"], plan["rows"], plan["state"]
+    thresholds = plan["thresholds"]
+    print(f"✅ {plan['mode'].capitalize()} re-scoring: {int(dirty.sum())}/{len(records)} cells "
+          f"({plan['reason']})")
+
+    if plan["mode"] == "full":
+        rule_scores = rule_all
+        gnn_scores = np.zeros(len(records))
+        overall = np.zeros(len(records))
+    else:
+        # Clean cells keep their stored component scores
+        rule_scores = prev["rule_score"][rows].copy()
+        gnn_scores = prev["gnn_score"][rows].copy()
+        overall = prev["overall_score"][rows].copy()
+        if dirty.any():
+            rule_scores[dirty] = _rule_scores([records[i] for i in np.flatnonzero(dirty)], thresholds)[0]
     print("✅ Computed rule_scores")
 
-    # 3) Optionally run GNN
-    if USE_GNN and records:
+    # 3) Optionally run GNN over the whole graph. A dirty cell changes the messages of its
+    #    Subzone / VenueType hubs, and so the GNN score of every cell sharing them: keep the
+    #    full output and re-blend every cell whose score moved, not only the dirty ones
+    rescore = dirty.copy()
+    # Removed cells drop out of their hubs too
+    removed_any = prev is not None and int((rows >= 0).sum()) < len(prev["subzone"])
+    if USE_GNN and records and (dirty.any() or removed_any):
         print("✅ Running GNN with subzone/type relations")
-
-        # 1) Prepare node features and identifiers
-        het = HeteroData()
-        feats, idxs = [], []
-        for r in records:
-            feats.append([r["comp_count"], r["pop_relevant"], r["spending_power"]])
-            idxs.append((r["subzone"], r["venue_type"]))
-        het["PA_VT"].x = torch.tensor(feats, dtype=torch.float)
-
-        # 2) Build edges for “same_subzone”
-        from collections import defaultdict
-        sub2nodes = defaultdict(list)
-        for i, (sub, _) in enumerate(idxs):
-            sub2nodes[sub].append(i)
-        rows, cols = [], []
-        for nodes in sub2nodes.values():
-            for i in nodes:
-                for j in nodes:
-                    if i != j:
-                        rows.append(i); cols.append(j)
-        het["PA_VT", "same_subzone", "PA_VT"].edge_index = torch.tensor([rows, cols], dtype=torch.long)
-
-        # 3) Build edges for “same_type”
-        type2nodes = defaultdict(list)
-        for i, (_, vt) in enumerate(idxs):
-            type2nodes[vt].append(i)
-        rows, cols = [], []
-        for nodes in type2nodes.values():
-            for i in nodes:
-                for j in nodes:
-                    if i != j:
-                        rows.append(i); cols.append(j)
-        het["PA_VT", "same_type", "PA_VT"].edge_index = torch.tensor([rows, cols], dtype=torch.long)
-
-        # 4) Run heterogeneous GNN
-        metadata = het.metadata()
-        model = CompetitionHGT(3, 16, 1, metadata)
-        model.eval()
-        with torch.no_grad():
-            out = model(het.x_dict, het.edge_index_dict)
-        raw = out["PA_VT"].squeeze().tolist()
-        mn, mx = min(raw), max(raw)
-        gnn_scores = [(v - mn)/(mx - mn + 1e-9) for v in raw]
-    else:
+        new_gnn = run_gnn(records, ckpt)
+        moved = np.abs(new_gnn - gnn_scores) > GNN_TOLERANCE
+        rescore |= moved
+        gnn_scores = new_gnn
+        print(f"   • {int((moved & ~dirty).sum())} clean cells re-blended for GNN score changes via shared hubs")
+    elif not USE_GNN:
         print("ℹ️ Skipped GNN, using zeros for gnn_scores")
-        gnn_scores = [0.0] * len(records)
 
-    # 4) Blend & upsert, with fallback if no unique constraint
+    # 4) Blend the dirty cells and those whose GNN score moved
     updates = []
     print("=== Blending Scores ===")
-    for r, g, ru in zip(records, gnn_scores, rule_scores):
-        # — apply mild contrast around 1.3 (increase from 0.5) to spread scores —
-        contrast = 1.3
-        ru = 0.5 + (ru - 0.5) * contrast
-        ru = max(0.0, min(ru, 1.0))
-
-        alpha = ALPHA if USE_GNN else 0.0
-        raw_score = alpha * g + (1 - alpha) * ru
-        clamped = max(0.0, min(raw_score, 1.0))
-        # scale to 0–100
-        base_pct = clamped * 100.0
- 
-        # attempt to fetch a valid underserved_score
-        # blend with underserved_score if present
-        us_pct = r.get("underserved_score")
-        if us_pct is not None:
-            raw_overall = base_pct * (1 - UNDERSERVED_RATIO) + us_pct * UNDERSERVED_RATIO
-        else:
-            raw_overall = base_pct
-
-        # round to two decimal places
-        overall_pct = round(raw_overall, 2)
-        	# print(
-        	#     f"[{r['subzone']}|{r['venue_type']}] "
-        	#     f"rule={ru:.4f}, gnn={g:.4f} → raw={raw_score:.4f}, "
-        	#     f"clamped={clamped:.4f} → overall_pct={overall_pct:.1f}"
-        	# )
+    for i in np.flatnonzero(rescore):
+        r = records[i]
+        overall[i] = scoring.overall_score(
+            float(rule_scores[i]), float(gnn_scores[i]), r.get("underserved_score"), USE_GNN
+        )
         updates.append({
             "subzone":    r["subzone"],
             "venue_type": r["venue_type"],
-            "overall_score": float(overall_pct)
+            "overall_score": float(overall[i])
         })
 
-    try:
-        supa.table("competitor_stats") \
-            .upsert(updates, on_conflict=["subzone","venue_type"]) \
-            .execute()
-    except APIError:
-        print("⚠️ upsert failed. Falling back to per-record update/insert.")
-        for u in tqdm(updates, desc="Updating Supabase"):
-            # 1) try to update the overall_score on the matching row
-    # 1) try to update existing row
-            try:
-                resp = supa.table("competitor_stats") \
-                        .update({"overall_score": u["overall_score"]}) \
-                        .eq("subzone", u["subzone"]) \
-                        .eq("venue_type", u["venue_type"]) \
-                        .execute()
-                num_updated = len(resp.data or [])
-            except APIError as e:
-                err = getattr(e, "args", [{}])[0]
-                # If it’s the “empty or invalid json” error, treat as zero updated
-                if isinstance(err, dict) and err.get("code") == "PGRST102":
-                    num_updated = 0
-                else:
-                    # some other error—raise or log
-                    print("❌ Update failed for %s|%s: %s", u["subzone"], u["venue_type"], err)
-                    num_updated = 0
-
-            # 2) if nothing got updated, insert instead
-            if num_updated == 0:
-                try:
-                    supa.table("competitor_stats").insert(u).execute()
-                except APIError as e:
-                    print("❌ Insert failed for %s|%s: %s", u["subzone"], u["venue_type"], e)
-
-    print(f"✅ competitor_stats updated  (USE_GNN={USE_GNN})")
-
-
-     # 5) Update Neo4j CompetitorStats nodes with overall_score
-    print(f"→ Writing overall_score back to Neo4j…")
-    with driver.session() as session:
-        for u in tqdm(updates, desc="Updating Neo4j"):
-            session.run(
-                 """
-                 MATCH (cs:CompetitorStats {subzone: $subzone, venue_type: $venue_type})
-                 SET cs.overall_score = $overall_score
-                 """,
-                 {
-                     "subzone": u["subzone"],
-                     "venue_type": u["venue_type"],
-                     "overall_score": u["overall_score"]
-                 }
-             )
-    print("✅ Neo4j updated with overall_score")
+    # 5) Publish overall_score to Supabase and Neo4j in chunked / UNWIND-batched writes
+    if updates:
+        ScoreSink(supa, driver).publish(
+            updates, {"overall_score": "overall_score"}, desc=f"overall_score (USE_GNN={USE_GNN})"
+        )
+    else:
+        print("ℹ️ No cell inputs changed; nothing to publish")
     driver.close()
 
+    save_scoring_state(records, thresholds, rule_scores.tolist(), gnn_scores.tolist(), overall.tolist(), meta)
+    changed, removed = scoring.cell_changes(subzones, venue_types, overall, plan)
+    scoring.write_changed_cells(changed, removed, plan)
+    print(f"✅ {len(changed)} changed and {len(removed)} removed cells → {scoring.CHANGED_CELLS_PATH}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
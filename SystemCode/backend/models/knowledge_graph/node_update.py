@@ -1,32 +1,21 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
 from neo4j import GraphDatabase
 from tqdm import tqdm  # progress bars
+import snapshot
 
 print("🔍 Starting node_update.py")
 # update competitor count into neo4j
 
 load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
 
 def fetch_competitor_counts():
-    all_data = []
-    page_size = 1000
-    for start in range(0, 4000, page_size):
-        end = start + page_size - 1
-        response = supabase.table("competitor_stats") \
-            .select("subzone, venue_type, competitor_count") \
-            .range(start, end) \
-            .execute()
-        all_data.extend(response.data)
+    all_data = snapshot.fetch_records("competitor_stats", ["subzone", "venue_type", "competitor_count"])
 
     print(f"✅ Total records fetched: {len(all_data)}")
     return all_data
@@ -35,7 +24,7 @@ def update_neo4j_competitor_stats(data):
     updated = 0
     skipped = 0
 
-    with neo4j_driver.session() as session:
+    with driver.session() as session:
         for row in data:
             subzone = row.get("subzone", "").strip()
             venue_type = row.get("venue_type", "").strip()
@@ -51,7 +40,7 @@ def update_neo4j_competitor_stats(data):
             # Only update if competitor_count is NOT already set
             result = session.run("""
                 MATCH (cs:CompetitorStats)
-                WHERE cs.subzone = $subzone AND cs.venue_type = $venue_type AND NOT EXISTS(cs.competitor_count)
+                WHERE cs.subzone = $subzone AND cs.venue_type = $venue_type AND cs.competitor_count IS NULL
                 SET cs.competitor_count = $count
                 RETURN cs
             """, {
@@ -69,15 +58,7 @@ def update_neo4j_competitor_stats(data):
     print(f"✅ {updated} nodes updated, {skipped} skipped (already had competitor_count)")
 
 def fetch_venue_coords():
-    all_data = []
-    page_size = 1000
-    for start in range(0, 8000, page_size):
-        end = start + page_size - 1
-        response = supabase.table("establishments") \
-            .select("venue_name, latitude, longitude, venue_type") \
-            .range(start, end) \
-            .execute()
-        all_data.extend(response.data)
+    all_data = snapshot.fetch_records("establishments", ["venue_name", "latitude", "longitude", "venue_type"])
 
     print(f"✅ Total records fetched: {len(all_data)}")
 
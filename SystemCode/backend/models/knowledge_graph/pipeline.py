@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+DAG runner for the offline knowledge-graph build and scoring scripts.
+
+Each stage declares the script it runs, the Supabase tables it reads, the
+stages it depends on and the files it produces. A stage's cache key is a hash
+of its source files, the watermarks of its tables (see snapshot.watermark) and
+the keys of its upstream stages, so a nightly refresh only re-runs the stages
+whose inputs changed, plus everything downstream of them. Table watermarks
+include the newest updated_at, which a trigger keeps current, so in-place
+edits to a table count as a change too.
+
+Stages also list the tables they write. After such a stage succeeds, the
+table's new watermark is recorded; as long as the table still has that
+watermark, keys use the one it had before the pipeline wrote it. The
+pipeline's own upserts therefore do not dirty its stages on the next run,
+while edits made outside it still do. Independent stages
+run in parallel. State and per-stage timings live in .pipeline/.
+
+    python pipeline.py                 # run whatever is out of date
+    python pipeline.py --dry-run       # show what would run
+    python pipeline.py --force geo_analysis --jobs 2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.path.join(HERE, ".pipeline")
+# Subzone polygons behind the geometry store, relative to HERE
+SUBZONE_BOUNDARIES = "../../data_processing/data_extraction_scripts/data_files/subzone_boundaries.geojson"
+SUBZONE_TIERS = "../../data_processing/data_extraction_scripts/subzone_tiers.py"
+# Geometry modules the density / hex-grid stages import through GEOMETRY_DIR
+GEOMETRY_MODULES = [
+    "../../data_processing/data_extraction_scripts/geometry_store.py",
+    "../../data_processing/data_extraction_scripts/spatial_join.py",
+]
+
+# Flow from README.md; "after" only lists true data dependencies
+STAGES = [
+    {
+        "name": "aggregate_prices",
+        "script": "aggregate_prices.py",
+        "tables": ["industrial_properties"],
+        "writes": ["avg_industrial_prices"],
+        "after": [],
+    },
+    {
+        "name": "graph_builder",
+        "script": "graph_builder.py",
+        "files": ["graph_schema.py", "neo4j_writer.py"],
+        "tables": [
+            "planning_areas", "venue_types", "establishments", "competitor_stats",
+            "demographics_age_group", "demographics_housing_types", "demographics_population",
+            "industrial_properties", "avg_industrial_prices",
+        ],
+        "after": ["aggregate_prices"],
+    },
+    {
+        "name": "node_update",
+        "script": "node_update.py",
+        "tables": ["establishments", "competitor_stats"],
+        "after": ["graph_builder"],
+    },
+    {
+        "name": "update_competitor_count",
+        "script": "update_competitor_count.py",
+        "tables": ["competitor_stats"],
+        "after": ["graph_builder"],
+    },
+    {
+        "name": "populate_competitor_stats",
+        "script": "populate_competitor_stats.py",
+        "files": ["score_sink.py", "neo4j_writer.py", "density.py", *GEOMETRY_MODULES, SUBZONE_BOUNDARIES],
+        "tables": ["establishments", "competitor_stats"],
+        "writes": ["competitor_stats"],
+        "after": ["graph_builder"],
+        "outputs": ["outputs/competitor_kde.npz", "outputs/competitor_kde_by_subzone.csv"],
+    },
+    {
+        # Simplified subzone polygons in GEOMETRY_CACHE, named by the boundaries' content hash
+        "name": "subzone_tiers",
+        "script": SUBZONE_TIERS,
+        "files": ["../../data_processing/data_extraction_scripts/geometry_store.py", SUBZONE_BOUNDARIES],
+        "tables": [],
+        "after": [],
+    },
+    {
+        "name": "geo_analysis",
+        "script": "geo_analysis.py",
+        "files": ["score_sink.py", "neo4j_writer.py", "map_layers.py", SUBZONE_BOUNDARIES],
+        "tables": ["demographics_population", "competitor_stats"],
+        "writes": ["competitor_stats"],
+        # populate_competitor_stats also upserts competitor_stats rows
+        "after": ["node_update", "update_competitor_count", "populate_competitor_stats", "subzone_tiers"],
+        "outputs": ["outputs/underserved_by_density.csv", "outputs/sg_venue_map.html"],
+    },
+    {
+        "name": "hexgrid",
+        "script": "hexgrid.py",
+        "files": [*GEOMETRY_MODULES, SUBZONE_BOUNDARIES],
+        "tables": ["establishments", "industrial_properties", "demographics_population"],
+        "after": [],
+        "outputs": ["outputs/hex_250m.npz", "outputs/hex_500m.npz", "outputs/hex_1000m.npz"],
+    },
+    {
+        "name": "neuro_symbolic",
+        "script": "neuro_symbolic.py",
+        "files": ["neo4j_writer.py", "score_sink.py", "fuzzy_engine.py", "scoring.py", "scoring_gnn.py",
+                  "rule_spec.py", "scoring_rules.yaml"],
+        "tables": ["venue_types", "demographics_population"],
+        "writes": ["competitor_stats"],
+        "after": ["geo_analysis", "populate_competitor_stats"],
+    },
+]
+
+# Shared modules every stage imports
+COMMON_FILES = ["snapshot.py", "supabase_csv.py"]
+# state.json entry with the watermarks the pipeline's own writes left behind
+OWN_WRITES = "_own_writes"
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_state() -> dict:
+    try:
+        with open(os.path.join(STATE_DIR, "state.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state: dict):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, "state.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _log_run(entry: dict):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(os.path.join(STATE_DIR, "runs.jsonl"), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def topological_order(stages):
+    by_name = {s["name"]: s for s in stages}
+    order, seen = [], set()
+
+    def visit(name, path=()):
+        if name in path:
+            raise ValueError(f"Cycle in pipeline: {' -> '.join(path + (name,))}")
+        if name in seen:
+            return
+        for dep in by_name[name].get("after", []):
+            visit(dep, path + (name,))
+        seen.add(name)
+        order.append(by_name[name])
+
+    for s in stages:
+        visit(s["name"])
+    return order
+
+
+def _watermark(table: str) -> dict:
+    # Through JSON, so a mark compares equal to the copy stored in state.json
+    return json.loads(json.dumps(snapshot.watermark(table), default=str))
+
+
+def table_marks(stages, state: dict) -> dict:
+    """Watermark of every table a stage reads, ignoring the pipeline's own last writes."""
+    own = state.get(OWN_WRITES, {})
+    marks = {}
+    for stage in stages:
+        for table in stage.get("tables", []):
+            if table not in marks:
+                mark = _watermark(table)
+                written = own.get(table)
+                # Unchanged since a stage of ours wrote it: key on the mark from before that write
+                marks[table] = written["before"] if written and written["after"] == mark else mark
+    return marks
+
+
+def stage_keys(stages, marks: dict) -> dict:
+    """Content-addressed key per stage: sources + table watermarks + upstream keys."""
+    keys = {}
+    for stage in topological_order(stages):
+        parts = {
+            "files": {
+                f: _hash_file(os.path.join(HERE, f))
+                for f in [stage["script"], *stage.get("files", []), *COMMON_FILES]
+            },
+            "tables": {table: marks[table] for table in stage.get("tables", [])},
+            "after": {dep: keys[dep] for dep in stage.get("after", [])},
+        }
+        keys[stage["name"]] = hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+    return keys
+
+
+def _record_writes(stage, state: dict, marks: dict):
+    """Remember the watermarks a successful stage left on the tables it writes."""
+    own = state.setdefault(OWN_WRITES, {})
+    for table in stage.get("writes", []):
+        if table in marks:
+            own[table] = {"before": marks[table], "after": _watermark(table)}
+
+
+def _outputs_intact(stage, recorded: dict) -> bool:
+    for out in stage.get("outputs", []):
+        path = os.path.join(HERE, out)
+        if not os.path.exists(path) or _hash_file(path) != recorded.get(out):
+            return False
+    return True
+
+
+def plan(stages, state, keys, force=()):
+    """Names of the stages that have to run this time."""
+    dirty = set()
+    for stage in topological_order(stages):
+        name = stage["name"]
+        prev = state.get(name, {})
+        if (
+            name in force
+            or prev.get("key") != keys[name]
+            or not _outputs_intact(stage, prev.get("outputs", {}))
+            or any(dep in dirty for dep in stage.get("after", []))
+        ):
+            dirty.add(name)
+    return dirty
+
+
+def run_stage(stage) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, stage["script"]], cwd=HERE)
+    return {"returncode": proc.returncode, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def run(stages=STAGES, jobs=4, force=(), dry_run=False):
+    state = _load_state()
+    marks = table_marks(stages, state)
+    keys = stage_keys(stages, marks)
+    dirty = plan(stages, state, keys, set(force))
+    by_name = {s["name"]: s for s in stages}
+
+    for stage in topological_order(stages):
+        status = "run" if stage["name"] in dirty else "skip (unchanged)"
+        print(f"   • {stage['name']:<28} {status}")
+    if dry_run or not dirty:
+        return True
+
+    done = {name for name in by_name if name not in dirty}
+    failed = set()
+    running = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            for name in sorted(dirty - done - failed - set(running.values())):
+                deps = by_name[name].get("after", [])
+                if any(d in failed for d in deps):
+                    failed.add(name)
+                    print(f"⏭️  {name}: upstream failed")
+                elif all(d in done for d in deps):
+                    print(f"➡️  {name}")
+                    running[pool.submit(run_stage, by_name[name])] = name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                result = fut.result()
+                _log_run({"stage": name, "key": keys[name], "at": time.time(), **result})
+                if result["returncode"] == 0:
+                    done.add(name)
+                    state[name] = {
+                        "key": keys[name],
+                        "seconds": result["seconds"],
+                        "finished_at": time.time(),
+                        "outputs": {
+                            out: _hash_file(os.path.join(HERE, out))
+                            for out in by_name[name].get("outputs", [])
+                            if os.path.exists(os.path.join(HERE, out))
+                        },
+                    }
+                    _record_writes(by_name[name], state, marks)
+                    _save_state(state)
+                    print(f"✅ {name} ({result['seconds']}s)")
+                else:
+                    failed.add(name)
+                    state.pop(name, None)
+                    _save_state(state)
+                    print(f"❌ {name} exited with {result['returncode']} ({result['seconds']}s)")
+
+    print(f"Pipeline finished in {time.perf_counter() - started:.1f}s, "
+          f"{len(dirty - failed)} stages run, {len(failed)} failed")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=4, help="stages to run in parallel")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to re-run regardless of cache")
+    parser.add_argument("--dry-run", action="store_true")
+    opts = parser.parse_args()
+    unknown = set(opts.force) - {s["name"] for s in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    sys.exit(0 if run(jobs=opts.jobs, force=opts.force, dry_run=opts.dry_run) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@ import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from neo4j import GraphDatabase
-from tqdm import tqdm
 import numpy as np
+import snapshot
+import density
+from score_sink import ScoreSink
 
 # Load environment variables
 load_dotenv()
@@ -22,51 +24,22 @@ neo4j_driver = GraphDatabase.driver(
     auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
 )
 
-# Pagination constants
-_PAGE_SIZE = 1000
-
 def fetch_table_all(table_name: str, columns: str = "*"):
-    """Fetch all rows from a Supabase table using range-based pagination."""
-    all_data = []
-    start = 0
-    while True:
-        # Use an exclusive upper bound so we get exactly _PAGE_SIZE rows
-        upper = start + _PAGE_SIZE
-        resp = (supabase
-                .table(table_name)
-                .select(columns)
-                .range(start, upper)
-                .execute())
-        if getattr(resp, 'error', None):
-            print(f"Error fetching {table_name} [{start}:{upper}]: {resp.error}")
-            break
-        batch = resp.data or []
-        all_data.extend(batch)
-        # Stop when fewer than a full page is returned
-        if len(batch) < _PAGE_SIZE:
-            break
-        start += _PAGE_SIZE
-    return all_data
-
-# Neo4j update function
-def update_neo4j_density(tx, subzone: str, venue_type: str, density: str):
-    """Set the density property on a CompetitorStats node."""
-    tx.run(
-        "MATCH (n:CompetitorStats {subzone: $subzone, venue_type: $venue_type})"
-        " SET n.density = $density",
-        subzone=subzone,
-        venue_type=venue_type,
-        density=density
-    )
-
+    """Fetch all rows of a Supabase table from the local snapshot cache."""
+    cols = None if columns == "*" else [c.strip() for c in columns.split(",")]
+    return snapshot.fetch_records(table_name, cols)
 
 def main():
-    # 1) Fetch demographics
-    demographics = fetch_table_all(
-        "demographics_population", "subzone, subzone_size"
-    )
-    print(f"Fetched {len(demographics)} demographics records.")
-    size_map = {d["subzone"]: float(d.get("subzone_size", 0)) for d in demographics}
+    # 1) Competition pressure: kernel density of competitors per km², averaged over each subzone
+    kde = density.build()
+    density.save(kde)
+    t = kde["timings"]
+    print(f"Built competitor KDE for {kde['points']} establishments in "
+          f"{t['load'] + t['kde'] + t['aggregate']:.2f}s.")
+    pressure = {}
+    for ti, vt in enumerate(kde["venue_types"]):
+        for si, sz in enumerate(kde["subzones"]):
+            pressure[(sz.strip().upper(), vt)] = float(kde["kde_density"][ti, si])
 
     # 2) Fetch all competitor_stats
     comp_stats = fetch_table_all(
@@ -75,16 +48,16 @@ def main():
     )
     print(f"Fetched {len(comp_stats)} competitor_stats records.")
 
-    # 3) Compute valid ratios
-    ratios = []
-    for r in comp_stats:
-        cnt = r.get("competitor_count")
-        size = size_map.get(r.get("subzone"), 0)
-        if isinstance(cnt, (int, float)) and size > 0:
-            ratios.append(cnt / size)
+    # 3) Look up each record's pressure (None for subzones outside the boundaries)
+    def ratio_of(r):
+        sub = r.get("subzone")
+        value = pressure.get((sub.strip().upper(), r.get("venue_type"))) if isinstance(sub, str) else None
+        return value if value is not None and np.isfinite(value) else None
+
+    ratios = [v for v in map(ratio_of, comp_stats) if v is not None]
     print(f"Computed {len(ratios)} valid ratios.")
     if not ratios:
-        print("No valid ratios to process. Ensure competitor_count and subzone_size are populated.")
+        print("No valid ratios to process. Ensure establishments and the subzone boundaries are available.")
         return
 
     # 4) Calculate thresholds via percentiles
@@ -96,51 +69,26 @@ def main():
         print(f"  {perc}th percentile = {thresholds[i]:.6f}: {levels[i]}")
     print(f"  > 80th percentile: {levels[4]}")
 
-    # 5) Update each record in Supabase and then Neo4j each record in Supabase and then Neo4j
-    sup_errors = 0
-    neo_errors = 0
-    for r in tqdm(comp_stats, desc="Updating records", total=len(comp_stats)):
+    # 5) Classify each record, then publish to Supabase and Neo4j in bulk
+    rows = []
+    for r in comp_stats:
         sub = r.get("subzone")
-        cnt = r.get("competitor_count")
-        size = size_map.get(sub, 0)
-
-        if isinstance(cnt, (int, float)) and size > 0:
-            ratio = cnt / size
-            if ratio <= thresholds[0]: density = levels[0]
-            elif ratio <= thresholds[1]: density = levels[1]
-            elif ratio <= thresholds[2]: density = levels[2]
-            elif ratio <= thresholds[3]: density = levels[3]
-            else: density = levels[4]
+        ratio = ratio_of(r)
+
+        if ratio is not None:
+            if ratio <= thresholds[0]: level = levels[0]
+            elif ratio <= thresholds[1]: level = levels[1]
+            elif ratio <= thresholds[2]: level = levels[2]
+            elif ratio <= thresholds[3]: level = levels[3]
+            else: level = levels[4]
         else:
-            density = "unknown"
-
-        # 5a) Update Supabase
-        upd = (supabase
-               .table("competitor_stats")
-               .update({"competitor_density": density})
-               .eq("subzone", sub)
-               .eq("planning_area", r.get("planning_area"))
-               .eq("venue_type", r.get("venue_type"))
-               .execute())
-        if getattr(upd, 'error', None):
-            sup_errors += 1
-            continue
-
-        # 5b) Update Neo4j only after Supabase success
-        try:
-            with neo4j_driver.session() as session:
-                session.execute_write(
-                    update_neo4j_density,
-                    sub,
-                    r.get("venue_type"),
-                    density
-                )
-        except Exception as e:
-            neo_errors += 1
-            print(f"Neo4j error for {sub}-{r.get('venue_type')}: {e}")
-
-    print(f"Finished updates. Supabase errors: {sup_errors}, Neo4j errors: {neo_errors}")
+            level = "unknown"
+        rows.append({"subzone": sub, "venue_type": r.get("venue_type"), "competitor_density": level})
 
+    report = ScoreSink(supabase, neo4j_driver).publish(
+        rows, {"competitor_density": "density"}, desc="competitor_density"
+    )
+    print(f"Finished updates. Supabase errors: {len(report['failed'])}")
 
 if __name__ == "__main__":
     try:
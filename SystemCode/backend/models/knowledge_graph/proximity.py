@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Radius queries over lat/lon points for NEAR edges and proximity counts.
+
+Points are placed on the unit sphere (x, y, z) and indexed in a scipy cKDTree.
+The straight-line (chord) distance between two unit vectors is a monotonic
+function of their great-circle distance, so a radius query on the chord is an
+exact haversine radius query. Only the pairs within the radius are ever
+produced; the Cypher version evaluated every pair of Location nodes.
+
+    index = ProximityIndex(ids, lats, lons)
+    a, b, km = index.pairs(2.0)                      # each pair within 2 km once, a < b
+    q, p, km = index.neighbours(prop_lats, prop_lons, 0.5)   # other points → indexed points
+    counts = index.count_within(prop_lats, prop_lons, 0.5)
+
+The same index serves competitor↔competitor edges (pairs) and
+property→competitor proximity (neighbours / count_within).
+
+    python proximity.py --benchmark      # 7k establishments, 53k properties vs all-pairs haversine
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "..", "..", "supabase_setup", "data")
+
+
+def to_unit_xyz(lats, lons) -> np.ndarray:
+    """(n, 3) points on the unit sphere."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(km: float) -> float:
+    return 2.0 * np.sin(km / (2.0 * EARTH_RADIUS_KM))
+
+
+def chord_to_km(chord) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class ProximityIndex:
+    """cKDTree over points on the unit sphere; rows without coordinates are left out."""
+
+    def __init__(self, ids, lats, lons):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        keep = np.isfinite(lats) & np.isfinite(lons)
+        self.ids = np.asarray(ids, dtype=object)[keep]
+        self.lats, self.lons = lats[keep], lons[keep]
+        self.tree = cKDTree(to_unit_xyz(self.lats, self.lons))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def pairs(self, radius_km: float):
+        """(a, b, km): every pair of indexed points within radius_km, once each, with a < b."""
+        ab = self.tree.query_pairs(km_to_chord(radius_km), output_type="ndarray")
+        a, b = ab[:, 0], ab[:, 1]
+        km = chord_to_km(np.linalg.norm(self.tree.data[a] - self.tree.data[b], axis=1))
+        order = np.lexsort((b, a))
+        return a[order], b[order], km[order]
+
+    def neighbours(self, lats, lons, radius_km: float):
+        """(query, point, km): indexed points within radius_km of each query point."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        other = cKDTree(to_unit_xyz(lats[valid], lons[valid]))
+        sdm = other.sparse_distance_matrix(self.tree, km_to_chord(radius_km), output_type="ndarray")
+        return valid[sdm["i"]], sdm["j"], chord_to_km(sdm["v"])
+
+    def count_within(self, lats, lons, radius_km: float) -> np.ndarray:
+        """Number of indexed points within radius_km of each query point (0 without coordinates)."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        out = np.zeros(len(lats), dtype=np.int64)
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        out[valid] = self.tree.query_ball_point(
+            to_unit_xyz(lats[valid], lons[valid]), km_to_chord(radius_km), return_length=True
+        )
+        return out
+
+    def near_rows(self, radius_km: float) -> list:
+        """NEAR edge rows {a, b, distance} (ids, km) for an UNWIND write."""
+        a, b, km = self.pairs(radius_km)
+        return [
+            {"a": self.ids[i], "b": self.ids[j], "distance": float(d)}
+            for i, j, d in zip(a.tolist(), b.tolist(), km.tolist())
+        ]
+
+
+# ─── Benchmark ────────────────────────────────────────────────────────────────
+def _all_pairs(lats, lons, radius_km, block=512):
+    """The Cypher query's approach in NumPy: haversine over every (a, b) pair, blockwise."""
+    n = 0
+    for start in range(0, len(lats), block):
+        d = haversine_km(lats[start:start + block, None], lons[start:start + block, None], lats, lons)
+        rows = np.arange(start, min(start + block, len(lats)))[:, None]
+        n += int(((d < radius_km) & (np.arange(len(lats))[None, :] > rows)).sum())
+    return n
+
+
+def _cross(lats, lons, other_lats, other_lons, radius_km, block=512):
+    n = 0
+    for start in range(0, len(lats), block):
+        d = haversine_km(lats[start:start + block, None], lons[start:start + block, None], other_lats, other_lons)
+        n += int((d < radius_km).sum())
+    return n
+
+
+def benchmark(n_properties: int = 53_000, radius_km: float = 2.0, property_radius_km: float = 0.5,
+              cross_sample: int = 5_000, seed: int = 0):
+    import pandas as pd
+
+    est = pd.read_csv(os.path.join(DATA_DIR, "establishments.csv"), usecols=["id", "latitude", "longitude"])
+    est = est.dropna(subset=["latitude", "longitude"])
+    props = pd.read_csv(os.path.join(DATA_DIR, "industrial_properties.csv"), usecols=["latitude", "longitude"])
+    props = props.dropna()
+    # Resample the listings with ~100 m of jitter up to n_properties
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(props), n_properties)
+    p_lats = props["latitude"].to_numpy()[pick] + rng.normal(0, 0.001, n_properties)
+    p_lons = props["longitude"].to_numpy()[pick] + rng.normal(0, 0.001, n_properties)
+    lats, lons = est["latitude"].to_numpy(), est["longitude"].to_numpy()
+    print(f"🔍 {len(est):,} establishments, {n_properties:,} properties (resampled from {len(props):,})")
+
+    start = time.perf_counter()
+    index = ProximityIndex(est["id"], lats, lons)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    a, b, km = index.pairs(radius_km)
+    pairs_s = time.perf_counter() - start
+    print(f"   • index built in {build_s*1000:.0f} ms; {len(a):,} NEAR pairs within {radius_km:g} km "
+          f"in {pairs_s*1000:.0f} ms")
+    start = time.perf_counter()
+    brute = _all_pairs(lats, lons, radius_km)
+    brute_s = time.perf_counter() - start
+    print(f"   • all-pairs haversine: {brute:,} pairs in {brute_s:.2f}s "
+          f"({len(lats)**2:,} distances, {brute_s / pairs_s:,.0f}× slower)")
+    err = np.abs(km - haversine_km(lats[a], lons[a], lats[b], lons[b])).max(initial=0)
+    print(f"   • max |distance − haversine| {err * 1e6:.3f} mm")
+
+    start = time.perf_counter()
+    counts = index.count_within(p_lats, p_lons, property_radius_km)
+    count_s = time.perf_counter() - start
+    start = time.perf_counter()
+    q, _, _ = index.neighbours(p_lats, p_lons, property_radius_km)
+    neigh_s = time.perf_counter() - start
+    print(f"   • property→competitor within {property_radius_km:g} km: counts in {count_s*1000:.0f} ms, "
+          f"{len(q):,} pairs in {neigh_s*1000:.0f} ms")
+    sample = slice(0, min(cross_sample, n_properties))
+    start = time.perf_counter()
+    brute_cross = _cross(p_lats[sample], p_lons[sample], lats, lons, property_radius_km)
+    per_point = (time.perf_counter() - start) / (sample.stop - sample.start)
+    print(f"   • all-pairs haversine: ~{per_point * n_properties:.1f}s for all {n_properties:,} "
+          f"({per_point * n_properties / count_s:,.0f}× slower); sample agrees: "
+          f"{brute_cross == int(counts[sample].sum())}")
+    return {"pairs": len(a), "pairs_s": pairs_s, "brute_s": brute_s, "count_s": count_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KD-tree proximity over lat/lon points")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--properties", type=int, default=53_000)
+    parser.add_argument("--radius-km", type=float, default=2.0)
+    opts = parser.parse_args()
+    if opts.benchmark:
+        benchmark(opts.properties, opts.radius_km)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Declarative scoring rules (scoring_rules.yaml) compiled into vectorized evaluators.
+
+A spec lists membership terms, rules built from them with t-norms, rule
+weights, per-venue-type multipliers, the score blend and the feature weights
+(see scoring_rules.yaml). compile_spec() turns it into a FuzzyEngine whose
+membership function evaluates every rule over whole columns in one pass.
+Compiled specs are cached by spec hash, so repeated loads of the same rules
+cost nothing.
+
+    spec  = load_spec("scoring_rules.yaml")
+    rules = compile_spec(spec)
+    scores = rules.engine.score(comp, pop, spend, has_count, rules.engine.type_index(vts), th)
+
+Run as a script to score a candidate spec against the last scoring run
+(scoring.STATE_PATH) without touching Neo4j or Supabase:
+
+    python rule_spec.py my_rules.yaml            # summary of changed scores
+    python rule_spec.py my_rules.yaml --out diff.csv
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+import yaml
+
+from fuzzy_engine import FuzzyEngine, fuzzy_membership, inverse_fuzzy
+
+INPUTS = ("comp_count", "pop_relevant", "spending_power")
+SHAPES = {"falling": fuzzy_membership, "rising": inverse_fuzzy}
+
+T_NORMS = {
+    "product": lambda a, b: a * b,
+    "min": np.minimum,
+    "lukasiewicz": lambda a, b: np.maximum(0.0, a + b - 1.0),
+}
+S_NORMS = {
+    "max": np.maximum,
+    "probabilistic": lambda a, b: a + b - a * b,
+    "bounded": lambda a, b: np.minimum(1.0, a + b),
+}
+
+SECTIONS = ("version", "terms", "rules", "missing_competitors", "venue_multipliers", "blend", "features")
+
+
+class SpecError(ValueError):
+    pass
+
+
+def load_spec(path: str) -> dict:
+    """Parse a YAML or JSON rule spec (by extension) and validate its structure."""
+    with open(path) as f:
+        spec = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+    validate(spec)
+    return spec
+
+
+def spec_hash(spec: dict) -> str:
+    """Short content hash of a spec; key of the compile cache and of the scoring state."""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def validate(spec: dict):
+    missing = [s for s in SECTIONS if s not in spec]
+    if missing:
+        raise SpecError(f"Rule spec is missing sections: {missing}")
+    for name, term in spec["terms"].items():
+        if term.get("input") not in INPUTS:
+            raise SpecError(f"Term '{name}': input must be one of {INPUTS}")
+        if term.get("shape") not in SHAPES:
+            raise SpecError(f"Term '{name}': shape must be one of {sorted(SHAPES)}")
+        if term.get("thresholds") not in ("comp", "pop", "spend"):
+            raise SpecError(f"Term '{name}': thresholds must be comp, pop or spend")
+    if spec.get("t_norm", "product") not in T_NORMS:
+        raise SpecError(f"t_norm must be one of {sorted(T_NORMS)}")
+    if spec.get("s_norm", "max") not in S_NORMS:
+        raise SpecError(f"s_norm must be one of {sorted(S_NORMS)}")
+    names = [r["name"] for r in spec["rules"]]
+    if len(set(names)) != len(names):
+        raise SpecError("Rule names must be unique")
+    clash = set(names) & set(spec["terms"])
+    if clash:
+        raise SpecError(f"Rules shadow terms of the same name: {sorted(clash)}")
+    if spec["missing_competitors"] not in names:
+        raise SpecError(f"missing_competitors '{spec['missing_competitors']}' is not a rule")
+    for vt, mults in spec["venue_multipliers"].items():
+        unknown = set(mults) - set(names)
+        if unknown:
+            raise SpecError(f"venue_multipliers.{vt} names unknown rules: {sorted(unknown)}")
+    for key in ("alpha", "underserved_ratio", "contrast"):
+        if key not in spec["blend"]:
+            raise SpecError(f"blend.{key} is required")
+
+
+# ─── Compilation ──────────────────────────────────────────────────────────────
+def _compile_expr(expr, known: set, t_norm, s_norm, where: str):
+    """Expression → function(env) over the dict of term and rule arrays."""
+    if isinstance(expr, str):
+        if expr not in known:
+            raise SpecError(f"{where}: '{expr}' is not a term or an earlier rule")
+        return lambda env: env[expr]
+    if not isinstance(expr, dict) or len(expr) != 1:
+        raise SpecError(f"{where}: expected a name or a single-operator mapping, got {expr!r}")
+    (op, args), = expr.items()
+    if op == "not":
+        inner = _compile_expr(args, known, t_norm, s_norm, where)
+        return lambda env: 1.0 - inner(env)
+    if not isinstance(args, list) or len(args) < 2:
+        raise SpecError(f"{where}: '{op}' takes a list of at least two operands")
+    parts = [_compile_expr(a, known, t_norm, s_norm, where) for a in args]
+    if op == "equiv":
+        if len(parts) != 2:
+            raise SpecError(f"{where}: 'equiv' takes exactly two operands")
+        a, b = parts
+        return lambda env: 1.0 - np.abs(a(env) - b(env))
+    if op not in ("and", "or"):
+        raise SpecError(f"{where}: unknown operator '{op}'")
+    combine = t_norm if op == "and" else s_norm
+
+    def fold(env):
+        acc = parts[0](env)
+        for p in parts[1:]:
+            acc = combine(acc, p(env))
+        return acc
+    return fold
+
+
+class CompiledRules:
+    """A validated spec compiled to one membership function and a FuzzyEngine."""
+
+    def __init__(self, spec: dict):
+        validate(spec)
+        self.spec = spec
+        self.hash = spec_hash(spec)
+        self.terms = [
+            (name, t["input"], SHAPES[t["shape"]], t["thresholds"]) for name, t in spec["terms"].items()
+        ]
+        known = set(spec["terms"])
+        self.rules = []
+        for rule in spec["rules"]:
+            fn = _compile_expr(
+                rule["when"], known,
+                T_NORMS[rule.get("t_norm", spec.get("t_norm", "product"))],
+                S_NORMS[rule.get("s_norm", spec.get("s_norm", "max"))],
+                f"rule '{rule['name']}'",
+            )
+            self.rules.append((rule["name"], fn))
+            known.add(rule["name"])
+        self.rule_names = [name for name, _ in self.rules]
+        self.fallback = self.rule_names.index(spec["missing_competitors"])
+        self.engine = FuzzyEngine(
+            [{"name": r["name"], "weight": r["weight"]} for r in spec["rules"]],
+            spec["venue_multipliers"],
+            rule_names=self.rule_names,
+            membership=self.memberships,
+        )
+
+    def memberships(self, comp_count, pop_relevant, spending_power, has_count, thresholds) -> np.ndarray:
+        """(n_records, n_rules) activations, columns in the spec's rule order."""
+        cols = {"comp_count": comp_count, "pop_relevant": pop_relevant, "spending_power": spending_power}
+        env = {
+            name: shape(cols[col], *thresholds[th]) for name, col, shape, th in self.terms
+        }
+        n = len(np.asarray(comp_count))
+        out = []
+        for name, fn in self.rules:
+            env[name] = np.broadcast_to(fn(env), (n,))
+            out.append(env[name])
+        m = np.column_stack(out) if out else np.zeros((n, 0))
+        # Missing competitor data falls back entirely to the fallback rule
+        missing = ~np.asarray(has_count, dtype=bool)
+        m[missing] = 0.0
+        m[missing, self.fallback] = 1.0
+        return m
+
+
+_compiled = {}
+
+
+def compile_spec(spec: dict) -> CompiledRules:
+    """CompiledRules for `spec`, cached by spec hash."""
+    key = spec_hash(spec)
+    if key not in _compiled:
+        _compiled[key] = CompiledRules(spec)
+    return _compiled[key]
+
+
+# ─── Offline what-if for rule changes ─────────────────────────────────────────
+def rescore_state(spec: dict, state_path: str = None) -> dict:
+    """Score the last run's cells with `spec` in one pass; the stored thresholds and GNN scores are kept."""
+    import scoring
+
+    cols, thresholds, meta = scoring.load_state(state_path or scoring.STATE_PATH)
+    start = time.perf_counter()
+    rule, _ = scoring.rule_scores(
+        cols["comp_count"], cols["pop_relevant"], cols["spending_power"], cols["has_count"],
+        cols["venue_type"].tolist(), thresholds, spec=spec,
+    )
+    use_gnn = meta.get("use_gnn", True)
+    overall = np.array([
+        scoring.overall_score(float(r), float(g), None if np.isnan(u) else float(u), use_gnn, spec["blend"])
+        for r, g, u in zip(rule, cols["gnn_score"], cols["underserved_score"])
+    ])
+    return {
+        "subzone": cols["subzone"], "venue_type": cols["venue_type"],
+        "rule_score": rule, "overall_score": overall,
+        "baseline": cols["overall_score"],
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a rule spec against the last scoring run")
+    parser.add_argument("spec", help="YAML or JSON rule spec")
+    parser.add_argument("--state", default=None, help="scoring state (default scoring.STATE_PATH)")
+    parser.add_argument("--out", default=None, help="write per-cell baseline/candidate scores to this CSV")
+    parser.add_argument("--top", type=int, default=10)
+    opts = parser.parse_args()
+
+    import scoring
+
+    spec = load_spec(opts.spec)
+    print(f"🔍 Spec {opts.spec} (version {spec['version']}, hash {spec_hash(spec)}); "
+          f"current rules {scoring.rules_version()}")
+    if spec["features"] != scoring.SPEC["features"]:
+        print("⚠️ features differ from the current spec; the stored features are used as they are")
+
+    res = rescore_state(spec, opts.state)
+    delta = res["overall_score"] - res["baseline"]
+    changed = np.abs(delta) > 1e-9
+    print(f"✅ Scored {len(delta)} cells in {res['seconds']*1000:.1f} ms: {int(changed.sum())} changed, "
+          f"mean |Δ| {np.abs(delta).mean():.2f}, max |Δ| {np.abs(delta).max(initial=0):.2f}")
+    for i in np.argsort(-np.abs(delta))[:opts.top]:
+        if not changed[i]:
+            break
+        print(f"   • {res['subzone'][i]} / {res['venue_type'][i]}: "
+              f"{res['baseline'][i]:.2f} → {res['overall_score'][i]:.2f}")
+
+    if opts.out:
+        import csv
+        with open(opts.out, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["subzone", "venue_type", "baseline", "candidate", "delta"])
+            for i in range(len(delta)):
+                w.writerow([res["subzone"][i], res["venue_type"][i], res["baseline"][i],
+                            res["overall_score"][i], round(float(delta[i]), 2)])
+        print(f"✅ Wrote {opts.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+In-memory what-if scoring on top of the last scoring run.
+
+Loads the scoring state written by neuro_symbolic.py (scoring.STATE_PATH) and
+answers questions like "what happens to Bedok North's cafe score if a fourth
+cafe opens?" without touching Neo4j or Supabase. A scenario is a list of
+changes; each one shifts the inputs of the affected (subzone, venue_type)
+cells and only those cells are re-scored.
+
+    scorer = ScenarioScorer()
+    scorer.score([{"subzone": "BEDOK NORTH", "venue_type": "CAFE", "competitors": 1}])
+
+Change keys:
+  subzone        required
+  venue_type     required for "competitors"; omit to apply to every venue type
+  competitors    competitors added (negative: removed)
+  population     residents added; each cell's relevant population grows by
+                 its share of the subzone population, and density by
+                 residents / subzone area
+  pop_relevant   residents added directly to the venue type's age brackets
+
+Thresholds stay at the values of the scoring run (one hypothetical venue does
+not re-tercile the city), and the GNN component is held at its last value.
+"""
+
+import os
+import time
+
+import numpy as np
+
+import scoring
+
+
+class ScenarioScorer:
+    def __init__(self, path: str = scoring.STATE_PATH):
+        self.path = path
+        self._mtime = None
+        self.reload()
+
+    def reload(self):
+        """(Re)load the scoring state; cheap no-op if the file has not changed."""
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+        cols, self.thresholds, self.meta = scoring.load_state(self.path)
+        self.cols = cols
+        self._mtime = mtime
+        self.index = {
+            (sz, vt): i for i, (sz, vt) in enumerate(zip(cols["subzone"].tolist(), cols["venue_type"].tolist()))
+        }
+        self.by_subzone = {}
+        for i, sz in enumerate(cols["subzone"].tolist()):
+            self.by_subzone.setdefault(sz, []).append(i)
+        # Normalisation range of geo_analysis' underserved score over the baseline
+        raw = scoring.underserved_raw(cols["density"], cols["comp_count"])
+        raw = raw[np.isfinite(raw)]
+        self.us_range = (float(raw.min()), float(raw.max())) if len(raw) else (0.0, 1.0)
+
+    def _cells(self, change):
+        sz = str(change.get("subzone", "")).strip().upper()
+        if sz not in self.by_subzone:
+            raise ValueError(f"Unknown subzone '{change.get('subzone')}'")
+        vt = change.get("venue_type")
+        if vt is None:
+            if "competitors" in change:
+                raise ValueError("'competitors' changes need a venue_type")
+            return self.by_subzone[sz]
+        i = self.index.get((sz, str(vt).strip().upper()))
+        if i is None:
+            raise ValueError(f"No scores for venue type '{vt}' in '{sz}'")
+        return [i]
+
+    def _underserved(self, density, comp_count):
+        lo, hi = self.us_range
+        pct = (scoring.underserved_raw(density, comp_count) - lo) / (hi - lo or 1.0) * 100
+        return np.clip(pct, 0.0, 100.0)
+
+    def score(self, changes: list) -> dict:
+        """Baseline vs scenario scores for every cell the changes touch. Nothing is written."""
+        start = time.perf_counter()
+        c = self.cols
+        comp = {}
+        pop_rel = {}
+        density = {}
+        counted = set()
+        for change in changes:
+            cells = self._cells(change)
+            if "competitors" in change:
+                counted.update(cells)
+            for i in cells:
+                comp.setdefault(i, float(c["comp_count"][i]))
+                pop_rel.setdefault(i, float(c["pop_relevant"][i]))
+                density.setdefault(i, float(c["density"][i]))
+                comp[i] = max(0.0, comp[i] + float(change.get("competitors", 0)))
+                pop_rel[i] = max(0.0, pop_rel[i] + float(change.get("pop_relevant", 0)))
+                residents = float(change.get("population", 0))
+                if residents:
+                    total = float(c["population"][i])
+                    if total > 0:
+                        pop_rel[i] = max(0.0, pop_rel[i] + residents * float(c["pop_relevant"][i]) / total)
+                        # density = population / area, so area = population / density
+                        if np.isfinite(density[i]) and c["density"][i] > 0:
+                            area = total / float(c["density"][i])
+                            density[i] = max(0.0, density[i] + residents / area)
+
+        idx = np.array(sorted(comp), dtype=np.intp)
+        if not len(idx):
+            return {"cells": [], "elapsed_ms": 0.0}
+        new_comp = np.array([comp[i] for i in idx])
+        new_pop = np.array([pop_rel[i] for i in idx])
+        new_density = np.array([density[i] for i in idx])
+        # Adding or removing competitors makes the count known
+        has_count = c["has_count"][idx] | np.isin(idx, list(counted))
+        rule, _ = scoring.rule_scores(
+            new_comp, new_pop, c["spending_power"][idx], has_count,
+            c["venue_type"][idx].tolist(), self.thresholds
+        )
+        # Shift the stored underserved score by the formula's change for the cell
+        us_delta = (self._underserved(new_density, new_comp)
+                    - self._underserved(c["density"][idx], c["comp_count"][idx]))
+
+        use_gnn = self.meta.get("use_gnn", True)
+        cells = []
+        for k, i in enumerate(idx):
+            base_us = c["underserved_score"][i]
+            us = None if np.isnan(base_us) else float(np.clip(base_us + np.nan_to_num(us_delta[k]), 0, 100))
+            overall = scoring.overall_score(float(rule[k]), float(c["gnn_score"][i]), us, use_gnn)
+            cells.append({
+                "subzone": str(c["subzone"][i]),
+                "venue_type": str(c["venue_type"][i]),
+                "competitor_count": int(new_comp[k]),
+                "baseline": {
+                    "rule_score": round(float(c["rule_score"][i]), 4),
+                    "underserved_score": None if np.isnan(base_us) else round(float(base_us), 2),
+                    "overall_score": float(c["overall_score"][i]),
+                },
+                "scenario": {
+                    "rule_score": round(float(rule[k]), 4),
+                    "underserved_score": None if us is None else round(us, 2),
+                    "overall_score": overall,
+                },
+                "overall_delta": round(overall - float(c["overall_score"][i]), 2),
+            })
+        return {"cells": cells, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
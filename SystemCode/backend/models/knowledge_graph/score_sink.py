@@ -0,0 +1,158 @@
+"""
+Bulk publishing of per-(subzone, venue_type) scores to Supabase and Neo4j.
+
+Supabase gets chunked upserts on the table's unique key instead of one
+update request per row; Neo4j gets UNWIND-batched SETs through
+PartitionedWriter. A chunk that keeps failing after its retries is split in
+half until the offending rows are isolated, so one bad row does not stop the
+others from being written, and the report lists exactly which rows failed.
+
+    sink = ScoreSink(supabase, driver)
+    report = sink.publish(rows, {"overall_score": "overall_score"}, desc="overall_score")
+    # rows: [{"subzone": ..., "venue_type": ..., "overall_score": ...}, ...]
+"""
+
+import os
+import time
+
+from tqdm import tqdm
+
+import snapshot
+from neo4j_writer import PartitionedWriter
+
+SINK_CHUNK_SIZE = int(os.getenv("SINK_CHUNK_SIZE", "500"))
+
+# Postgres checks NOT NULL on the proposed row before ON CONFLICT resolves it,
+# so an upsert that only means to update scores still has to carry these
+REQUIRED_COLUMNS = {
+    "competitor_stats": ["planning_area", "competitor_score", "competitor_density"],
+}
+
+
+class ScoreSink:
+    def __init__(self, supabase=None, driver=None, table: str = "competitor_stats",
+                 key=("subzone", "venue_type"), label: str = "CompetitorStats",
+                 chunk_size: int = SINK_CHUNK_SIZE, retries: int = 3):
+        self.supabase = supabase
+        self.driver = driver
+        self.table = table
+        self.key = tuple(key)
+        self.label = label
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+    def _key(self, row):
+        return tuple(row.get(k) for k in self.key)
+
+    # ─── Supabase ─────────────────────────────────────────────────────────────
+    def _required_values(self, columns) -> dict:
+        """{key: {required column: value}} from a freshly refreshed snapshot."""
+        needed = [c for c in REQUIRED_COLUMNS.get(self.table, []) if c not in columns]
+        if not needed:
+            return {}
+        snapshot.refresh(self.table, force=True)
+        return {
+            self._key(r): {c: r.get(c) for c in needed}
+            for r in snapshot.fetch_records(self.table, [*self.key, *needed])
+        }
+
+    def _upsert(self, chunk):
+        last = None
+        for attempt in range(self.retries + 1):
+            try:
+                self.supabase.table(self.table) \
+                    .upsert(chunk, on_conflict=",".join(self.key)) \
+                    .execute()
+                return None
+            except Exception as e:  # APIError, HTTP and connection errors alike
+                last = e
+                if attempt < self.retries:
+                    time.sleep(0.5 * 2 ** attempt)
+        return last
+
+    def _write_chunk(self, chunk, report, progress):
+        error = self._upsert(chunk)
+        if error is None:
+            report["written"] += len(chunk)
+            progress.update(len(chunk))
+        elif len(chunk) == 1:
+            report["failed"].append({"row": chunk[0], "error": str(error)})
+            progress.update(1)
+        else:
+            mid = len(chunk) // 2
+            self._write_chunk(chunk[:mid], report, progress)
+            self._write_chunk(chunk[mid:], report, progress)
+
+    def to_supabase(self, rows, columns, desc: str = None) -> dict:
+        """Upsert the key plus `columns` of each row; returns {"written", "failed", "seconds"}."""
+        start = time.perf_counter()
+        report = {"written": 0, "failed": [], "seconds": 0.0}
+        required = self._required_values(columns)
+        payload = []
+        for row in rows:
+            key = self._key(row)
+            if any(v is None for v in key):
+                report["failed"].append({"row": row, "error": "missing key"})
+                continue
+            payload.append({
+                **dict(zip(self.key, key)),
+                **required.get(key, {}),
+                **{c: row[c] for c in columns},
+            })
+
+        with tqdm(total=len(payload), desc=desc or f"Upserting {self.table}") as progress:
+            for i in range(0, len(payload), self.chunk_size):
+                self._write_chunk(payload[i:i + self.chunk_size], report, progress)
+        snapshot.invalidate(self.table)
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+    # ─── Neo4j ────────────────────────────────────────────────────────────────
+    def to_neo4j(self, rows, props: dict, where: str = None, desc: str = None) -> int:
+        """SET props ({row column: node property}) on the matching nodes in UNWIND batches.
+
+        `where` is an optional Cypher condition on the node `n`.
+        """
+        match = ", ".join(f"{k}: row.{k}" for k in self.key)
+        query = f"""
+            UNWIND $rows AS row
+            MATCH (n:{self.label} {{{match}}})
+            {f"WHERE {where}" if where else ""}
+            SET n += row.props
+        """
+        batch = [
+            {**{k: r[k] for k in self.key}, "props": {p: r[c] for c, p in props.items()}}
+            for r in rows
+        ]
+        return PartitionedWriter(self.driver).write(
+            query, batch, partition_by=lambda r: r[self.key[0]], desc=desc or f"Updating {self.label}"
+        )
+
+    # ─── Both ─────────────────────────────────────────────────────────────────
+    def publish(self, rows, columns: dict, where: str = None, desc: str = None) -> dict:
+        """Write `columns` ({Supabase column: Neo4j property or None}) to both stores.
+
+        Rows that could not be written to Supabase are not written to Neo4j either.
+        """
+        rows = list(rows)
+        label = desc or ", ".join(columns)
+        report = {"rows": len(rows), "neo4j": 0}
+        if self.supabase is not None:
+            report.update(self.to_supabase(rows, list(columns), desc=f"Supabase {label}"))
+            failed = {self._key(f["row"]) for f in report["failed"]}
+            rows = [r for r in rows if self._key(r) not in failed]
+        neo4j_props = {c: p for c, p in columns.items() if p}
+        if self.driver is not None and neo4j_props:
+            report["neo4j"] = self.to_neo4j(rows, neo4j_props, where, desc=f"Neo4j {label}")
+        print_report(report, label)
+        return report
+
+
+def print_report(report: dict, label: str):
+    failed = report.get("failed", [])
+    print(f"✅ Published {label}: {report.get('written', 0)} Supabase rows "
+          f"in {report.get('seconds', 0):.1f}s, {report['neo4j']} Neo4j rows, {len(failed)} failed")
+    for f in failed[:10]:
+        print(f"❌ {f['row']}: {f['error']}")
+    if len(failed) > 10:
+        print(f"❌ … and {len(failed) - 10} more")
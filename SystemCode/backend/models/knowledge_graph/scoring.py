@@ -0,0 +1,285 @@
+"""
+Rule base, score blending and the persisted scoring state.
+
+The rule base is loaded from scoring_rules.yaml (SCORING_RULES) and compiled
+by rule_spec.py.
+
+Shared by neuro_symbolic.py (the full scoring run) and scenario.py (in-memory
+what-if scoring), so both produce overall_score the same way. Only depends on
+NumPy and PyYAML: the API server imports it without torch.
+
+The state file (SCORING_STATE, default .scoring/state.npz) holds one row per
+(subzone, venue_type) cell with the features, thresholds and component scores
+of the last scoring run. The next run compares its features against it and
+re-scores only the cells whose inputs changed (plan_rescore), unless the
+terciles moved past SCORING_THRESHOLD_TOL.
+"""
+
+import json
+import os
+import time
+from typing import Dict
+
+import numpy as np
+
+import rule_spec
+from fuzzy_engine import FuzzyEngine, tercile_thresholds
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# ─── Rule base ────────────────────────────────────────────────────────────────
+# Rules, venue-type multipliers and blend weights live in a declarative spec
+# (scoring_rules.yaml), compiled once by rule_spec.py
+RULES_PATH = os.getenv("SCORING_RULES", os.path.join(HERE, "scoring_rules.yaml"))
+SPEC = rule_spec.load_spec(RULES_PATH)
+BLEND = SPEC["blend"]
+
+SOFT_RULES = [{"name": r["name"], "weight": r["weight"]} for r in SPEC["rules"]]
+RULE_IMPORTANCE: Dict[str, Dict[str, float]] = SPEC["venue_multipliers"]
+
+
+_rules = None
+
+
+def engine(spec: dict = None) -> FuzzyEngine:
+    global _rules
+    if spec is not None:
+        return rule_spec.compile_spec(spec).engine
+    if _rules is None:
+        _rules = rule_spec.compile_spec(SPEC)
+    return _rules.engine
+
+
+def rule_scores(comp_count, pop_relevant, spending_power, has_count, venue_types, thresholds=None,
+                spec: dict = None):
+    """(rule score per cell, thresholds used); thresholds default to the data's terciles.
+
+    `spec` scores with another rule spec instead of scoring_rules.yaml.
+    """
+    comp_count = np.asarray(comp_count, dtype=np.float64)
+    pop_relevant = np.asarray(pop_relevant, dtype=np.float64)
+    spending_power = np.asarray(spending_power, dtype=np.float64)
+    has_count = np.asarray(has_count, dtype=bool)
+    if thresholds is None:
+        thresholds = tercile_thresholds(comp_count, pop_relevant, spending_power, has_count)
+    eng = engine(spec)
+    scores = eng.score(comp_count, pop_relevant, spending_power, has_count,
+                       eng.type_index(venue_types), thresholds)
+    return scores, thresholds
+
+
+def overall_score(rule: float, gnn: float, underserved, use_gnn: bool = True, blend: dict = None) -> float:
+    """Blend rule, GNN and underserved scores into the 0–100 overall_score."""
+    blend = blend or BLEND
+    # — apply mild contrast around 0.5 to spread scores —
+    ru = 0.5 + (rule - 0.5) * blend["contrast"]
+    ru = max(0.0, min(ru, 1.0))
+
+    alpha = blend["alpha"] if use_gnn else 0.0
+    raw_score = alpha * gnn + (1 - alpha) * ru
+    clamped = max(0.0, min(raw_score, 1.0))
+    # scale to 0–100
+    base_pct = clamped * 100.0
+
+    # blend with underserved_score if present
+    if underserved is not None:
+        ratio = blend["underserved_ratio"]
+        raw_overall = base_pct * (1 - ratio) + underserved * ratio
+    else:
+        raw_overall = base_pct
+
+    # round to two decimal places
+    return round(raw_overall, 2)
+
+
+def overall_scores(rule, gnn, underserved, use_gnn: bool = True, blend: dict = None) -> np.ndarray:
+    """Array version of overall_score(); `underserved` is NaN where a cell has none.
+
+    np.round rounds halves to even, so a score can differ from overall_score()
+    by 0.01 on exact ties.
+    """
+    blend = blend or BLEND
+    ru = np.clip(0.5 + (np.asarray(rule, dtype=np.float64) - 0.5) * blend["contrast"], 0.0, 1.0)
+    alpha = blend["alpha"] if use_gnn else 0.0
+    base_pct = np.clip(alpha * np.asarray(gnn, dtype=np.float64) + (1 - alpha) * ru, 0.0, 1.0) * 100.0
+    underserved = np.asarray(underserved, dtype=np.float64)
+    ratio = blend["underserved_ratio"]
+    raw = np.where(np.isnan(underserved), base_pct, base_pct * (1 - ratio) + underserved * ratio)
+    return np.round(raw, 2)
+
+
+def underserved_raw(density, comp_count):
+    """geo_analysis.py's unnormalised underserved score: density / (competitors + 1)."""
+    return np.asarray(density, dtype=np.float64) / (np.asarray(comp_count, dtype=np.float64) + 1)
+
+
+# ─── Persisted state ──────────────────────────────────────────────────────────
+STATE_PATH = os.getenv("SCORING_STATE", os.path.join(HERE, ".scoring", "state.npz"))
+
+STATE_COLUMNS = [
+    "subzone", "venue_type", "comp_count", "has_count", "pop_relevant", "spending_power",
+    "underserved_score", "rule_score", "gnn_score", "overall_score", "density", "population",
+]
+
+
+def save_state(columns: dict, thresholds: dict, meta: dict = None, path: str = STATE_PATH):
+    """Write the per-cell columns (STATE_COLUMNS), thresholds and metadata atomically.
+
+    underserved_score is stored as NaN where the cell had none.
+    """
+    missing = set(STATE_COLUMNS) - set(columns)
+    if missing:
+        raise ValueError(f"Missing state columns: {sorted(missing)}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {
+        "subzone": np.asarray(columns["subzone"], dtype=str),
+        "venue_type": np.asarray(columns["venue_type"], dtype=str),
+        "has_count": np.asarray(columns["has_count"], dtype=bool),
+    }
+    for col in STATE_COLUMNS:
+        if col not in arrays:
+            arrays[col] = np.array(
+                [np.nan if v is None else v for v in columns[col]], dtype=np.float64
+            )
+    for key, (low, high) in thresholds.items():
+        arrays[f"threshold_{key}"] = np.array([low, high], dtype=np.float64)
+    meta = {"saved_at": time.time(), **(meta or {})}
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load_state(path: str = STATE_PATH):
+    """(columns, thresholds, meta) as written by save_state()."""
+    with np.load(path, allow_pickle=False) as data:
+        columns = {col: data[col] for col in STATE_COLUMNS}
+        thresholds = {
+            key[len("threshold_"):]: tuple(data[key].tolist())
+            for key in data.files if key.startswith("threshold_")
+        }
+        meta = json.loads(str(data["meta"]))
+    return columns, thresholds, meta
+
+
+# ─── Incremental re-scoring ───────────────────────────────────────────────────
+# Inputs that decide a cell's score; a cell whose inputs all match the state is clean
+FEATURE_COLUMNS = ["comp_count", "has_count", "pop_relevant", "spending_power", "underserved_score"]
+
+# Relative tercile movement that forces a full recompute
+THRESHOLD_TOLERANCE = float(os.getenv("SCORING_THRESHOLD_TOL", "0.02"))
+
+CHANGED_CELLS_PATH = os.getenv(
+    "SCORING_CHANGES", os.path.join(os.path.dirname(STATE_PATH), "changed_cells.json")
+)
+
+
+def rules_version() -> str:
+    """Hash of the rule spec; a change forces a full recompute."""
+    return rule_spec.spec_hash(SPEC)
+
+
+def align(prev: dict, subzones, venue_types) -> np.ndarray:
+    """State row of each (subzone, venue_type) cell; -1 for cells the state does not have."""
+    index = {k: i for i, k in enumerate(zip(prev["subzone"].tolist(), prev["venue_type"].tolist()))}
+    return np.array([index.get(k, -1) for k in zip(subzones, venue_types)], dtype=np.intp)
+
+
+def dirty_cells(prev: dict, current: dict, rows: np.ndarray) -> np.ndarray:
+    """Mask of cells that are new or whose FEATURE_COLUMNS differ from the state."""
+    dirty = rows < 0
+    known = ~dirty
+    for col in FEATURE_COLUMNS:
+        cur = np.array([np.nan if v is None else v for v in current[col]], dtype=np.float64)
+        old = prev[col].astype(np.float64)[rows[known]]
+        dirty[known] |= ~np.isclose(cur[known], old, rtol=0, atol=1e-9, equal_nan=True)
+    return dirty
+
+
+def moved_thresholds(old: dict, new: dict, tol: float = THRESHOLD_TOLERANCE) -> list:
+    """Thresholds ("comp.low", …) that moved by more than `tol` relative to their old value."""
+    moved = []
+    for key, pair in new.items():
+        if key not in old:
+            moved.append(key)
+            continue
+        for name, o, n in zip(("low", "high"), old[key], pair):
+            if abs(n - o) > tol * abs(o):
+                moved.append(f"{key}.{name}")
+    return moved
+
+
+def plan_rescore(current: dict, thresholds: dict, meta: dict, full: bool = False,
+                 path: str = STATE_PATH) -> dict:
+    """Decide between re-scoring the dirty cells and a full recompute.
+
+    `current` holds the run's subzone, venue_type and FEATURE_COLUMNS lists,
+    `thresholds` the terciles of the current data and `meta` the run's
+    settings (use_gnn, rule and GNN versions). Returns {"mode", "reason",
+    "dirty", "rows", "state", "thresholds"}: `rows` maps each cell to its row
+    in the loaded state columns `state` (-1 if new), and in incremental mode
+    `thresholds` are the stored ones the clean cells were scored with.
+    """
+    n = len(current["subzone"])
+    plan = {"mode": "full", "dirty": np.ones(n, dtype=bool), "rows": np.full(n, -1, dtype=np.intp),
+            "state": None, "thresholds": thresholds}
+    try:
+        prev, prev_thresholds, prev_meta = load_state(path)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        return {**plan, "reason": f"no usable scoring state ({type(e).__name__})"}
+    plan["state"] = prev
+    plan["rows"] = align(prev, current["subzone"], current["venue_type"])
+
+    if full:
+        return {**plan, "reason": "full recompute requested"}
+    changed = [k for k, v in meta.items() if prev_meta.get(k) != v]
+    if changed:
+        return {**plan, "reason": f"settings changed: {', '.join(changed)}"}
+    moved = moved_thresholds(prev_thresholds, thresholds)
+    if moved:
+        return {**plan, "reason": f"thresholds moved past {THRESHOLD_TOLERANCE:.0%}: {', '.join(moved)}"}
+    return {**plan, "mode": "incremental", "reason": "thresholds within tolerance",
+            "dirty": dirty_cells(prev, current, plan["rows"]), "thresholds": prev_thresholds}
+
+
+def cell_changes(subzones, venue_types, overall, plan: dict):
+    """(changed, removed) cells against the state: new cells and cells whose overall_score moved."""
+    prev, rows = plan["state"], plan["rows"]
+    old = np.full(len(rows), np.nan)
+    removed = []
+    if prev is not None:
+        old[rows >= 0] = prev["overall_score"][rows[rows >= 0]]
+        present = set(zip(subzones, venue_types))
+        removed = [
+            {"subzone": sz, "venue_type": vt}
+            for sz, vt in zip(prev["subzone"].tolist(), prev["venue_type"].tolist())
+            if (sz, vt) not in present
+        ]
+    overall = np.asarray(overall, dtype=np.float64)
+    moved = np.isnan(old) | (np.abs(overall - np.nan_to_num(old)) > 1e-9)
+    changed = [
+        {"subzone": subzones[i], "venue_type": venue_types[i], "overall_score": float(overall[i]),
+         "previous": None if np.isnan(old[i]) else float(old[i])}
+        for i in np.flatnonzero(moved)
+    ]
+    return changed, removed
+
+
+def write_changed_cells(changed: list, removed: list, plan: dict, path: str = CHANGED_CELLS_PATH):
+    """Write cell_changes() output and the run's mode as JSON.
+
+    Downstream caches read this to invalidate only the affected cells.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        "generated_at": time.time(),
+        "mode": plan["mode"],
+        "reason": plan["reason"],
+        "changed": changed,
+        "removed": removed,
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp, path)
@@ -0,0 +1,417 @@
+"""
+Heterogeneous graph and HGT model behind the GNN component of neuro_symbolic.py.
+
+Every (subzone, venue_type) record is a PA_VT node. Instead of connecting all
+PA_VT nodes of a subzone (and of a venue type) pairwise, which is quadratic in
+the group size, each record links to one Subzone hub and one VenueType hub:
+
+    PA_VT -in_subzone-> Subzone      Subzone   -has_record-> PA_VT
+    PA_VT -of_type->    VenueType    VenueType -has_record-> PA_VT
+
+so the edge count is 4 × records. Two HGT layers carry information between
+records of the same subzone / venue type through the hubs, just as one layer
+over the old cliques did. Hub features are the mean of their records' features.
+
+    python scoring_gnn.py --benchmark     # clique vs hub graph: build, edges, forward
+
+Trained weights live in versioned checkpoints (see train_gnn.py) together with
+the feature-normalisation statistics they were trained with; GNNScorer loads
+one for CPU inference, optionally through a TorchScript trace.
+
+For graphs larger than GNN_BATCH_SIZE records, inference runs in mini-batches
+of seed records with their sampled 2-hop neighbourhood (all hubs of a seed,
+GNN_NUM_NEIGHBORS records per hub), so peak memory depends on the batch size
+rather than on the size of the graph:
+
+    python scoring_gnn.py --benchmark-minibatch   # 1x / 10x / 100x records
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch_geometric.data import HeteroData
+from torch_geometric.nn import HGTConv
+
+RECORD = "PA_VT"
+
+# Column order of the PA_VT feature matrix
+FEATURE_NAMES = ["comp_count", "pop_relevant", "spending_power"]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.getenv("GNN_CHECKPOINT_DIR", os.path.join(HERE, "checkpoints", "scoring_gnn"))
+GNN_THREADS = int(os.getenv("GNN_THREADS", "2"))
+GNN_TORCHSCRIPT = os.getenv("GNN_TORCHSCRIPT", "false").lower() in ("1", "true", "yes")
+GNN_BATCH_SIZE = int(os.getenv("GNN_BATCH_SIZE", "8192"))      # 0: always full-batch
+GNN_NUM_NEIGHBORS = int(os.getenv("GNN_NUM_NEIGHBORS", "32"))  # records sampled per hub
+
+
+class CompetitionHGT(torch.nn.Module):
+    def __init__(self, in_dim, hid_dim, out_dim, metadata, heads=4):
+        super().__init__()
+        self.conv1 = HGTConv(in_dim, hid_dim, metadata=metadata, heads=heads)
+        self.conv2 = HGTConv(hid_dim, out_dim, metadata=metadata, heads=1)
+    def forward(self, x_dict, edge_index_dict):
+        x = self.conv1(x_dict, edge_index_dict)
+        x = {k: F.relu(v) for k,v in x.items()}
+        return self.conv2(x, edge_index_dict)
+
+
+# ─── Graph construction ───────────────────────────────────────────────────────
+def _hub_mean(x: torch.Tensor, index: torch.Tensor, n_hubs: int) -> torch.Tensor:
+    total = torch.zeros(n_hubs, x.size(1)).index_add_(0, index, x)
+    count = torch.bincount(index, minlength=n_hubs).clamp(min=1).unsqueeze(1)
+    return total / count
+
+
+def build_hub_graph(feats, subzones, venue_types) -> HeteroData:
+    """HeteroData with PA_VT records linked to Subzone and VenueType hub nodes.
+
+    feats is (n_records, n_features); subzones / venue_types give each record's
+    group. Edge tensors are built with index ops, linear in the record count.
+    """
+    x = torch.as_tensor(np.asarray(feats), dtype=torch.float)
+    sz_names, sz_idx = np.unique(np.asarray(subzones, dtype=object).astype(str), return_inverse=True)
+    vt_names, vt_idx = np.unique(np.asarray(venue_types, dtype=object).astype(str), return_inverse=True)
+    sz_idx = torch.from_numpy(sz_idx.astype(np.int64))
+    vt_idx = torch.from_numpy(vt_idx.astype(np.int64))
+    records = torch.arange(len(x))
+
+    het = HeteroData()
+    het[RECORD].x = x
+    het["Subzone"].x = _hub_mean(x, sz_idx, len(sz_names))
+    het["VenueType"].x = _hub_mean(x, vt_idx, len(vt_names))
+    het[RECORD, "in_subzone", "Subzone"].edge_index = torch.stack([records, sz_idx])
+    het["Subzone", "has_record", RECORD].edge_index = torch.stack([sz_idx, records])
+    het[RECORD, "of_type", "VenueType"].edge_index = torch.stack([records, vt_idx])
+    het["VenueType", "has_record", RECORD].edge_index = torch.stack([vt_idx, records])
+    return het
+
+
+def build_clique_graph(feats, subzones, venue_types) -> HeteroData:
+    """The previous all-pairs same_subzone / same_type graph, kept for the benchmark."""
+    from collections import defaultdict
+
+    het = HeteroData()
+    het[RECORD].x = torch.tensor(np.asarray(feats).tolist(), dtype=torch.float)
+    for relation, keys in (("same_subzone", subzones), ("same_type", venue_types)):
+        groups = defaultdict(list)
+        for i, key in enumerate(keys):
+            groups[key].append(i)
+        rows, cols = [], []
+        for nodes in groups.values():
+            for i in nodes:
+                for j in nodes:
+                    if i != j:
+                        rows.append(i); cols.append(j)
+        het[RECORD, relation, RECORD].edge_index = torch.tensor([rows, cols], dtype=torch.long)
+    return het
+
+
+def num_edges(het: HeteroData) -> int:
+    return sum(e.size(1) for e in het.edge_index_dict.values())
+
+
+def gnn_scores(het: HeteroData, model: torch.nn.Module = None) -> list:
+    """Min-max normalised PA_VT outputs of the model (a fresh CompetitionHGT by default)."""
+    if model is None:
+        model = CompetitionHGT(het[RECORD].x.size(1), 16, 1, het.metadata())
+    model.eval()
+    with torch.no_grad():
+        out = model(het.x_dict, het.edge_index_dict)
+    raw = out[RECORD].view(-1).tolist()
+    mn, mx = min(raw), max(raw)
+    return [(v - mn)/(mx - mn + 1e-9) for v in raw]
+
+
+# ─── Mini-batch inference ─────────────────────────────────────────────────────
+def minibatch_forward(model, het: HeteroData, batch_size: int = GNN_BATCH_SIZE,
+                      num_neighbors: int = GNN_NUM_NEIGHBORS) -> torch.Tensor:
+    """Raw PA_VT outputs computed batch_size seed records at a time.
+
+    Hop 1 takes every hub of the seeds (one Subzone and one VenueType each);
+    hop 2 samples num_neighbors records per hub. Hub inputs are already the
+    mean over all of their records, so sampling only thins the second-layer
+    messages of very large hubs.
+    """
+    from torch_geometric.loader import NeighborLoader
+
+    loader = NeighborLoader(
+        het, num_neighbors=[-1, num_neighbors], input_nodes=(RECORD, None),
+        batch_size=batch_size, shuffle=False,
+    )
+    with torch.inference_mode():
+        out = torch.empty(het[RECORD].num_nodes)
+        for batch in loader:
+            bs = batch[RECORD].batch_size
+            pred = model(batch.x_dict, batch.edge_index_dict)[RECORD][:bs].view(-1)
+            out[batch[RECORD].n_id[:bs]] = pred
+    return out
+
+
+# ─── Feature normalisation ────────────────────────────────────────────────────
+# Counts and spending power span several orders of magnitude: log1p, then z-score
+def feature_stats(feats) -> dict:
+    z = np.log1p(np.clip(np.asarray(feats, dtype=np.float64), 0, None))
+    return {"mean": z.mean(axis=0).tolist(), "std": (z.std(axis=0) + 1e-6).tolist()}
+
+
+def normalise_features(feats, stats: dict) -> np.ndarray:
+    z = np.log1p(np.clip(np.asarray(feats, dtype=np.float64), 0, None))
+    return ((z - np.array(stats["mean"])) / np.array(stats["std"])).astype(np.float32)
+
+
+# ─── Training & checkpoints ───────────────────────────────────────────────────
+def _predict(model, het):
+    return torch.sigmoid(model(het.x_dict, het.edge_index_dict)[RECORD].view(-1))
+
+
+def train(feats, subzones, venue_types, target, epochs=400, lr=0.01, hid_dim=16, heads=4,
+          val_frac=0.2, patience=40, seed=0):
+    """Fit CompetitionHGT so sigmoid(output) regresses `target` (values in [0, 1]).
+
+    Whole subzones are held out for validation; the weights with the lowest
+    validation MSE are kept. Returns (model, feature stats, config, metrics).
+    """
+    torch.manual_seed(seed)
+    stats = feature_stats(feats)
+    het = build_hub_graph(normalise_features(feats, stats), subzones, venue_types)
+    y = torch.tensor(np.asarray(target, dtype=np.float32))
+
+    names = np.unique(np.asarray(subzones, dtype=object).astype(str))
+    held = set(np.random.default_rng(seed).choice(names, max(1, int(len(names) * val_frac)), replace=False))
+    val = torch.tensor([str(sz) in held for sz in subzones])
+
+    config = {"in_dim": len(FEATURE_NAMES), "hid_dim": hid_dim, "out_dim": 1, "heads": heads,
+              "metadata": het.metadata()}
+    model = CompetitionHGT(config["in_dim"], hid_dim, 1, config["metadata"], heads=heads)
+    opt = torch.optim.Adam(model.parameters(), lr=lr, weight_decay=1e-4)
+
+    best_val, best_state, best_epoch = float("inf"), None, 0
+    for epoch in range(epochs):
+        model.train()
+        opt.zero_grad()
+        loss = F.mse_loss(_predict(model, het)[~val], y[~val])
+        loss.backward()
+        opt.step()
+
+        model.eval()
+        with torch.no_grad():
+            val_loss = F.mse_loss(_predict(model, het)[val], y[val]).item()
+        if val_loss < best_val:
+            best_val, best_epoch = val_loss, epoch
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        elif epoch - best_epoch >= patience:
+            break
+    model.load_state_dict(best_state)
+
+    model.eval()
+    with torch.no_grad():
+        pred = _predict(model, het)
+    corr = np.corrcoef(pred[val].numpy(), y[val].numpy())[0, 1] if val.sum() > 1 else float("nan")
+    metrics = {
+        "train_mse": F.mse_loss(pred[~val], y[~val]).item(),
+        "val_mse": best_val,
+        "val_pearson": float(corr),
+        "best_epoch": best_epoch,
+        "records": len(y),
+        "val_subzones": len(held),
+    }
+    return model, stats, config, metrics
+
+
+def save_checkpoint(model, stats, config, metrics, extra=None, checkpoint_dir=CHECKPOINT_DIR) -> str:
+    """Write scoring_gnn-<version>.pt and point latest.json at it; returns the path."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    version = time.strftime("%Y%m%d-%H%M%S")
+    filename = f"scoring_gnn-{version}.pt"
+    torch.save({
+        "version": version,
+        "state_dict": model.state_dict(),
+        "config": config,
+        "feature_names": FEATURE_NAMES,
+        "feature_stats": stats,
+        "metrics": metrics,
+        "torch_version": torch.__version__,
+        **(extra or {}),
+    }, os.path.join(checkpoint_dir, filename))
+    latest = os.path.join(checkpoint_dir, "latest.json")
+    with open(latest + ".tmp", "w") as f:
+        json.dump({"version": version, "file": filename, "metrics": metrics}, f, indent=2)
+    os.replace(latest + ".tmp", latest)
+    return os.path.join(checkpoint_dir, filename)
+
+
+def load_checkpoint(path=None, checkpoint_dir=CHECKPOINT_DIR):
+    """Checkpoint dict from `path`, or the latest one; None when nothing was trained yet."""
+    if path is None:
+        try:
+            with open(os.path.join(checkpoint_dir, "latest.json")) as f:
+                path = os.path.join(checkpoint_dir, json.load(f)["file"])
+        except FileNotFoundError:
+            return None
+    ckpt = torch.load(path, map_location="cpu", weights_only=True)
+    if ckpt.get("feature_names") != FEATURE_NAMES:
+        raise ValueError(f"Checkpoint {path} was trained on {ckpt.get('feature_names')}, expected {FEATURE_NAMES}")
+    return ckpt
+
+
+class GNNScorer:
+    """CPU inference with a trained checkpoint; timings of the last call in .timings."""
+
+    def __init__(self, ckpt: dict, torchscript: bool = GNN_TORCHSCRIPT, threads: int = GNN_THREADS,
+                 batch_size: int = GNN_BATCH_SIZE, num_neighbors: int = GNN_NUM_NEIGHBORS):
+        torch.set_num_threads(threads)
+        self.batch_size = batch_size
+        self.num_neighbors = num_neighbors
+        cfg = ckpt["config"]
+        self.version = ckpt["version"]
+        self.stats = ckpt["feature_stats"]
+        self.model = CompetitionHGT(cfg["in_dim"], cfg["hid_dim"], cfg["out_dim"],
+                                    cfg["metadata"], heads=cfg["heads"])
+        self.model.load_state_dict(ckpt["state_dict"])
+        self.model.eval()
+        self.torchscript = torchscript
+        self._traced = None
+        self.timings = {}
+
+    def _forward(self, het):
+        if self.torchscript and self._traced is None:
+            try:
+                self._traced = torch.jit.trace(
+                    self.model, (het.x_dict, het.edge_index_dict), strict=False, check_trace=False
+                )
+            except Exception as e:  # HGTConv internals are not always traceable
+                print(f"⚠️ TorchScript trace failed ({e}); using eager mode")
+                self.torchscript = False
+        model = self._traced if self._traced is not None else self.model
+        return model(het.x_dict, het.edge_index_dict)
+
+    def score(self, feats, subzones, venue_types) -> np.ndarray:
+        """Scores in [0, 1] for each record, in input order."""
+        start = time.perf_counter()
+        het = build_hub_graph(normalise_features(feats, self.stats), subzones, venue_types)
+        built = time.perf_counter()
+        minibatch = 0 < self.batch_size < het[RECORD].num_nodes
+        if minibatch:
+            out = torch.sigmoid(minibatch_forward(self.model, het, self.batch_size, self.num_neighbors)).numpy()
+        else:
+            with torch.inference_mode():
+                out = torch.sigmoid(self._forward(het)[RECORD].view(-1)).numpy()
+        done = time.perf_counter()
+        self.timings = {"graph_s": built - start, "forward_s": done - built,
+                        "records": len(out), "threads": torch.get_num_threads(),
+                        "torchscript": self._traced is not None,
+                        "minibatch": self.batch_size if minibatch else 0}
+        return out
+
+
+# ─── Benchmark ────────────────────────────────────────────────────────────────
+def synthetic_records(n_subzones=332, n_types=11, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_subzones * n_types
+    feats = np.column_stack([
+        rng.poisson(5, n), rng.integers(0, 5000, n), rng.uniform(0, 1e6, n)
+    ]).astype(np.float32)
+    subzones = [f"SZ{i % n_subzones}" for i in range(n)]
+    venue_types = [f"VT{i // n_subzones}" for i in range(n)]
+    return feats, subzones, venue_types
+
+
+def benchmark(n_subzones=332, n_types=11, repeats=3):
+    feats, subzones, venue_types = synthetic_records(n_subzones, n_types)
+    print(f"{len(feats)} PA_VT records ({n_subzones} subzones × {n_types} venue types)")
+    results = {}
+    for name, build in (("clique", build_clique_graph), ("hub", build_hub_graph)):
+        start = time.perf_counter()
+        het = build(feats, subzones, venue_types)
+        build_s = time.perf_counter() - start
+
+        torch.manual_seed(0)
+        model = CompetitionHGT(feats.shape[1], 16, 1, het.metadata()).eval()
+        with torch.no_grad():
+            model(het.x_dict, het.edge_index_dict)  # warm-up
+            start = time.perf_counter()
+            for _ in range(repeats):
+                model(het.x_dict, het.edge_index_dict)
+        forward_s = (time.perf_counter() - start) / repeats
+
+        results[name] = {"build_s": build_s, "edges": num_edges(het), "forward_s": forward_s}
+        print(f"{name:>7}: build {build_s:7.3f}s   edges {num_edges(het):>10,}   forward {forward_s:7.3f}s")
+    return results
+
+
+def _bench_one(scale, mode, batch_size, num_neighbors):
+    """One inference run in this process; prints a JSON line with time and peak RSS."""
+    import resource
+
+    feats, subzones, venue_types = synthetic_records(332 * scale, 11)
+    stats = feature_stats(feats)
+    start = time.perf_counter()
+    het = build_hub_graph(normalise_features(feats, stats), subzones, venue_types)
+    build_s = time.perf_counter() - start
+    torch.manual_seed(0)
+    model = CompetitionHGT(len(FEATURE_NAMES), 16, 1, het.metadata()).eval()
+
+    start = time.perf_counter()
+    if mode == "full":
+        with torch.inference_mode():
+            model(het.x_dict, het.edge_index_dict)
+    else:
+        minibatch_forward(model, het, batch_size, num_neighbors)
+    forward_s = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"scale": scale, "mode": mode, "records": len(feats), "build_s": build_s,
+                      "forward_s": forward_s, "records_per_s": len(feats) / forward_s,
+                      "peak_rss_mb": peak_mb}))
+
+
+def benchmark_minibatch(scales=(1, 10, 100), batch_size=GNN_BATCH_SIZE, num_neighbors=GNN_NUM_NEIGHBORS):
+    """Full-batch vs mini-batch inference at 1x/10x/100x records, each in a fresh process."""
+    import subprocess
+    import sys
+
+    results = []
+    for scale in scales:
+        for mode in ("full", "minibatch"):
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--bench-one", mode, "--scale", str(scale),
+                 "--batch-size", str(batch_size), "--neighbors", str(num_neighbors)],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{scale:>4}x {mode:>9}: failed (exit {proc.returncode}, likely out of memory)")
+                results.append({"scale": scale, "mode": mode, "failed": True})
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(r)
+            print(f"{scale:>4}x {mode:>9}: {r['records']:>9,} records   forward {r['forward_s']:8.2f}s   "
+                  f"{r['records_per_s']:>10,.0f} rec/s   peak RSS {r['peak_rss_mb']:8.0f} MB")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scoring GNN graph utilities")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--subzones", type=int, default=332)
+    parser.add_argument("--types", type=int, default=11)
+    parser.add_argument("--benchmark-minibatch", action="store_true")
+    parser.add_argument("--bench-one", choices=["full", "minibatch"], help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument("--batch-size", type=int, default=GNN_BATCH_SIZE)
+    parser.add_argument("--neighbors", type=int, default=GNN_NUM_NEIGHBORS)
+    opts = parser.parse_args()
+    if opts.bench_one:
+        _bench_one(opts.scale, opts.bench_one, opts.batch_size, opts.neighbors)
+    elif opts.benchmark_minibatch:
+        benchmark_minibatch(batch_size=opts.batch_size, num_neighbors=opts.neighbors)
+    elif opts.benchmark:
+        benchmark(opts.subzones, opts.types)
+    else:
+        parser.print_help()
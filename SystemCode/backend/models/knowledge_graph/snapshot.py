@@ -0,0 +1,279 @@
+"""
+Local snapshot cache of the Supabase tables used by the offline pipelines.
+
+Each table is materialised once to an uncompressed Arrow IPC file under
+SNAPSHOT_DIR (default: .snapshot next to this file), named after the table and
+a hash of its freshness watermark. Later reads memory-map the file, so
+pipelines get their rows without another round of paginated HTTP requests.
+
+The watermark is the row count plus the newest updated_at. Every table has an
+updated_at that a trigger sets on insert and update
+(supabase_setup/table_creations/11_updated_at_triggers.sql), so in-place
+UPDATEs change the watermark too. Snapshots also expire after SNAPSHOT_MAX_AGE
+seconds, and the scripts that write these tables call invalidate() so the
+next read in the same run does not wait for the watermark.
+
+index.json is only changed under an exclusive lock, re-read after the fetch,
+so stages running in parallel do not overwrite each other's entries or undo
+an invalidate().
+
+Set SNAPSHOT_SOURCE=csv to build snapshots from the supabase_setup/data dumps
+instead of Supabase (the watermark is then the file's size and mtime).
+
+    from snapshot import fetch_records, load_frame
+    rows = fetch_records("competitor_stats", ["subzone", "venue_type", "competitor_count"])
+    df   = load_frame("demographics_population")
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+import pyarrow as pa
+from dotenv import load_dotenv
+
+import supabase_csv
+
+load_dotenv()
+
+SNAPSHOT_DIR = os.getenv(
+    "SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshot")
+)
+SNAPSHOT_SOURCE = os.getenv("SNAPSHOT_SOURCE", "supabase")
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(24 * 3600)))
+
+_PAGE_SIZE = 1000
+
+# Column used to detect new or changed rows; kept current by the updated_at triggers
+WATERMARK_COLUMNS = {name: "updated_at" for name in supabase_csv.TABLES}
+
+_ARROW_TYPES = {int: pa.int64(), float: pa.float64(), supabase_csv.float_list: pa.list_(pa.float64())}
+
+_client = None
+
+
+def _supabase():
+    global _client
+    if _client is None:
+        from supabase import create_client
+        _client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return _client
+
+
+# ─── Source access ─────────────────────────────────────────────────────────────
+def watermark(table_name: str) -> dict:
+    """Cheap description of the source table's current state."""
+    if SNAPSHOT_SOURCE == "csv":
+        st = os.stat(supabase_csv.table_path(table_name))
+        return {"size": st.st_size, "mtime": st.st_mtime}
+
+    col = WATERMARK_COLUMNS.get(table_name)
+    query = _supabase().table(table_name).select(col or "*", count="exact")
+    if col:
+        query = query.order(col, desc=True, nullsfirst=False)
+    resp = query.limit(1).execute()
+    mark = {"rows": resp.count}
+    if col and resp.data:
+        mark[col] = resp.data[0].get(col)
+    return mark
+
+
+def _iter_pages(table_name: str):
+    """Yield the source table one page at a time."""
+    if SNAPSHOT_SOURCE == "csv":
+        yield from supabase_csv.iter_table(table_name, _PAGE_SIZE)
+        return
+
+    offset = 0
+    while True:
+        batch = _supabase().table(table_name) \
+                           .select("*") \
+                           .range(offset, offset + _PAGE_SIZE - 1) \
+                           .execute().data
+        if not batch:
+            break
+        yield batch
+        if len(batch) < _PAGE_SIZE:
+            break
+        offset += _PAGE_SIZE
+
+
+def _to_arrow(table_name: str, rows: list, columns=None) -> pa.Table:
+    """Build a table with a fixed schema: typed numeric and float-list columns, strings otherwise."""
+    types = supabase_csv.COLUMN_TYPES.get(table_name, {})
+    if columns is None:
+        columns = list(rows[0]) if rows else []
+    arrays, fields = [], []
+    for col in columns:
+        cast = types.get(col)
+        values = [r.get(col) for r in rows]
+        if cast is None:
+            values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+        elif cast is supabase_csv.float_list:
+            values = [None if v is None or v == "" else cast(v) for v in values]
+        else:
+            values = [None if v is None or v == "" else cast(float(v)) for v in values]
+        arrow_type = _ARROW_TYPES.get(cast, pa.string())
+        arrays.append(pa.array(values, type=arrow_type))
+        fields.append(pa.field(col, arrow_type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+# ─── Cache index ──────────────────────────────────────────────────────────────
+def _index_path():
+    return os.path.join(SNAPSHOT_DIR, "index.json")
+
+
+def _load_index() -> dict:
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_index(index: dict):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = f"{_index_path()}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, _index_path())
+
+
+@contextmanager
+def _locked_index():
+    """The current index, held under an exclusive lock and saved on exit."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(f"{_index_path()}.lock", "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = _load_index()
+            yield index
+            _save_index(index)
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _is_fresh(entry: dict, mark: dict) -> bool:
+    if not entry or "file" not in entry or entry.get("watermark") != mark:
+        return False
+    if time.time() - entry.get("fetched_at", 0) > SNAPSHOT_MAX_AGE:
+        return False
+    return os.path.exists(os.path.join(SNAPSHOT_DIR, entry["file"]))
+
+
+def refresh(table_name: str, force: bool = False) -> str:
+    """Make sure the snapshot of `table_name` is current; return its file path."""
+    entry = _load_index().get(table_name)
+    mark = watermark(table_name)
+    if not force and _is_fresh(entry, mark):
+        return os.path.join(SNAPSHOT_DIR, entry["file"])
+    started = time.time()
+
+    digest = hashlib.sha1(json.dumps(mark, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    filename = f"{table_name}.{digest}.arrow"
+    path = os.path.join(SNAPSHOT_DIR, filename)
+
+    # Pages are converted and written one at a time, so only one page of
+    # Python dicts is alive while the snapshot is built
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    num_rows, writer, columns = 0, None, None
+    with pa.OSFile(tmp, "wb") as sink:
+        for page in _iter_pages(table_name):
+            if writer is None:
+                columns = list(page[0])
+                batch = _to_arrow(table_name, page, columns)
+                writer = pa.ipc.new_file(sink, batch.schema)
+            else:
+                batch = _to_arrow(table_name, page, columns)
+            writer.write_table(batch)
+            num_rows += batch.num_rows
+        if writer is None:
+            writer = pa.ipc.new_file(sink, pa.schema([]))
+        writer.close()
+    os.replace(tmp, path)
+
+    with _locked_index() as index:
+        current = index.get(table_name) or {}
+        if current.get("invalidated_at", 0) > started:
+            # Written to while we were fetching: keep the tombstone so the next read refetches
+            pass
+        else:
+            # Earlier snapshots of this table, including ones a tombstone left behind
+            for stale in glob.glob(os.path.join(SNAPSHOT_DIR, f"{glob.escape(table_name)}.*.arrow")):
+                if os.path.basename(stale) != filename:
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+            index[table_name] = {
+                "file": filename, "watermark": mark, "rows": num_rows, "fetched_at": time.time()
+            }
+    print(f"   ↳ Snapshot {table_name}: {num_rows} rows from {SNAPSHOT_SOURCE}")
+    return path
+
+
+def invalidate(*table_names: str):
+    """Force the next read of these tables to go back to the source.
+
+    A refresh of one of them that is already running will not record its result.
+    """
+    with _locked_index() as index:
+        for name in table_names:
+            index[name] = {"invalidated_at": time.time()}
+
+
+# ─── Readers ──────────────────────────────────────────────────────────────────
+def load_table(table_name: str, columns=None) -> pa.Table:
+    """Memory-mapped Arrow table; column selection does not copy."""
+    path = refresh(table_name)
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    if columns:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table
+
+
+def load_frame(table_name: str, columns=None, zero_copy: bool = True):
+    """pandas DataFrame view of a snapshot.
+
+    With zero_copy the columns are Arrow-backed (pd.ArrowDtype) and share the
+    memory-mapped buffers; pass zero_copy=False for plain NumPy dtypes.
+    """
+    import pandas as pd
+    table = load_table(table_name, columns)
+    if zero_copy:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
+
+
+def iter_batches(table_name: str, columns=None, batch_size: int = _PAGE_SIZE):
+    """Yield the snapshot as lists of row dicts, batch_size rows at a time.
+
+    Only the current batch is materialised as Python objects; the rest stays in
+    the memory-mapped file.
+    """
+    for batch in load_table(table_name, columns).to_batches(max_chunksize=batch_size):
+        yield batch.to_pylist()
+
+
+def fetch_records(table_name: str, columns=None) -> list:
+    """Rows as a list of dicts, shaped like a Supabase select() response."""
+    return load_table(table_name, columns).to_pylist()
+
+
+if __name__ == "__main__":
+    for name in supabase_csv.TABLES:
+        start = time.perf_counter()
+        refresh(name)
+        print(f"{name}: {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,89 @@
+"""
+Read the table dumps in supabase_setup/data as lists of dicts that look like
+what the Supabase API returns (same column names, numbers as numbers, empty
+cells as None), so offline tools can run without a Supabase connection.
+"""
+
+import csv
+import os
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "supabase_setup", "data"
+)
+
+
+def float_list(value) -> list:
+    """double precision[] as PostgREST returns it (a list) or as text ("{1.5,2}" or "[1.5, 2]")."""
+    if isinstance(value, str):
+        value = [v for v in value.strip().strip("{}[]").split(",") if v.strip()]
+    return [float(v) for v in value]
+
+
+# Nearest-MRT columns from 10_mrt_access.sql, filled by mrt_access.py
+MRT_COLUMN_TYPES = {
+    "mrt_distance_m": float, "mrt_walk_min": float, "mrt_exits_500m": int,
+    "mrt_exit_distances_m": float_list,
+}
+
+# Non-text columns per table, taken from supabase_setup/table_creations
+COLUMN_TYPES = {
+    "venue_types": {"id": int},
+    "planning_areas": {
+        "id": int, "min_latitude": float, "max_latitude": float,
+        "min_longitude": float, "max_longitude": float, **MRT_COLUMN_TYPES,
+    },
+    "industrial_properties": {
+        "property_id": int, "price": float, "area_size": float, "area_ppsf": float,
+        "district_number": int, "latitude": float, "longitude": float, **MRT_COLUMN_TYPES,
+    },
+    "establishments": {
+        "id": int, "latitude": float, "longitude": float, "rank": int,
+        "avg_weekday_footfall": float, "avg_weekend_footfall": float, **MRT_COLUMN_TYPES,
+    },
+    "demographics_age_group": {"id": int},
+    "demographics_housing_types": {"id": int},
+    "demographics_population": {"id": int},
+    "avg_industrial_prices": {"average_price": float},
+    "competitor_stats": {
+        "id": int, "competitor_score": float, "competitor_count": int,
+        "underserved_score": float, "overall_score": float,
+    },
+}
+
+TABLES = list(COLUMN_TYPES)
+
+
+def table_path(table_name: str, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, f"{table_name}.csv")
+
+
+def _convert(value, cast):
+    if value == "":
+        return None
+    if cast is None:
+        return value
+    try:
+        return cast(value)
+    except ValueError:
+        # e.g. "12.0" in an integer column
+        return cast(float(value))
+
+
+def iter_table(table_name: str, page_size: int = 1000, data_dir: str = DATA_DIR):
+    """Yield a dumped table in pages of typed rows, like paginated Supabase selects."""
+    types = COLUMN_TYPES.get(table_name, {})
+    with open(table_path(table_name, data_dir), newline="", encoding="utf-8") as f:
+        page = []
+        for row in csv.DictReader(f):
+            page.append({k: _convert(v, types.get(k)) for k, v in row.items()})
+            if len(page) == page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+
+def read_table(table_name: str, data_dir: str = DATA_DIR) -> list:
+    """Return every row of a dumped table, typed like the Supabase response."""
+    return [row for page in iter_table(table_name, data_dir=data_dir) for row in page]
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Parallel sweep of the scoring weights against the last scoring run.
+
+Loads the saved scoring state (scoring.STATE_PATH) once, evaluates the rule
+activations once, and then scores every weight setting in a process pool.
+Only the blend weights (alpha, underserved_ratio, contrast) and the rule
+weights change, so each setting is a weighted sum and a blend over arrays
+that are already in memory; nothing touches Neo4j or Supabase.
+
+Each setting is compared against two references:
+  footfall_rho    Spearman correlation of overall_score with the observed
+                  weekly-footfall percentile (footfall.py), where available
+  top3_overlap    mean share of each venue type's top-3 subzones that stay
+                  in the top 3 of the current spec (rank stability)
+
+    python sweep_weights.py --random 5000                # random search
+    python sweep_weights.py --grid alpha=0.4,0.6,0.8 --grid contrast=1,1.3,1.6
+    python sweep_weights.py --sensitivity 0.1            # ±10% one at a time
+
+Results are written to outputs/weight_sweep.csv, best first.
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import rule_spec
+import scoring
+
+# Random-search ranges; rule weights are "weight.<rule name>"
+RANGES = {
+    "alpha": (0.0, 1.0),
+    "underserved_ratio": (0.0, 0.6),
+    "contrast": (0.8, 2.0),
+    "weight": (0.25, 5.0),
+}
+
+TOP_K = 3
+
+
+# ─── Sweep context (built once, shipped to each worker once) ──────────────────
+def build_context(state_path: str = None, spec: dict = None, with_footfall: bool = True) -> dict:
+    spec = spec or scoring.SPEC
+    cols, thresholds, meta = scoring.load_state(state_path or scoring.STATE_PATH)
+    rules = rule_spec.compile_spec(spec)
+    eng = rules.engine
+    type_idx = eng.type_index(cols["venue_type"].tolist())
+    m = rules.memberships(cols["comp_count"], cols["pop_relevant"], cols["spending_power"],
+                          cols["has_count"], thresholds)
+
+    groups = [np.flatnonzero(cols["venue_type"] == vt) for vt in np.unique(cols["venue_type"])]
+    baseline = cols["overall_score"]
+    labels = np.full(len(baseline), np.nan)
+    if with_footfall:
+        from footfall import footfall_targets
+        foot = footfall_targets()
+        labels = np.array([
+            foot.get((str(sz).strip().upper(), str(vt)), np.nan)
+            for sz, vt in zip(cols["subzone"], cols["venue_type"])
+        ])
+    return {
+        "rule_names": rules.rule_names,
+        "weights": {r["name"]: float(r["weight"]) for r in spec["rules"]},
+        "blend": dict(spec["blend"]),
+        "mult": eng.mult,
+        "type_idx": type_idx,
+        "m": m,
+        "gnn": cols["gnn_score"],
+        "underserved": cols["underserved_score"],
+        "use_gnn": meta.get("use_gnn", True),
+        "groups": groups,
+        "baseline": baseline,
+        "baseline_top": [set(g[_top(baseline[g])].tolist()) for g in groups],
+        "labels": labels,
+    }
+
+
+def _top(values) -> np.ndarray:
+    return np.argsort(-values, kind="stable")[:TOP_K]
+
+
+def _spearman(a, b) -> float:
+    if len(a) < 3:
+        return float("nan")
+    ra = np.argsort(np.argsort(a, kind="stable"), kind="stable")
+    rb = np.argsort(np.argsort(b, kind="stable"), kind="stable")
+    if ra.std() == 0 or rb.std() == 0:
+        return float("nan")
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def evaluate(ctx: dict, setting: dict) -> dict:
+    """Metrics of one setting ({param: value}); params not given keep the spec's value."""
+    base = np.array([setting.get(f"weight.{n}", ctx["weights"][n]) for n in ctx["rule_names"]])
+    w = (base * ctx["mult"])[ctx["type_idx"]]
+    total = w.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rule = np.where(total != 0, (ctx["m"] * w).sum(axis=1) / total, 0.0)
+    blend = {k: setting.get(k, v) for k, v in ctx["blend"].items()}
+    overall = scoring.overall_scores(rule, ctx["gnn"], ctx["underserved"], ctx["use_gnn"], blend)
+
+    labelled = np.isfinite(ctx["labels"])
+    overlap = [
+        len(set(g[_top(overall[g])].tolist()) & top) / max(1, min(TOP_K, len(g)))
+        for g, top in zip(ctx["groups"], ctx["baseline_top"])
+    ]
+    return {
+        **setting,
+        "footfall_rho": _spearman(overall[labelled], ctx["labels"][labelled]),
+        "top3_overlap": float(np.mean(overlap)) if overlap else float("nan"),
+        "mean_abs_delta": float(np.abs(overall - ctx["baseline"]).mean()),
+    }
+
+
+_ctx = None
+
+
+def _init_worker(ctx):
+    global _ctx
+    _ctx = ctx
+
+
+def _evaluate_in_worker(setting):
+    return evaluate(_ctx, setting)
+
+
+# ─── Settings ─────────────────────────────────────────────────────────────────
+def defaults(ctx: dict) -> dict:
+    return {**ctx["blend"], **{f"weight.{n}": w for n, w in ctx["weights"].items()}}
+
+
+def random_settings(ctx: dict, n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        setting = {}
+        for param in defaults(ctx):
+            low, high = RANGES[param.split(".")[0]]
+            setting[param] = round(float(rng.uniform(low, high)), 4)
+        out.append(setting)
+    return out
+
+
+def grid_settings(grid: list) -> list:
+    """["alpha=0.4,0.6", "contrast=1,1.3"] → the cartesian product as setting dicts."""
+    axes = []
+    for spec in grid:
+        param, _, values = spec.partition("=")
+        axes.append([(param.strip(), float(v)) for v in values.split(",") if v.strip()])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def sensitivity_settings(ctx: dict, step: float) -> list:
+    """Each parameter moved by ±step (relative) with the others at the spec's values."""
+    out = []
+    for param, value in defaults(ctx).items():
+        for sign in (-1, 1):
+            out.append({param: round(value * (1 + sign * step), 6)})
+    return out
+
+
+# ─── Sweep ────────────────────────────────────────────────────────────────────
+def sweep(ctx: dict, settings: list, workers: int = None) -> tuple:
+    """(results, seconds) of evaluating every setting across a process pool."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        results = [evaluate(ctx, s) for s in settings]
+    else:
+        chunk = max(1, len(settings) // (workers * 8))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(ctx,)) as pool:
+            results = list(pool.map(_evaluate_in_worker, settings, chunksize=chunk))
+    return results, time.perf_counter() - start
+
+
+def write_results(results: list, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fields = list(dict.fromkeys(k for r in results for k in r))
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep scoring weights against the last scoring run")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--random", type=int, default=None, help="number of random settings")
+    mode.add_argument("--grid", action="append", default=None, help="param=v1,v2,… (repeatable)")
+    mode.add_argument("--sensitivity", type=float, default=None, help="relative step for ±one-at-a-time")
+    parser.add_argument("--objective", choices=["footfall", "stability"], default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--state", default=None, help="scoring state (default scoring.STATE_PATH)")
+    parser.add_argument("--no-footfall", action="store_true", help="skip the footfall reference")
+    parser.add_argument("--out", default="outputs/weight_sweep.csv")
+    opts = parser.parse_args()
+
+    ctx = build_context(opts.state, with_footfall=not opts.no_footfall)
+    n_labels = int(np.isfinite(ctx["labels"]).sum())
+    print(f"🔍 Loaded {len(ctx['baseline'])} cells, {len(ctx['rule_names'])} rules, "
+          f"{n_labels} cells with footfall labels")
+
+    if opts.grid:
+        settings = grid_settings(opts.grid)
+    elif opts.sensitivity is not None:
+        settings = sensitivity_settings(ctx, opts.sensitivity)
+    else:
+        settings = random_settings(ctx, opts.random or 1000, opts.seed)
+    unknown = {p for s in settings for p in s} - set(defaults(ctx))
+    if unknown:
+        raise SystemExit(f"❌ Unknown parameters: {sorted(unknown)} (choose from {list(defaults(ctx))})")
+
+    reference = evaluate(ctx, {})
+    results, seconds = sweep(ctx, settings, opts.workers)
+    print(f"✅ Evaluated {len(results)} settings in {seconds:.2f}s "
+          f"({len(results) / seconds:,.0f} settings/s, {opts.workers or os.cpu_count()} workers)")
+
+    objective = opts.objective or ("footfall" if n_labels >= 3 else "stability")
+    key = "footfall_rho" if objective == "footfall" else "top3_overlap"
+    params = set(defaults(ctx))
+    print(f"   • current spec: footfall_rho {reference['footfall_rho']:.3f}, "
+          f"top3_overlap {reference['top3_overlap']:.3f}")
+    if opts.sensitivity is None:
+        results.sort(key=lambda r: -np.nan_to_num(r[key], nan=-np.inf))
+        shown = results[:5]
+    else:
+        # Largest score movement first: the parameters the ranking is most sensitive to
+        results.sort(key=lambda r: -r["mean_abs_delta"])
+        shown = results
+    for r in shown:
+        values = ", ".join(f"{k}={v:g}" for k, v in r.items() if k in params)
+        print(f"   • {key} {r[key]:.3f}, mean |Δ| {r['mean_abs_delta']:.2f}: {values}")
+
+    write_results(results, opts.out)
+    print(f"📁 Saved CSV: {opts.out}")
+
+
+if __name__ == "__main__":
+    main()
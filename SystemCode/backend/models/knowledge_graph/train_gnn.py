@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Train the scoring GNN used by neuro_symbolic.py and save a versioned checkpoint.
+
+Features are extracted from Neo4j exactly as the scoring run does
+(neuro_symbolic.extract_features). The training target is one of:
+
+  rules     the fuzzy rule score of each record; the GNN learns a smoothed,
+            graph-aware version of the rule base
+  footfall  per-venue-type percentile of the average weekly footfall in
+            aggregated_venue_footfall.csv (only records with footfall data)
+  blend     rules everywhere, averaged with the footfall percentile where
+            footfall data exists (default)
+
+    python train_gnn.py                      # blend target, checkpoints/scoring_gnn/
+    python train_gnn.py --target footfall --epochs 800
+"""
+
+import argparse
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+import neuro_symbolic
+import scoring_gnn
+from footfall import footfall_targets
+
+
+def build_targets(records, target: str) -> np.ndarray:
+    """Target per record; NaN where the record has no label for this target."""
+    rules = neuro_symbolic.rule_scores_for(records)
+    if target == "rules":
+        return rules
+    foot = footfall_targets()
+    labels = np.array([
+        foot.get((r["subzone"].strip().upper(), r["venue_type"]), np.nan) for r in records
+    ])
+    print(f"   • {int(np.isfinite(labels).sum())} records have footfall labels")
+    if target == "footfall":
+        return labels
+    return np.where(np.isfinite(labels), (rules + labels) / 2, rules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the scoring GNN")
+    parser.add_argument("--target", choices=["rules", "footfall", "blend"], default="blend")
+    parser.add_argument("--epochs", type=int, default=400)
+    parser.add_argument("--lr", type=float, default=0.01)
+    parser.add_argument("--hidden", type=int, default=16)
+    parser.add_argument("--heads", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=scoring_gnn.CHECKPOINT_DIR)
+    opts = parser.parse_args()
+
+    load_dotenv()
+    print(f"🔍 Training scoring GNN (target={opts.target})")
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI"),
+        auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    )
+    try:
+        records = neuro_symbolic.extract_features(driver, neuro_symbolic.fetch_venue_types())
+    finally:
+        driver.close()
+
+    y = build_targets(records, opts.target)
+    keep = np.isfinite(y)
+    if opts.target == "footfall":
+        # Unlabelled records stay out of the graph entirely
+        records = [r for r, k in zip(records, keep) if k]
+        y = y[keep]
+    if len(records) < 10:
+        raise SystemExit(f"❌ Only {len(records)} labelled records; not enough to train on")
+
+    model, stats, config, metrics = scoring_gnn.train(
+        [[r[k] for k in scoring_gnn.FEATURE_NAMES] for r in records],
+        [r["subzone"] for r in records],
+        [r["venue_type"] for r in records],
+        y, epochs=opts.epochs, lr=opts.lr, hid_dim=opts.hidden, heads=opts.heads, seed=opts.seed,
+    )
+    print(f"   • train MSE {metrics['train_mse']:.4f}, val MSE {metrics['val_mse']:.4f}, "
+          f"val r={metrics['val_pearson']:.3f} (best epoch {metrics['best_epoch']})")
+    path = scoring_gnn.save_checkpoint(
+        model, stats, config, metrics, extra={"target": opts.target}, checkpoint_dir=opts.out
+    )
+    print(f"✅ Saved checkpoint {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,11 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client
 from neo4j import GraphDatabase
+import snapshot
 
 # --- Load environment
 load_dotenv()
 
-# --- Connect to Supabase
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
-print("✅ Connected to Supabase")
-
 # --- Connect to Neo4j
 neo4j_driver = GraphDatabase.driver(
     os.getenv("NEO4J_URI"),
@@ -17,17 +13,9 @@ neo4j_driver = GraphDatabase.driver(
 )
 print("✅ Connected to Neo4j")
 
-# --- Step 1: Fetch competitor stats from Supabase
+# --- Step 1: Fetch competitor stats (Supabase snapshot)
 def fetch_competitor_counts():
-    all_data = []
-    page_size = 1000
-    for start in range(0, 4000, page_size):
-        end = start + page_size - 1
-        response = supabase.table("competitor_stats") \
-            .select("subzone, venue_type, competitor_count") \
-            .range(start, end) \
-            .execute()
-        all_data.extend(response.data)
+    all_data = snapshot.fetch_records("competitor_stats", ["subzone", "venue_type", "competitor_count"])
 
     print(f"✅ Total records fetched: {len(all_data)}")
     return all_data
@@ -53,7 +41,7 @@ def update_neo4j_competitor_stats(data):
             # Only update if competitor_count is NOT already set
             result = session.run("""
                 MATCH (cs:CompetitorStats)
-                WHERE cs.subzone = $subzone AND cs.venue_type = $venue_type AND NOT EXISTS(cs.competitor_count)
+                WHERE cs.subzone = $subzone AND cs.venue_type = $venue_type AND cs.competitor_count IS NULL
                 SET cs.competitor_count = $count
                 RETURN cs
             """, {
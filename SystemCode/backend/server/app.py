@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 from flask import Flask, request, jsonify
 from flask_cors import CORS
@@ -51,6 +52,23 @@ Always explain your reasoning and provide multiple options when possible."""
 
 print("🔵 [APP] Flask application initialized successfully")
 
+# What-if scoring runs in-process on the state saved by the last neuro_symbolic run
+KNOWLEDGE_GRAPH_DIR = os.getenv(
+    "KNOWLEDGE_GRAPH_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "knowledge_graph")
+)
+_scenario_scorer = None
+
+def get_scenario_scorer():
+    global _scenario_scorer
+    if _scenario_scorer is None:
+        sys.path.insert(0, KNOWLEDGE_GRAPH_DIR)
+        from scenario import ScenarioScorer
+        _scenario_scorer = ScenarioScorer()
+    else:
+        _scenario_scorer.reload()
+    return _scenario_scorer
+
 # Route to handle POST requests
 @app.route("/respond", methods=["POST"])
 def respond():
@@ -135,6 +153,9 @@ def get_metadata():
             'district': property_data.get('district_number', ''),
             'postal_code': property_data.get('postal_code', ''),
             'closest_mrt': property_data.get('closest_mrt', ''),
+            'mrt_station': property_data.get('mrt_station'),
+            'mrt_distance_m': property_data.get('mrt_distance_m'),
+            'mrt_walk_min': property_data.get('mrt_walk_min'),
             'planning_area': property_data.get('planning_area', ''),
             'subzone': property_data.get('subzone', ''),
             'listing_url': property_data.get('listing_url', '')
@@ -148,6 +169,66 @@ def get_metadata():
         print(f"❌ [METADATA] Error type: {type(e)}")
         return jsonify({'error': str(e)}), 500
     
+@app.route('/api/scenario', methods=['POST'])
+def score_scenario():
+    try:
+        data = request.get_json() or {}
+        changes = data.get('changes')
+        if not isinstance(changes, list) or not changes:
+            print("❌ [SCENARIO] Error: 'changes' must be a non-empty list")
+            return jsonify({'error': "'changes' must be a non-empty list"}), 400
+
+        print(f"🔵 [SCENARIO] Scoring {len(changes)} change(s)")
+        result = get_scenario_scorer().score(changes)
+        print(f"✅ [SCENARIO] {len(result['cells'])} cells re-scored in {result['elapsed_ms']} ms")
+        return jsonify(result)
+
+    except ValueError as e:
+        print(f"❌ [SCENARIO] Bad request: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        print("❌ [SCENARIO] No scoring state found; run neuro_symbolic.py first")
+        return jsonify({'error': 'Scoring state not available'}), 503
+    except Exception as e:
+        print(f"❌ [SCENARIO] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Subzone names and bounding boxes from the cached WKB geometry store (NumPy only)
+GEOMETRY_DIR = os.getenv(
+    "GEOMETRY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 "data_processing", "data_extraction_scripts")
+)
+_geometry_store = None
+
+def get_geometry_store():
+    global _geometry_store
+    if _geometry_store is None:
+        sys.path.insert(0, GEOMETRY_DIR)
+        from geometry_store import load_store
+        _geometry_store = load_store()
+    return _geometry_store
+
+@app.route('/api/subzones', methods=['GET'])
+def list_subzones():
+    try:
+        store = get_geometry_store()
+        subzones = [
+            {
+                'subzone': name,
+                'planning_area': store.planning_areas[i],
+                'region': store.regions[i],
+                'bbox': [round(float(v), 7) for v in store.bounds[i]],
+            }
+            for i, name in enumerate(store.names)
+        ]
+        print(f"✅ [SUBZONES] Returning {len(subzones)} subzones")
+        return jsonify({'subzones': subzones})
+
+    except Exception as e:
+        print(f"❌ [SUBZONES] Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # Start the server
 if __name__ == "__main__":
     port = 4000
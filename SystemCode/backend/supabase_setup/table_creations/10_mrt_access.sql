@@ -0,0 +1,25 @@
+-- Nearest-MRT accessibility columns filled by data_extraction_scripts/mrt_access.py
+alter table public.industrial_properties
+  add column if not exists mrt_station text null,
+  add column if not exists mrt_exit text null,
+  add column if not exists mrt_distance_m double precision null,
+  add column if not exists mrt_walk_min double precision null,
+  add column if not exists mrt_exits_500m integer null,
+  add column if not exists mrt_exit_distances_m double precision[] null;
+
+alter table public.establishments
+  add column if not exists mrt_station text null,
+  add column if not exists mrt_exit text null,
+  add column if not exists mrt_distance_m double precision null,
+  add column if not exists mrt_walk_min double precision null,
+  add column if not exists mrt_exits_500m integer null,
+  add column if not exists mrt_exit_distances_m double precision[] null;
+
+-- Per subzone, measured from the subzone centroid
+alter table public.planning_areas
+  add column if not exists mrt_station text null,
+  add column if not exists mrt_exit text null,
+  add column if not exists mrt_distance_m double precision null,
+  add column if not exists mrt_walk_min double precision null,
+  add column if not exists mrt_exits_500m integer null,
+  add column if not exists mrt_exit_distances_m double precision[] null;
@@ -0,0 +1,61 @@
+-- Keep updated_at current on every insert and update, so the snapshot watermark
+-- (models/knowledge_graph/snapshot.py: row count + newest updated_at) sees
+-- in-place UPDATEs as well as new rows
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at = now();
+  return new;
+end;
+$$;
+
+alter table public.demographics_age_group
+  add column if not exists updated_at timestamp without time zone null default now();
+alter table public.demographics_housing_types
+  add column if not exists updated_at timestamp without time zone null default now();
+alter table public.demographics_population
+  add column if not exists updated_at timestamp without time zone null default now();
+alter table public.avg_industrial_prices
+  add column if not exists updated_at timestamp without time zone null default now();
+alter table public.competitor_stats
+  add column if not exists updated_at timestamp without time zone null default now();
+
+create index if not exists venue_types_updated_at_idx on public.venue_types (updated_at);
+create index if not exists planning_areas_updated_at_idx on public.planning_areas (updated_at);
+create index if not exists industrial_properties_updated_at_idx on public.industrial_properties (updated_at);
+create index if not exists establishments_updated_at_idx on public.establishments (updated_at);
+create index if not exists demographics_age_group_updated_at_idx on public.demographics_age_group (updated_at);
+create index if not exists demographics_housing_types_updated_at_idx on public.demographics_housing_types (updated_at);
+create index if not exists demographics_population_updated_at_idx on public.demographics_population (updated_at);
+create index if not exists avg_industrial_prices_updated_at_idx on public.avg_industrial_prices (updated_at);
+create index if not exists competitor_stats_updated_at_idx on public.competitor_stats (updated_at);
+
+create or replace trigger venue_types_set_updated_at
+  before insert or update on public.venue_types
+  for each row execute function public.set_updated_at();
+create or replace trigger planning_areas_set_updated_at
+  before insert or update on public.planning_areas
+  for each row execute function public.set_updated_at();
+create or replace trigger industrial_properties_set_updated_at
+  before insert or update on public.industrial_properties
+  for each row execute function public.set_updated_at();
+create or replace trigger establishments_set_updated_at
+  before insert or update on public.establishments
+  for each row execute function public.set_updated_at();
+create or replace trigger demographics_age_group_set_updated_at
+  before insert or update on public.demographics_age_group
+  for each row execute function public.set_updated_at();
+create or replace trigger demographics_housing_types_set_updated_at
+  before insert or update on public.demographics_housing_types
+  for each row execute function public.set_updated_at();
+create or replace trigger demographics_population_set_updated_at
+  before insert or update on public.demographics_population
+  for each row execute function public.set_updated_at();
+create or replace trigger avg_industrial_prices_set_updated_at
+  before insert or update on public.avg_industrial_prices
+  for each row execute function public.set_updated_at();
+create or replace trigger competitor_stats_set_updated_at
+  before insert or update on public.competitor_stats
+  for each row execute function public.set_updated_at();